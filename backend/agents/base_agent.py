@@ -6,23 +6,51 @@
 所有Agent的基类
 """
 
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+from backend.agents.prompts import PromptTemplate, prompt_cache_stats
 from backend.config.settings import settings
+from backend.providers.base_provider import BaseProvider
+from backend.providers.provider_factory import get_provider
+from backend.utils.cancellation import RequestCancelled, call_with_timeout, check_cancelled, stage_timeout
+from backend.utils.circuit_breaker import CircuitBreaker, get_breaker, is_client_error, model_chain
+from backend.utils.hedging import hedged_call
+from backend.utils.usage_tracker import record_usage
+
+T = TypeVar("T")
 
 
 class BaseAgent(ABC):
     """基础Agent类"""
     
-    def __init__(self, model_name: Optional[str] = None):
+    # Agent使用的提示词模板（见 backend.agents.prompts），用于按Agent统计前缀缓存命中
+    prompt_template: Optional[PromptTemplate] = None
+    
+    def __init__(self, model_name: Optional[str] = None, provider: Optional[BaseProvider] = None,
+                 provider_name: Optional[str] = None):
         """
         初始化Agent
         
         Args:
             model_name (str, optional): 使用的模型名称
+            provider (BaseProvider, optional): 模型提供方实例
+            provider_name (str, optional): 未传入 provider 时按名称选择提供方，默认 Settings.model_provider
         """
         self.model_name = model_name
-        self.api_key = settings.dashscope_api_key
+        self.provider_name = provider_name
+        self._provider = provider
+    
+    @property
+    def provider(self) -> BaseProvider:
+        """模型提供方（首次使用时创建，模型SDK随之加载一次）"""
+        if self._provider is None:
+            self._provider = get_provider(self.provider_name)
+        return self._provider
+    
+    def warm_up(self):
+        """预热：提前初始化模型提供方"""
+        _ = self.provider
     
     @abstractmethod
     def process(self, input_data: Any) -> Any:
@@ -37,41 +65,117 @@ class BaseAgent(ABC):
         """
         pass
     
-    def _call_model(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+    def _build_messages(self, prompt: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        构建对话消息列表
+        
+        Args:
+            prompt (str): 用户提示词
+            system_prompt (str, optional): 系统提示词
+            
+        Returns:
+            List[Dict[str, str]]: 消息列表
+        """
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
+    def _call_model(self, prompt: str, system_prompt: Optional[str] = None,
+                    model_name: Optional[str] = None, template: Optional[PromptTemplate] = None) -> str:
         """
         调用大模型API
         
         Args:
             prompt (str): 用户提示词
             system_prompt (str, optional): 系统提示词
+            model_name (str, optional): 本次调用使用的模型，默认使用Agent的模型
+            template (PromptTemplate, optional): 本次调用使用的提示词模板（用于统计），默认使用Agent的模板
             
         Returns:
             模型响应
         """
+        template = template or self.prompt_template
+        stage = template.name if template is not None else type(self).__name__
+        messages = self._build_messages(prompt, system_prompt)
+        candidate, breaker, start, response = self._guarded_call(
+            model_name or self.model_name,
+            lambda candidate: self._provider_call(candidate, messages, stage)
+        )
+        if breaker is not None:
+            breaker.record_success(time.time() - start)
         try:
-            from dashscope import Generation
+            usage = response.get("usage") or {}
+            record_usage(stage, candidate, usage)
+            if template is not None:
+                prompt_cache_stats.record(template.name, usage)
+            return response["content"]
+        except Exception as e:
+            raise Exception(f"模型调用出错: {str(e)}")
+    
+    def _guarded_call(self, model: str, attempt: Callable[[str], T]) -> Tuple[str, Optional[CircuitBreaker], float, T]:
+        """
+        按熔断器与降级链调用模型：首选模型失败或已熔断时，按 MODEL_FALLBACKS 依次改用备选模型
+        
+        Args:
+            model (str): 首选模型
+            attempt (Callable[[str], T]): 对指定模型的一次调用
             
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
+        Returns:
+            Tuple[str, Optional[CircuitBreaker], float, T]: 成功的模型、其熔断器（未启用时为None）、
+                调用开始时间和调用结果；成功尚未记入熔断器，由调用方在结果可用后记录
+        """
+        last_error: Optional[Exception] = None
+        for candidate in model_chain(model):
+            # 工作流已取消或超时时不再发起调用
+            check_cancelled()
+            breaker = get_breaker(candidate) if settings.circuit_breaker_enabled else None
+            if breaker is not None and not breaker.allow():
+                print(f"模型 {candidate} 已熔断，跳过")
+                last_error = last_error or Exception(f"模型 {candidate} 已熔断")
+                continue
+            if candidate != model:
+                print(f"模型 {model} 不可用，降级使用 {candidate}")
+            start = time.time()
+            try:
+                return candidate, breaker, start, attempt(candidate)
+            except RequestCancelled:
+                # 调用被放弃，没有可记录的结果；归还探测名额，否则半开的熔断器不再放行调用
+                if breaker is not None:
+                    breaker.release_probe()
+                raise
+            except Exception as e:
+                if is_client_error(e):
+                    # 请求本身的问题，换模型也无法解决，也不说明模型是否可用
+                    if breaker is not None:
+                        breaker.release_probe()
+                    raise Exception(f"模型调用出错: {str(e)}")
+                if breaker is not None:
+                    breaker.record_failure()
+                last_error = e
+        raise Exception(f"模型调用出错: {str(last_error)}")
+    
+    def _provider_call(self, model: str, messages: List[Dict[str, str]], stage: str) -> Dict[str, Any]:
+        """
+        调用模型提供方：按阶段超时，等待期间工作流被取消时立即返回；
+        启用对冲时，超过该模型近期延迟分位数仍未返回则再发一次，采用先返回的结果
+        
+        Args:
+            model (str): 模型名称
+            messages (List[Dict[str, str]]): 消息列表
+            stage (str): 阶段名称（决定超时；未被采用的对冲调用的用量按该阶段计入）
             
-            response = Generation.call(
-                model=self.model_name,
-                messages=messages,
-                api_key=self.api_key
+        Returns:
+            Dict[str, Any]: 提供方的响应
+        """
+        def call(timeout: Optional[float]) -> Dict[str, Any]:
+            if not settings.hedge_enabled:
+                return self.provider.call(model=model, messages=messages, timeout=timeout)
+            return hedged_call(
+                model,
+                lambda: self.provider.call(model=model, messages=messages, timeout=timeout),
+                lambda response: record_usage(stage, model, response.get("usage") or {}),
             )
-            
-            if response.status_code == 200:
-                # 检查响应结构
-                if hasattr(response.output, 'choices') and response.output.choices:
-                    return response.output.choices[0].message.content
-                elif hasattr(response.output, 'text'):
-                    return response.output.text
-                else:
-                    raise Exception(f"无法解析API响应结构: {response.output}")
-            else:
-                raise Exception(f"API调用失败 (状态码: {response.status_code}): {response.message}")
-                
-        except Exception as e:
-            raise Exception(f"模型调用出错: {str(e)}")
+        
+        return call_with_timeout(call, stage_timeout(stage))
@@ -6,44 +6,62 @@
 负责根据优化后的提示词生成启发性对话内容
 """
 
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
 from backend.agents.base_agent import BaseAgent
+from backend.agents.prompts import CONTENT_FOLLOWUP, CONTENT_GENERATOR
 from backend.config.settings import settings
 
 
 class ContentGeneratorAgent(BaseAgent):
     """内容生成Agent"""
     
+    prompt_template = CONTENT_GENERATOR
+    
     def __init__(self):
         """初始化内容生成Agent"""
-        super().__init__(model_name=settings.generator_model)
+        super().__init__(model_name=settings.generator_model, provider_name=settings.generator_provider)
     
-    def process(self, input_data: str) -> str:
+    def process(self, input_data: str, model_name: Optional[str] = None) -> str:
         """
         生成启发性对话内容
         
         Args:
             input_data (str): 优化后的提示词
+            model_name (str, optional): 本次生成使用的模型（模型路由选择），默认 Settings.generator_model
             
         Returns:
             str: 生成的对话内容
         """
-        # 构建系统提示词
-        system_prompt = """你是一位经验丰富的中学教师，擅长以对话的形式向学生传授知识。
-        你的任务是根据给定的主题生成一段启发性的对话内容，要求：
-        1. 采用师生对话的形式，生动有趣
-        2. 语言简洁明了，适合中学生理解
-        3. 引导学生主动思考，而非直接给出答案
-        4. 内容准确，符合教育标准
-        """
-        
         # 构建用户提示词
-        user_prompt = f"请根据以下主题生成启发性对话内容：{input_data}"
+        user_prompt = CONTENT_GENERATOR.render(input_data)
         
         # 调用模型生成内容
         response = self._call_model(
             prompt=user_prompt,
-            system_prompt=system_prompt
+            system_prompt=CONTENT_GENERATOR.system,
+            model_name=model_name
+        )
+        
+        return response.strip()
+    
+    def continue_dialog(self, topic: str, history: str, question: str, model_name: Optional[str] = None) -> str:
+        """
+        在已有对话的基础上回答学生的追问（不经过提示词优化）
+        
+        Args:
+            topic (str): 会话主题
+            history (str): 最近几轮对话（滑动窗口内的上下文）
+            question (str): 学生的追问
+            model_name (str, optional): 本次生成使用的模型，默认 Settings.generator_model
+            
+        Returns:
+            str: 新增的对话内容
+        """
+        response = self._call_model(
+            prompt=CONTENT_FOLLOWUP.render(question, topic=topic, history=history),
+            system_prompt=CONTENT_FOLLOWUP.system,
+            model_name=model_name,
+            template=CONTENT_FOLLOWUP
         )
         
         return response.strip()
@@ -6,17 +6,28 @@
 负责审查生成内容的事实准确性
 """
 
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
 from backend.agents.base_agent import BaseAgent
+from backend.agents.prompts import KNOWLEDGE_REVIEWER, PromptTemplate
 from backend.config.settings import settings
 
 
 class KnowledgeReviewerAgent(BaseAgent):
     """知识审查Agent"""
     
-    def __init__(self):
-        """初始化知识审查Agent"""
-        super().__init__(model_name=settings.reviewer_model)
+    prompt_template = KNOWLEDGE_REVIEWER
+    
+    def __init__(self, model_name: Optional[str] = None, prompt_template: Optional[PromptTemplate] = None):
+        """
+        初始化知识审查Agent
+        
+        Args:
+            model_name (str, optional): 审查模型，默认 Settings.reviewer_model
+            prompt_template (PromptTemplate, optional): 审查提示词模板（需使用相同的输出格式），默认 KNOWLEDGE_REVIEWER
+        """
+        super().__init__(model_name=model_name or settings.reviewer_model, provider_name=settings.reviewer_provider)
+        if prompt_template is not None:
+            self.prompt_template = prompt_template
     
     def process(self, input_data: str) -> Tuple[bool, str]:
         """
@@ -28,41 +39,13 @@ class KnowledgeReviewerAgent(BaseAgent):
         Returns:
             Tuple[bool, str]: 审查结果（通过/不通过）和反馈信息
         """
-        # 构建系统提示词
-        system_prompt = """你是一位严谨的学科专家，负责审查教学内容的事实准确性。
-        你的任务是对给定的教学内容进行事实性审查，判断是否存在错误或不准确的信息。
-        
-        审查标准：
-        1. 内容中的事实信息必须准确无误
-        2. 不得包含过时或已被证实错误的信息
-        3. 数据、日期、人物、事件等必须核实准确
-        4. 解释和概念必须科学正确
-        5. 推理过程必须逻辑严密
-        
-        重要：默认情况下内容可以通过审查，只有在发现严重事实错误时才拒绝通过
-        
-        请严格按照以下格式返回审查结果：
-        [PASS|FAIL]
-        [反馈信息]
-        
-        如果内容没有严重事实错误，请回复：
-        PASS
-        内容通过审查，可以发布。
-        
-        如果内容存在严重事实错误，请回复：
-        FAIL
-        问题：[具体的问题描述]
-        错误：[具体的错误内容]
-        建议：[改进建议]
-        """
-        
         # 构建用户提示词
-        user_prompt = f"请审查以下教学内容的事实准确性：\n\n{input_data}"
+        user_prompt = self.prompt_template.render(input_data)
         
         # 调用模型进行审查
         response = self._call_model(
             prompt=user_prompt,
-            system_prompt=system_prompt
+            system_prompt=self.prompt_template.system
         )
         
         # 解析审查结果
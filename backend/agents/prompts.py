@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+提示词注册表
+各Agent的系统提示词和用户提示词模板在模块加载时构建一次，按内容计算版本哈希；
+系统提示词逐字节固定并放在消息最前面，使模型服务的前缀缓存可以命中，
+同时按Agent统计前缀缓存的命中情况
+"""
+
+import hashlib
+import inspect
+import threading
+from typing import Any, Dict
+
+
+class PromptTemplate:
+    """固定的系统提示词与用户提示词模板"""
+
+    def __init__(self, name: str, system: str, user: str):
+        """
+        初始化提示词模板
+
+        Args:
+            name (str): 模板名称（注册表键）
+            system (str): 系统提示词，去除源码缩进后固定不变
+            user (str): 用户提示词模板，以 {input} 占位
+        """
+        self.name = name
+        self.system = inspect.cleandoc(system)
+        self.user = user
+        self.version = hashlib.sha256(f"{self.system}\x00{self.user}".encode("utf-8")).hexdigest()[:12]
+
+    def render(self, input_data: str = "", **fields: str) -> str:
+        """
+        填充用户提示词
+
+        Args:
+            input_data (str): 用户输入（{input} 占位）
+            **fields: 模板中的其他占位字段
+
+        Returns:
+            str: 用户提示词
+        """
+        return self.user.format(input=input_data, **fields)
+
+
+PROMPT_OPTIMIZER = PromptTemplate(
+    "prompt_optimizer",
+    """你是一个专业的提示词优化专家。你的任务是将用户输入的提示词优化得更加清晰、具体，
+    适合用于生成面向中学生的启发性教学内容。请确保优化后的提示词能够引导模型产生：
+    1. 易于理解的表达方式
+    2. 对话式的交互形式
+    3. 启发性的思考角度
+    4. 准确的知识点覆盖
+
+    请直接返回优化后的提示词，不要添加任何解释或其他内容。
+    """,
+    "请优化以下提示词：{input}",
+)
+
+CONTENT_GENERATOR = PromptTemplate(
+    "content_generator",
+    """你是一位经验丰富的中学教师，擅长以对话的形式向学生传授知识。
+    你的任务是根据给定的主题生成一段启发性的对话内容，要求：
+    1. 采用师生对话的形式，生动有趣
+    2. 语言简洁明了，适合中学生理解
+    3. 引导学生主动思考，而非直接给出答案
+    4. 内容准确，符合教育标准
+    """,
+    "请根据以下主题生成启发性对话内容：{input}",
+)
+
+# 会话追问：与内容生成共用系统提示词（共享前缀缓存），只生成新增的对话
+CONTENT_FOLLOWUP = PromptTemplate(
+    "content_followup",
+    CONTENT_GENERATOR.system,
+    """以下是与学生关于“{topic}”的对话（最近部分）：
+{history}
+
+学生追问：{input}
+
+请以老师的口吻继续对话，引导学生思考并回答这个追问；只输出新增的对话内容，不要重复之前的内容。""",
+)
+
+KNOWLEDGE_REVIEWER = PromptTemplate(
+    "knowledge_reviewer",
+    """你是一位严谨的学科专家，负责审查教学内容的事实准确性。
+    你的任务是对给定的教学内容进行事实性审查，判断是否存在错误或不准确的信息。
+
+    审查标准：
+    1. 内容中的事实信息必须准确无误
+    2. 不得包含过时或已被证实错误的信息
+    3. 数据、日期、人物、事件等必须核实准确
+    4. 解释和概念必须科学正确
+    5. 推理过程必须逻辑严密
+
+    重要：默认情况下内容可以通过审查，只有在发现严重事实错误时才拒绝通过
+
+    请严格按照以下格式返回审查结果：
+    [PASS|FAIL]
+    [反馈信息]
+
+    如果内容没有严重事实错误，请回复：
+    PASS
+    内容通过审查，可以发布。
+
+    如果内容存在严重事实错误，请回复：
+    FAIL
+    问题：[具体的问题描述]
+    错误：[具体的错误内容]
+    建议：[改进建议]
+    """,
+    "请审查以下教学内容的事实准确性：\n\n{input}",
+)
+
+# 审查组中的另一种审查视角：逐条核对知识点（输出格式与 KNOWLEDGE_REVIEWER 相同）
+KNOWLEDGE_REVIEWER_CHECKLIST = PromptTemplate(
+    "knowledge_reviewer_checklist",
+    """你是一位中学学科教研员，负责逐条核对教学对话中的知识点。
+    请找出对话中涉及的概念、定义、公式、数据和结论，逐一核对是否符合中学教材和公认的科学事实。
+
+    只有发现会误导学生的严重事实错误时才判定不通过；表达方式、详略和风格问题不影响结论。
+
+    请严格按照以下格式返回审查结果：
+    [PASS|FAIL]
+    [反馈信息]
+
+    如果没有严重事实错误，请回复：
+    PASS
+    内容通过审查，可以发布。
+
+    如果存在严重事实错误，请回复：
+    FAIL
+    问题：[具体的问题描述]
+    错误：[具体的错误内容]
+    建议：[改进建议]
+    """,
+    "请逐条核对以下教学内容中的知识点：\n\n{input}",
+)
+
+PROMPT_REGISTRY: Dict[str, PromptTemplate] = {
+    template.name: template for template in (
+        PROMPT_OPTIMIZER, CONTENT_GENERATOR, CONTENT_FOLLOWUP, KNOWLEDGE_REVIEWER, KNOWLEDGE_REVIEWER_CHECKLIST
+    )
+}
+
+
+def get_prompt(name: str) -> PromptTemplate:
+    """
+    按名称获取提示词模板
+
+    Args:
+        name (str): 模板名称
+
+    Returns:
+        PromptTemplate: 提示词模板
+    """
+    if name not in PROMPT_REGISTRY:
+        raise KeyError(f"未注册的提示词模板: {name}")
+    return PROMPT_REGISTRY[name]
+
+
+def prompt_versions() -> Dict[str, str]:
+    """
+    导出各模板的版本哈希
+
+    Returns:
+        Dict[str, str]: 模板名称到版本哈希的映射
+    """
+    return {name: template.version for name, template in PROMPT_REGISTRY.items()}
+
+
+class PromptCacheStats:
+    """按提示词模板统计的前缀缓存命中情况（本进程）"""
+
+    def __init__(self):
+        """初始化统计"""
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, usage: Dict[str, Any]):
+        """
+        记录一次模型调用的用量
+
+        Args:
+            name (str): 模板名称
+            usage (Dict[str, Any]): 提供方返回的 usage（cached_tokens 为命中前缀缓存的输入token数）
+        """
+        cached_tokens = usage.get("cached_tokens", 0) or 0
+        with self._lock:
+            stats = self._stats.setdefault(
+                name, {"calls": 0, "cache_hits": 0, "input_tokens": 0, "cached_tokens": 0}
+            )
+            stats["calls"] += 1
+            stats["input_tokens"] += usage.get("input_tokens", 0) or 0
+            stats["cached_tokens"] += cached_tokens
+            if cached_tokens > 0:
+                stats["cache_hits"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        导出各模板的版本与缓存命中率
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 模板名称到统计的映射
+        """
+        with self._lock:
+            report = {}
+            for name, template in PROMPT_REGISTRY.items():
+                stats = dict(self._stats.get(name, {"calls": 0, "cache_hits": 0, "input_tokens": 0, "cached_tokens": 0}))
+                stats["version"] = template.version
+                stats["hit_rate"] = round(stats["cache_hits"] / stats["calls"], 4) if stats["calls"] else None
+                stats["cached_token_ratio"] = (
+                    round(stats["cached_tokens"] / stats["input_tokens"], 4) if stats["input_tokens"] else None
+                )
+                report[name] = stats
+            return report
+
+
+# 全局统计实例
+prompt_cache_stats = PromptCacheStats()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+审查组
+多个知识审查Agent（不同模型或不同审查提示词）并行审查同一内容，
+某一结论的票数先达到法定票数即返回，不再等待其余成员；
+其余成员完成后仍计入一致性统计，用于评估各成员与最终结论的吻合程度
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.agents.knowledge_reviewer_agent import KnowledgeReviewerAgent
+from backend.agents.prompts import get_prompt
+from backend.config.settings import settings
+from backend.utils.cancellation import RequestCancelled
+
+
+def parse_members(spec: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    解析审查组成员配置
+
+    Args:
+        spec (str): 逗号分隔的成员，每个成员为 模型 或 模型/提示词模板名，
+            如 qwen-flash,qwen-plus,qwen-flash/knowledge_reviewer_checklist
+
+    Returns:
+        List[Tuple[str, Optional[str]]]: (模型, 提示词模板名) 列表
+    """
+    members = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        model, _, template = item.partition("/")
+        members.append((model.strip(), template.strip() or None))
+    return members
+
+
+class EnsembleStats:
+    """审查组的结论与一致性统计（本进程）"""
+
+    def __init__(self, member_names: List[str]):
+        """
+        初始化统计
+
+        Args:
+            member_names (List[str]): 成员名称
+        """
+        self.decisions = {"PASS": 0, "FAIL": 0}
+        self.early_decisions = 0
+        self.unanimous = 0
+        self.completed = 0
+        self.decision_latency = 0.0
+        self.members = {name: {"votes": 0, "pass": 0, "agree": 0, "errors": 0, "missing": 0} for name in member_names}
+        self._lock = threading.Lock()
+
+    def record_decision(self, verdict: str, early: bool, latency: float):
+        """记录一次结论"""
+        with self._lock:
+            self.decisions[verdict] += 1
+            self.early_decisions += int(early)
+            self.decision_latency += latency
+
+    def record_votes(self, verdict: str, votes: Dict[str, Optional[bool]]):
+        """
+        所有成员完成后记录各自的投票
+
+        Args:
+            verdict (str): 审查组的结论
+            votes (Dict[str, Optional[bool]]): 成员名称到投票（出错为 None）的映射，
+                被取消而没有投票的成员不在其中，计为缺席，本次不算全票一致
+        """
+        with self._lock:
+            self.completed += 1
+            valid = [vote for vote in votes.values() if vote is not None]
+            if valid and len(set(valid)) == 1 and len(valid) == len(self.members):
+                self.unanimous += 1
+            for name, stats in self.members.items():
+                if name not in votes:
+                    stats["missing"] += 1
+                    continue
+                vote = votes[name]
+                if vote is None:
+                    stats["errors"] += 1
+                    continue
+                stats["votes"] += 1
+                stats["pass"] += int(vote)
+                stats["agree"] += int(("PASS" if vote else "FAIL") == verdict)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出统计
+
+        Returns:
+            Dict[str, Any]: 结论分布、提前结束比例、全票一致比例及各成员的通过率与吻合率
+        """
+        with self._lock:
+            total = sum(self.decisions.values())
+            return {
+                "decisions": dict(self.decisions),
+                "early_decision_rate": round(self.early_decisions / total, 4) if total else None,
+                "avg_decision_latency": round(self.decision_latency / total, 3) if total else None,
+                "unanimous_rate": round(self.unanimous / self.completed, 4) if self.completed else None,
+                "members": {
+                    name: {
+                        "votes": stats["votes"],
+                        "errors": stats["errors"],
+                        "missing": stats["missing"],
+                        "pass_rate": round(stats["pass"] / stats["votes"], 4) if stats["votes"] else None,
+                        "agreement": round(stats["agree"] / stats["votes"], 4) if stats["votes"] else None,
+                    }
+                    for name, stats in self.members.items()
+                },
+            }
+
+
+class ReviewerEnsemble:
+    """审查组（与 KnowledgeReviewerAgent 的 process 接口相同）"""
+
+    def __init__(self, members: List[Tuple[str, Optional[str]]], quorum: int = 0):
+        """
+        初始化审查组
+
+        Args:
+            members (List[Tuple[str, Optional[str]]]): (模型, 提示词模板名) 列表，模板名为空时使用默认审查提示词
+            quorum (int): 法定票数，0 表示过半数
+        """
+        self.reviewers: List[KnowledgeReviewerAgent] = []
+        self.names: List[str] = []
+        for model, template in members:
+            self.reviewers.append(KnowledgeReviewerAgent(model, get_prompt(template) if template else None))
+            base = name = f"{model}/{template}" if template else model
+            suffix = 2
+            while name in self.names:
+                # 同一配置出现多次时按序号区分
+                name = f"{base}#{suffix}"
+                suffix += 1
+            self.names.append(name)
+        self.quorum = quorum if quorum > 0 else len(self.reviewers) // 2 + 1
+        self.quorum = min(self.quorum, len(self.reviewers))
+        self.stats = EnsembleStats(self.names)
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.pipeline_concurrency * len(self.reviewers), thread_name_prefix="reviewer"
+        )
+
+    def warm_up(self):
+        """预热：初始化各成员的模型提供方"""
+        for reviewer in self.reviewers:
+            reviewer.warm_up()
+
+    def process(self, input_data: str) -> Tuple[bool, str]:
+        """
+        并行审查，某一结论先达到法定票数即返回
+
+        Args:
+            input_data (str): 待审查的内容
+
+        Returns:
+            Tuple[bool, str]: 审查结果和首个投出该结论的成员的反馈
+        """
+        start = time.time()
+        futures: Dict[Future, str] = {}
+        for name, reviewer in zip(self.names, self.reviewers):
+            # 复制上下文，各成员的用量计入本次请求
+            futures[self._executor.submit(contextvars.copy_context().run, reviewer.process, input_data)] = name
+
+        votes: Dict[str, Optional[bool]] = {}
+        feedbacks: Dict[bool, str] = {}
+        errors: List[Exception] = []
+        pending = set(futures)
+        decision: Optional[bool] = None
+        while pending and decision is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                try:
+                    passed, feedback = future.result()
+                except RequestCancelled:
+                    # 工作流已取消，不再等待其他成员，也不计入统计
+                    for other in pending:
+                        other.cancel()
+                    raise
+                except Exception as e:
+                    votes[name] = None
+                    errors.append(e)
+                    continue
+                votes[name] = passed
+                feedbacks.setdefault(passed, feedback)
+            for verdict in (False, True):
+                if sum(1 for vote in votes.values() if vote is verdict) >= self.quorum:
+                    decision = verdict
+                    break
+
+        if decision is None:
+            if not feedbacks:
+                # 所有成员都出错
+                raise errors[0]
+            # 出错的成员使任何结论都凑不够法定票数时，按不通过处理
+            decision = False
+            feedbacks.setdefault(False, "审查组未达成一致，按不通过处理。")
+
+        verdict = "PASS" if decision else "FAIL"
+        early = bool(pending)
+        self.stats.record_decision(verdict, early, time.time() - start)
+        summary = "，".join(f"{name} {'-' if vote is None else ('PASS' if vote else 'FAIL')}" for name, vote in votes.items())
+        print(f"审查组结论: {verdict}（{summary}；法定票数 {self.quorum}/{len(self.reviewers)}"
+              f"{'，提前结束' if early else ''}）")
+        self._collect_stragglers(futures, votes, verdict, pending)
+        return decision, feedbacks[decision]
+
+    def _collect_stragglers(self, futures: Dict[Future, str], votes: Dict[str, Optional[bool]],
+                            verdict: str, pending: set):
+        """取消尚未开始的成员调用；已在执行的调用完成后计入一致性统计，被取消的成员计为缺席"""
+        for future in pending:
+            future.cancel()
+        remaining = [future for future in pending if not future.cancelled()]
+        if not remaining:
+            self.stats.record_votes(verdict, votes)
+            return
+
+        lock = threading.Lock()
+        state = {"left": len(remaining)}
+
+        def on_done(future: Future):
+            cancelled = False
+            try:
+                passed, _ = future.result()
+            except RequestCancelled:
+                cancelled = True
+            except Exception:
+                passed = None
+            with lock:
+                if not cancelled:
+                    votes[futures[future]] = passed
+                state["left"] -= 1
+                finished = state["left"] == 0
+            if finished:
+                self.stats.record_votes(verdict, votes)
+
+        for future in remaining:
+            future.add_done_callback(on_done)
@@ -26,20 +26,158 @@ from pydantic import Field
 
 
 class Settings(BaseSettings):
-    # DashScope API配置
-    dashscope_api_key: str = Field(..., env="DASHSCOPE_API_KEY")
+    # DashScope API配置（使用mock提供方时可留空）
+    dashscope_api_key: str = Field("", env="DASHSCOPE_API_KEY")
+    
+    # 模型提供方配置：dashscope（真实API）、openai（OpenAI兼容接口，如本地 llama.cpp / vLLM）或 mock（本地模拟，用于离线压测）
+    model_provider: str = Field("dashscope", env="MODEL_PROVIDER")
+    
+    # 按Agent选择模型提供方，留空时使用 MODEL_PROVIDER（如提示词优化和审查改用本地模型）
+    optimizer_provider: str = Field("", env="OPTIMIZER_PROVIDER")
+    generator_provider: str = Field("", env="GENERATOR_PROVIDER")
+    reviewer_provider: str = Field("", env="REVIEWER_PROVIDER")
+    
+    # OpenAI兼容接口配置（provider=openai 时使用），本地服务通常不需要API Key
+    # 默认为 llama.cpp 服务端口；本服务占用 SERVER_PORT（8000），本地模型服务需使用其他端口
+    openai_base_url: str = Field("http://localhost:8080/v1", env="OPENAI_BASE_URL")
+    openai_api_key: str = Field("", env="OPENAI_API_KEY")
     
     # 模型配置
     optimizer_model: str = Field("qwen-flash", env="OPTIMIZER_MODEL")
     generator_model: str = Field("qwen-plus-character", env="GENERATOR_MODEL")
     reviewer_model: str = Field("qwen-flash", env="REVIEWER_MODEL")
     
+    # 模型降级链（逗号分隔的 模型=备选1>备选2），调用失败或熔断时依次改用备选模型
+    model_fallbacks: str = Field("", env="MODEL_FALLBACKS")
+    
+    # 模型熔断：某个模型最近调用的失败率或慢调用比例过高时熔断，熔断期间直接改用降级链中的下一个模型
+    circuit_breaker_enabled: bool = Field(False, env="CIRCUIT_BREAKER_ENABLED")
+    circuit_window: int = Field(20, env="CIRCUIT_WINDOW")  # 每个模型统计最近多少次调用
+    circuit_min_calls: int = Field(10, env="CIRCUIT_MIN_CALLS")  # 窗口内至少多少次调用才判断是否熔断
+    circuit_error_rate: float = Field(0.5, env="CIRCUIT_ERROR_RATE")  # 失败比例达到该值时熔断
+    circuit_slow_call_seconds: float = Field(30.0, env="CIRCUIT_SLOW_CALL_SECONDS")  # 耗时超过该值计为慢调用，0 表示不按延迟判断
+    circuit_slow_rate: float = Field(0.8, env="CIRCUIT_SLOW_RATE")  # 慢调用比例达到该值时熔断
+    circuit_open_seconds: float = Field(30.0, env="CIRCUIT_OPEN_SECONDS")  # 熔断持续时间，之后放行一次探测调用
+    
+    # 超时与取消：模型调用按阶段超时（逗号分隔的 阶段=秒数，阶段为提示词模板名，未列出的阶段使用 MODEL_CALL_TIMEOUT）；
+    # 工作流超过 WORKFLOW_TIMEOUT 或客户端断开后不再发起新的模型调用
+    model_call_timeout: float = Field(120.0, env="MODEL_CALL_TIMEOUT")  # 0 表示不限制
+    stage_timeouts: str = Field("prompt_optimizer=30,knowledge_reviewer=60,knowledge_reviewer_checklist=60", env="STAGE_TIMEOUTS")
+    workflow_timeout: float = Field(300.0, env="WORKFLOW_TIMEOUT")  # 0 表示不限制
+    disconnect_poll_interval: float = Field(1.0, env="DISCONNECT_POLL_INTERVAL")  # 检查客户端是否断开的间隔（秒）
+    
+    # 对冲请求：模型调用超过该模型近期延迟的分位数仍未返回时，再发一次相同的调用，采用先返回的结果
+    hedge_enabled: bool = Field(False, env="HEDGE_ENABLED")
+    hedge_quantile: float = Field(0.9, env="HEDGE_QUANTILE")  # 以近期延迟的该分位数作为对冲等待时间
+    hedge_budget: float = Field(0.1, env="HEDGE_BUDGET")  # 对冲调用占调用总数的比例上限
+    hedge_min_samples: int = Field(20, env="HEDGE_MIN_SAMPLES")  # 模型至少有多少次延迟记录才开始对冲
+    
+    # 系统提示词前缀缓存：implicit（依赖模型服务自动的隐式缓存）/ explicit（为系统提示词显式标记
+    # cache_control，命中更稳定，但创建缓存的token按更高单价计费，且前缀需达到服务端的最小长度）
+    prompt_cache_mode: str = Field("implicit", env="PROMPT_CACHE_MODE")
+    
+    # 重试生成提示词的token预算（原始要求 + 之前的内容 + 审查反馈），超出时只保留反馈指出问题的片段；0 表示不限制
+    retry_context_budget: int = Field(1500, env="RETRY_CONTEXT_BUDGET")
+    
+    # 模型单价（逗号分隔的 模型=输入单价/输出单价，元/百万token），用于统计每个请求的成本；未列出的模型只统计token
+    model_pricing: str = Field("qwen-flash=0.15/1.5,qwen-plus=0.8/2,qwen-plus-character=0.8/2,qwen3-max=6/24",
+                               env="MODEL_PRICING")
+    cached_input_price_ratio: float = Field(0.4, env="CACHED_INPUT_PRICE_RATIO")  # 命中前缀缓存的输入token按输入单价的比例计费
+    
+    # 审查组：逗号分隔的多个审查成员（模型 或 模型/提示词模板名）并行审查，某一结论先达到法定票数即返回；
+    # 留空使用单个 REVIEWER_MODEL
+    review_ensemble: str = Field("", env="REVIEW_ENSEMBLE")
+    review_quorum: int = Field(0, env="REVIEW_QUORUM")  # 法定票数，0 表示过半数
+    
+    # 增量审查：重新生成后只审查新增、改动或被审查反馈引用的对话轮次，未改动且已确认无误的轮次沿用之前的结论
+    incremental_review_enabled: bool = Field(False, env="INCREMENTAL_REVIEW_ENABLED")
+    
+    # 并行候选（best-of-N）：首次生成时同时生成并审查多个候选，采用最先通过审查的一个，其余取消；1 表示串行
+    best_of_n: int = Field(1, env="BEST_OF_N")
+    best_of_n_max_cost: float = Field(0.0, env="BEST_OF_N_MAX_COST")  # 每个请求候选阶段的成本上限（元），按近期单个候选的平均成本折算候选数；0 表示不限制
+    best_of_n_fraction: float = Field(1.0, env="BEST_OF_N_FRACTION")  # 采用并行候选的请求比例，其余走串行流程作为延迟对照
+    
+    # 提示词优化快速路径：off（总是先优化）/ skip（输入已是完整提示词时跳过优化）/
+    # speculative（在 skip 基础上，较完整的输入让优化与首次生成并行，优化改动不大时直接采用生成结果）
+    optimizer_fast_path: str = Field("off", env="OPTIMIZER_FAST_PATH")
+    optimizer_skip_score: float = Field(0.7, env="OPTIMIZER_SKIP_SCORE")  # 完整度得分不低于该值时跳过优化
+    speculative_min_score: float = Field(0.4, env="SPECULATIVE_MIN_SCORE")  # 完整度得分不低于该值时推测执行
+    speculative_min_coverage: float = Field(0.5, env="SPECULATIVE_MIN_COVERAGE")  # 优化结果与原输入的重合度下限
+    
+    # 生成模型路由：简单主题用快速模型，复杂主题用 GENERATOR_MODEL
+    model_routing_enabled: bool = Field(False, env="MODEL_ROUTING_ENABLED")
+    generator_fast_model: str = Field("qwen-flash", env="GENERATOR_FAST_MODEL")
+    routing_threshold: float = Field(0.5, env="ROUTING_THRESHOLD")  # 初始阈值，复杂度得分低于阈值走快速模型
+    routing_target_pass_rate: float = Field(0.8, env="ROUTING_TARGET_PASS_RATE")  # 快速模型首次审查通过率目标
+    
+    # 模拟提供方配置（仅 MODEL_PROVIDER=mock 时生效）
+    mock_latency_distribution: str = Field("fixed", env="MOCK_LATENCY_DISTRIBUTION")  # fixed/uniform/normal/lognormal
+    mock_latency_ms: float = Field(0.0, env="MOCK_LATENCY_MS")  # 平均（lognormal时为中位数）延迟
+    mock_latency_jitter_ms: float = Field(0.0, env="MOCK_LATENCY_JITTER_MS")  # uniform半宽/normal标准差
+    mock_latency_sigma: float = Field(0.5, env="MOCK_LATENCY_SIGMA")  # lognormal长尾参数
+    mock_tail_rate: float = Field(0.0, env="MOCK_TAIL_RATE")  # 额外注入长尾延迟的调用比例
+    mock_tail_ms: float = Field(0.0, env="MOCK_TAIL_MS")  # 注入的长尾延迟
+    mock_error_rate: float = Field(0.0, env="MOCK_ERROR_RATE")
+    mock_degraded_models: str = Field("", env="MOCK_DEGRADED_MODELS")  # 逗号分隔，这些模型的调用总是失败（模拟上游故障）
+    mock_review_script: str = Field("PASS", env="MOCK_REVIEW_SCRIPT")  # 逗号分隔，循环使用，如 FAIL,PASS
+    mock_stream_token_ms: float = Field(0.0, env="MOCK_STREAM_TOKEN_MS")
+    mock_seed: int = Field(42, env="MOCK_SEED")
+    
     # 文件上传配置
     allowed_extensions: str = Field(".pdf,.docx", env="ALLOWED_EXTENSIONS")
     max_file_size: int = Field(10485760, env="MAX_FILE_SIZE")  # 10MB
     
     # 应用设置
     debug: bool = Field(True, env="DEBUG")
+    warmup_on_startup: bool = Field(False, env="WARMUP_ON_STARTUP")  # 启动时预热Agent与文档解析库
+    
+    # 服务部署配置（生产模式：python main.py --prod）
+    server_host: str = Field("0.0.0.0", env="SERVER_HOST")
+    server_port: int = Field(8000, env="SERVER_PORT")
+    server_workers: int = Field(0, env="SERVER_WORKERS")  # 0 表示按CPU核数
+    graceful_shutdown_timeout: int = Field(30, env="GRACEFUL_SHUTDOWN_TIMEOUT")  # 关闭时等待在途请求的秒数
+    pipeline_concurrency: int = Field(40, env="PIPELINE_CONCURRENCY")  # 每个worker并发执行的工作流数
+    shutdown_drain_delay: float = Field(5.0, env="SHUTDOWN_DRAIN_DELAY")  # 收到关闭信号后/health返回503、继续接收请求的秒数
+    
+    # 准入控制：工作流按优先级（请求头 X-Priority: interactive/batch）排队获得执行槽位，队列已满或排队超时时返回429
+    admission_enabled: bool = Field(False, env="ADMISSION_ENABLED")
+    admission_capacity: int = Field(0, env="ADMISSION_CAPACITY")  # 每个worker同时执行的工作流数，0 表示与 PIPELINE_CONCURRENCY 相同
+    admission_interactive_reserved: int = Field(4, env="ADMISSION_INTERACTIVE_RESERVED")  # 只留给交互请求的槽位数
+    admission_queue_interactive: int = Field(100, env="ADMISSION_QUEUE_INTERACTIVE")  # 交互请求队列长度上限
+    admission_queue_batch: int = Field(500, env="ADMISSION_QUEUE_BATCH")  # 批量请求队列长度上限
+    admission_max_wait_interactive: float = Field(30.0, env="ADMISSION_MAX_WAIT_INTERACTIVE")  # 交互请求最长排队秒数
+    admission_max_wait_batch: float = Field(600.0, env="ADMISSION_MAX_WAIT_BATCH")  # 批量请求最长排队秒数
+    
+    # API响应：精简模式只返回指定字段（请求参数 view=full/lean 或 fields=字段列表 可覆盖），响应按 gzip/brotli 压缩
+    response_mode: str = Field("full", env="RESPONSE_MODE")  # full 或 lean
+    lean_response_fields: str = Field("final_content,review_passed,retry_count,cached,coalesced,cancelled,turn",
+                                      env="LEAN_RESPONSE_FIELDS")
+    response_compression: bool = Field(True, env="RESPONSE_COMPRESSION")
+    compression_minimum_size: int = Field(1000, env="COMPRESSION_MINIMUM_SIZE")  # 小于该字节数的响应不压缩
+    upload_echo_chars: int = Field(500, env="UPLOAD_ECHO_CHARS")  # /upload 响应回显文档的前多少个字，0 表示不回显
+    
+    # 工作流结果缓存（多worker共享的SQLite文件）
+    result_cache_enabled: bool = Field(False, env="RESULT_CACHE_ENABLED")
+    result_cache_path: str = Field("cache/shared_cache.db", env="RESULT_CACHE_PATH")
+    result_cache_ttl: int = Field(86400, env="RESULT_CACHE_TTL")  # 秒
+    
+    # 语义近似缓存：表述不同但主题相同的请求复用已审查结果（需启用结果缓存）
+    semantic_cache_enabled: bool = Field(False, env="SEMANTIC_CACHE_ENABLED")
+    semantic_cache_path: str = Field("cache/semantic_index", env="SEMANTIC_CACHE_PATH")
+    semantic_cache_threshold: float = Field(0.5, env="SEMANTIC_CACHE_THRESHOLD")  # 余弦相似度阈值（同义问法实测不低于0.57）
+    
+    # 多轮辅导会话（/sessions）：会话文件保存在本机，多worker共享
+    session_store_path: str = Field("cache/sessions", env="SESSION_STORE_PATH")
+    session_ttl: int = Field(86400, env="SESSION_TTL")  # 会话闲置多久后过期（秒）
+    session_max_in_memory: int = Field(1000, env="SESSION_MAX_IN_MEMORY")  # 每个worker内存中保留的最近活跃会话数
+    session_window_turns: int = Field(3, env="SESSION_WINDOW_TURNS")  # 追问时作为上下文的最近轮数
+    session_context_budget: int = Field(1000, env="SESSION_CONTEXT_BUDGET")  # 追问上下文的token上限
+    session_followup_retries: int = Field(1, env="SESSION_FOLLOWUP_RETRIES")  # 追问回答审查未通过时的重试次数
+    
+    # 请求合并：相同主题的并发 /learn 请求共享一次工作流执行（启用结果缓存时跨worker合并）
+    singleflight_enabled: bool = Field(True, env="SINGLEFLIGHT_ENABLED")
+    singleflight_lease_ttl: float = Field(300.0, env="SINGLEFLIGHT_LEASE_TTL")  # 秒
+    singleflight_poll_interval: float = Field(0.2, env="SINGLEFLIGHT_POLL_INTERVAL")  # 秒
     
     class Config:
         env_file = ".env"
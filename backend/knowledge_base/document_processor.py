@@ -8,11 +8,21 @@
 
 import os
 from typing import List, Dict
-from pypdf import PdfReader
-from docx import Document
 from backend.config.settings import settings
 
 
+def _pdf_reader_class():
+    """延迟导入 pypdf.PdfReader，只有处理PDF时才加载"""
+    from pypdf import PdfReader
+    return PdfReader
+
+
+def _docx_document_class():
+    """延迟导入 docx.Document，只有处理DOCX时才加载"""
+    from docx import Document
+    return Document
+
+
 class DocumentProcessor:
     """文档处理器"""
     
@@ -21,6 +31,11 @@ class DocumentProcessor:
         self.allowed_extensions = settings.allowed_extensions.split(",")
         self.max_file_size = settings.max_file_size
     
+    def warm_up(self):
+        """预热：提前加载PDF和DOCX解析库"""
+        _pdf_reader_class()
+        _docx_document_class()
+    
     def validate_file(self, file_path: str) -> bool:
         """
         验证文件是否符合要求
@@ -58,7 +73,7 @@ class DocumentProcessor:
         """
         text = ""
         try:
-            reader = PdfReader(pdf_path)
+            reader = _pdf_reader_class()(pdf_path)
             for page in reader.pages:
                 text += page.extract_text() + "\n"
         except Exception as e:
@@ -78,7 +93,7 @@ class DocumentProcessor:
         """
         text = ""
         try:
-            doc = Document(docx_path)
+            doc = _docx_document_class()(docx_path)
             for paragraph in doc.paragraphs:
                 text += paragraph.text + "\n"
         except Exception as e:
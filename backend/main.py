@@ -5,27 +5,358 @@
 主应用入口文件
 """
 
+import argparse
+import asyncio
+import functools
 import os
+import signal
 import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Optional
 from dotenv import load_dotenv
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, Request, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, JSONResponse
 from pydantic import BaseModel
-import uvicorn
 
 # 添加项目根目录到Python路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from workflow import WorkflowManager
-from knowledge_base.document_processor import DocumentProcessor
-
 # 加载环境变量
 load_dotenv()
 
+from backend.utils.responses import LEAN_VIEW, FastJSONResponse, add_compression, resolve_view, shape_result
+
+# 组件在首次使用时才创建，避免导入本模块时加载模型SDK和文档解析库，缩短冷启动时间
+_workflow_manager = None
+_document_processor = None
+_singleflight = None
+_admission = None
+_components_lock = threading.Lock()
+
+
+def get_workflow_manager():
+    """获取工作流管理器（首次调用时创建）"""
+    global _workflow_manager
+    if _workflow_manager is None:
+        with _components_lock:
+            if _workflow_manager is None:
+                from workflow import WorkflowManager
+                _workflow_manager = WorkflowManager()
+    return _workflow_manager
+
+
+def get_document_processor():
+    """获取文档处理器（首次调用时创建）"""
+    global _document_processor
+    if _document_processor is None:
+        with _components_lock:
+            if _document_processor is None:
+                from knowledge_base.document_processor import DocumentProcessor
+                _document_processor = DocumentProcessor()
+    return _document_processor
+
+
+def get_singleflight():
+    """获取请求合并器（启用结果缓存时借助共享缓存跨worker合并）"""
+    global _singleflight
+    if _singleflight is None:
+        with _components_lock:
+            if _singleflight is None:
+                from backend.config.settings import settings
+                from backend.utils.shared_cache import get_shared_cache
+                from backend.utils.singleflight import SingleFlight
+                _singleflight = SingleFlight(
+                    shared_cache=get_shared_cache() if settings.result_cache_enabled else None,
+                    lease_ttl=settings.singleflight_lease_ttl,
+                    poll_interval=settings.singleflight_poll_interval
+                )
+    return _singleflight
+
+
+def get_admission():
+    """获取准入控制器（每个worker各自排队）"""
+    global _admission
+    if _admission is None:
+        with _components_lock:
+            if _admission is None:
+                from backend.config.settings import settings
+                from backend.utils.admission import BATCH, INTERACTIVE, AdmissionController
+                _admission = AdmissionController(
+                    capacity=settings.admission_capacity or settings.pipeline_concurrency,
+                    interactive_reserved=settings.admission_interactive_reserved,
+                    queue_limits={INTERACTIVE: settings.admission_queue_interactive, BATCH: settings.admission_queue_batch},
+                    max_waits={INTERACTIVE: settings.admission_max_wait_interactive, BATCH: settings.admission_max_wait_batch}
+                )
+    return _admission
+
+
+def _request_priority(http_request: Optional[Request]) -> str:
+    """请求的优先级：请求头 X-Priority 为 batch 时按批量请求排队，其余按交互请求"""
+    from backend.utils.admission import BATCH, INTERACTIVE
+    
+    if http_request is not None and http_request.headers.get("x-priority", "").strip().lower() == BATCH:
+        return BATCH
+    return INTERACTIVE
+
+
+def _rejected_response(error) -> JSONResponse:
+    """未被准入的请求：返回429并附 Retry-After"""
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(error.retry_after)},
+        content={"success": False, "error": str(error), "retry_after": error.retry_after}
+    )
+
+
+# 合并执行中的主题：取消范围与仍在等待结果的客户端数，所有客户端都断开后才取消工作流
+_topic_scopes = {}
+
+
+async def _await_client(http_request: Optional[Request], awaitable, on_disconnect) -> Any:
+    """
+    等待工作流结果，期间定期检查客户端是否断开
+    
+    客户端断开或本协程被取消时调用 on_disconnect(原因)；之后仍等待结果返回
+    （工作流收到取消后很快结束，合并执行时其他请求可能还在等待同一结果）
+    """
+    from backend.config.settings import settings
+    
+    task = asyncio.ensure_future(awaitable)
+    notified = False
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=settings.disconnect_poll_interval)
+            if not notified and not task.done() and http_request is not None and await http_request.is_disconnected():
+                notified = True
+                on_disconnect("客户端已断开")
+        return task.result()
+    except asyncio.CancelledError:
+        if not notified:
+            on_disconnect("任务已取消")
+        raise
+
+
+def _run_scoped(scope, func, *args):
+    """在工作线程中于取消范围内执行工作流"""
+    from backend.utils.cancellation import cancel_scope
+    
+    with cancel_scope(scope):
+        return _run_pipeline(func, *args)
+
+
+async def _run_in_pipeline_thread(scope, func, *args) -> Any:
+    """在工作流专用的线程数上限内于工作线程中执行工作流"""
+    from anyio.to_thread import run_sync
+    
+    return await run_sync(functools.partial(_run_scoped, scope, func, *args), limiter=_get_pipeline_limiter())
+
+
+async def _execute(priority: str, scope, func, *args) -> Any:
+    """启用准入控制时先按优先级排队获得执行槽位，再在工作线程中执行工作流"""
+    from backend.config.settings import settings
+    
+    if not settings.admission_enabled:
+        return await _run_in_pipeline_thread(scope, func, *args)
+    async with get_admission().slot(priority, scope):
+        return await _run_in_pipeline_thread(scope, func, *args)
+
+
+async def _process_topic(topic: str, http_request: Optional[Request] = None) -> dict:
+    """执行工作流；启用请求合并时，相同主题的并发请求共享一次执行；客户端断开后停止后续模型调用"""
+    from backend.config.settings import settings
+    from backend.utils.cancellation import CancelScope
+    
+    priority = _request_priority(http_request)
+    if not settings.singleflight_enabled:
+        scope = CancelScope(settings.workflow_timeout)
+        return await _await_client(
+            http_request,
+            _execute(priority, scope, get_workflow_manager().process_request, topic),
+            scope.cancel
+        )
+    
+    from backend.utils.topic_utils import normalize_topic
+    key = normalize_topic(topic)
+    entry = _topic_scopes.get(key)
+    if entry is None:
+        entry = _topic_scopes[key] = {"scope": CancelScope(settings.workflow_timeout), "waiters": 0}
+    entry["waiters"] += 1
+    waiting = [True]
+    
+    def leave(reason: str):
+        if waiting[0]:
+            waiting[0] = False
+            entry["waiters"] -= 1
+            if entry["waiters"] == 0:
+                entry["scope"].cancel(reason)
+    
+    async def run():
+        return await _execute(priority, entry["scope"], get_workflow_manager().process_request, topic)
+    
+    try:
+        result, shared = await _await_client(http_request, get_singleflight().do(key, run), leave)
+    finally:
+        if waiting[0]:
+            waiting[0] = False
+            entry["waiters"] -= 1
+        if entry["waiters"] == 0 and _topic_scopes.get(key) is entry:
+            del _topic_scopes[key]
+    if shared:
+        # 共享结果时复制一份，保留本请求自己的原始输入
+        result = dict(result, original_input=topic, coalesced=True)
+    return result
+
+
+def _process_turn(session_id: str, question: str):
+    """
+    在工作线程中处理会话追问（同一会话的追问串行执行）
+
+    Returns:
+        dict: 处理结果，会话不存在或已过期时返回 None
+    """
+    from backend.config.settings import settings
+    from backend.utils.session_store import get_session_store
+
+    store = get_session_store()
+    session = store.get(session_id)
+    if session is None:
+        return None
+    with session.lock:
+        history = session.context_window(settings.session_window_turns, settings.session_context_budget)
+        previous_answers = [turn["answer"] for turn in session.turns]
+        result = get_workflow_manager().process_followup(session.topic, history, question, previous_answers)
+        if result["review_passed"]:
+            store.add_turn(session, question, result["final_content"])
+        result["turn"] = len(session.turns)
+    return result
+
+
+def warm_up():
+    """
+    预热：提前创建组件并加载模型SDK和文档解析库
+
+    服务启动时（WARMUP_ON_STARTUP=true）或由部署脚本在接入流量前调用，
+    使首个请求不必承担初始化开销
+    """
+    get_workflow_manager().warm_up()
+    get_document_processor().warm_up()
+
+
+# 在途工作流计数，关闭服务时等待其执行完毕
+_inflight_pipelines = 0
+_inflight_condition = threading.Condition()
+_draining = False
+
+# 工作流专用的线程数上限，与其他同步处理共用的默认线程池互不占用（只在事件循环中创建和使用）
+_pipeline_limiter = None
+
+
+def _get_pipeline_limiter():
+    """获取工作流专用的线程数上限（首次调用时创建）"""
+    global _pipeline_limiter
+    if _pipeline_limiter is None:
+        from anyio import CapacityLimiter
+        from backend.config.settings import settings
+        
+        _pipeline_limiter = CapacityLimiter(settings.pipeline_concurrency)
+    return _pipeline_limiter
+
+
+def _install_drain_handlers(delay: float):
+    """
+    接管 uvicorn 的关闭信号处理：收到 SIGTERM/SIGINT 后先进入排空状态（/health 返回503），
+    继续接收请求 delay 秒以便负载均衡摘除流量，再交给 uvicorn 停止接收连接；排空期间再次收到信号时立即关闭
+
+    Args:
+        delay (float): 进入排空状态后继续接收请求的秒数
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # uvicorn 按版本用 loop.add_signal_handler 或 signal.signal 安装处理函数
+        handle = getattr(loop, "_signal_handlers", {}).get(sig)
+        if handle is not None:
+            proceed = functools.partial(handle._callback, *handle._args)
+            loop.add_signal_handler(sig, _begin_draining, loop, proceed, delay)
+            continue
+        original = signal.getsignal(sig)
+        if callable(original):
+            signal.signal(sig, lambda signum, frame, original=original: _begin_draining(
+                loop, functools.partial(original, signum, frame), delay))
+
+
+def _begin_draining(loop, proceed, delay: float):
+    """进入排空状态，delay 秒后在事件循环中执行 uvicorn 原有的关闭处理"""
+    global _draining
+    if _draining or delay <= 0:
+        _draining = True
+        proceed()
+        return
+    _draining = True
+    print(f"收到关闭信号，{delay:g} 秒后停止接收新请求")
+    loop.call_soon_threadsafe(loop.call_later, delay, proceed)
+
+
+def _run_pipeline(func, *args):
+    """在工作线程中执行工作流，并登记为在途工作流"""
+    global _inflight_pipelines
+    with _inflight_condition:
+        _inflight_pipelines += 1
+    try:
+        return func(*args)
+    finally:
+        with _inflight_condition:
+            _inflight_pipelines -= 1
+            _inflight_condition.notify_all()
+
+
+def _wait_for_pipelines(timeout: float) -> int:
+    """
+    等待在途工作流执行完毕
+
+    Args:
+        timeout (float): 最长等待秒数
+
+    Returns:
+        int: 超时后仍未完成的工作流数量
+    """
+    deadline = time.monotonic() + timeout
+    with _inflight_condition:
+        while _inflight_pipelines > 0:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _inflight_condition.wait(remaining)
+        return _inflight_pipelines
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时接管关闭信号并按配置预热，关闭时等待在途工作流排空"""
+    global _draining
+    from backend.config.settings import settings
+    
+    _install_drain_handlers(settings.shutdown_drain_delay)
+    if settings.warmup_on_startup:
+        await run_in_threadpool(warm_up)
+    yield
+    
+    _draining = True
+    if _inflight_pipelines:
+        print(f"正在等待 {_inflight_pipelines} 个在途工作流完成...")
+    remaining = await asyncio.to_thread(_wait_for_pipelines, settings.graceful_shutdown_timeout)
+    if remaining:
+        print(f"关闭超时，仍有 {remaining} 个工作流未完成")
+
+
 # 初始化FastAPI应用
-app = FastAPI(title="中学生知识辅助学习系统", version="1.0.0")
+app = FastAPI(title="中学生知识辅助学习系统", version="1.0.0", lifespan=lifespan,
+              default_response_class=FastJSONResponse)
 
 # 添加CORS中间件，允许所有来源
 app.add_middleware(
@@ -36,14 +367,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 初始化组件
-workflow_manager = WorkflowManager()
-document_processor = DocumentProcessor()
+# 响应压缩（gzip，安装 brotli-asgi 时优先 brotli）
+add_compression(app)
 
 # 数据模型
 class LearningRequest(BaseModel):
     topic: str
 
+class TurnRequest(BaseModel):
+    question: str
+
 # API路由
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
@@ -62,23 +395,104 @@ async def read_root():
     """
 
 @app.post("/learn")
-async def learn_topic(request: LearningRequest):
-    """处理学习请求"""
+async def learn_topic(request: LearningRequest, http_request: Request,
+                      view: Optional[str] = None, fields: Optional[str] = None):
+    """处理学习请求（view=lean 或 fields=字段列表 时只返回所需字段）"""
+    from backend.utils.admission import AdmissionRejected
+    
+    try:
+        result = await _process_topic(request.topic, http_request)
+        return {
+            "success": True,
+            "data": shape_result(result, view, fields)
+        }
+    except AdmissionRejected as e:
+        return _rejected_response(e)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@app.post("/sessions")
+async def create_session(request: LearningRequest, http_request: Request,
+                         view: Optional[str] = None, fields: Optional[str] = None):
+    """创建辅导会话：首轮与 /learn 相同，执行完整工作流（可命中缓存、合并请求）"""
+    from backend.utils.admission import AdmissionRejected
+    
     try:
-        result = workflow_manager.process_request(request.topic)
+        result = await _process_topic(request.topic, http_request)
+        if not result.get("review_passed"):
+            return {
+                "success": False,
+                "error": result.get("error") or "内容未通过审查，无法创建会话",
+                "data": shape_result(result, view, fields)
+            }
+        from backend.utils.session_store import get_session_store
+        session = await run_in_threadpool(
+            get_session_store().create, request.topic, request.topic, result["final_content"]
+        )
         return {
             "success": True,
-            "data": result
+            "session_id": session.session_id,
+            "data": shape_result(result, view, fields)
+        }
+    except AdmissionRejected as e:
+        return _rejected_response(e)
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
         }
+
+@app.post("/sessions/{session_id}/turn")
+async def session_turn(session_id: str, request: TurnRequest, http_request: Request,
+                       view: Optional[str] = None, fields: Optional[str] = None):
+    """会话追问：跳过提示词优化，以最近几轮对话为上下文生成新增内容，只审查新增内容"""
+    from backend.config.settings import settings
+    from backend.utils.admission import AdmissionRejected
+    from backend.utils.cancellation import CancelScope
+    
+    scope = CancelScope(settings.workflow_timeout)
+    try:
+        result = await _await_client(
+            http_request,
+            _execute(_request_priority(http_request), scope, _process_turn, session_id, request.question),
+            scope.cancel
+        )
+    except AdmissionRejected as e:
+        return _rejected_response(e)
     except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
+    if result is None:
+        return JSONResponse(status_code=404, content={"success": False, "error": "会话不存在或已过期"})
+    return {
+        "success": result["review_passed"] and "error" not in result,
+        "session_id": session_id,
+        "data": shape_result(result, view, fields)
+    }
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """查看会话的全部轮次"""
+    from backend.utils.session_store import get_session_store
+    
+    session = await run_in_threadpool(get_session_store().get, session_id)
+    if session is None:
+        return JSONResponse(status_code=404, content={"success": False, "error": "会话不存在或已过期"})
+    return {
+        "success": True,
+        "data": session.to_dict()
+    }
 
 @app.post("/upload")
-async def upload_knowledge(file: UploadFile = File(...)):
-    """上传知识库文件"""
+async def upload_knowledge(file: UploadFile = File(...), view: Optional[str] = None):
+    """上传知识库文件（回显文档开头的 UPLOAD_ECHO_CHARS 个字，view=lean 时不回显）"""
+    from backend.config.settings import settings
+    
     try:
         # 保存上传的文件
         file_path = f"uploads/{file.filename}"
@@ -89,36 +503,144 @@ async def upload_knowledge(file: UploadFile = File(...)):
             buffer.write(content)
         
         # 处理文档
-        processed_content = document_processor.process_document(file_path)
+        processed_content = await run_in_threadpool(get_document_processor().process_document, file_path)
         
-        return {
+        response = {
             "success": True,
             "filename": file.filename,
-            "content": processed_content[:500] + "..." if len(processed_content) > 500 else processed_content
+            "characters": len(processed_content)
         }
+        echo = settings.upload_echo_chars
+        if echo > 0 and resolve_view(view) != LEAN_VIEW:
+            response["content"] = processed_content[:echo] + "..." if len(processed_content) > echo else processed_content
+        return response
     except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
 
+@app.get("/admin/routing")
+async def routing_stats():
+    """生成模型路由的当前阈值和各路由统计（本worker）"""
+    router = get_workflow_manager().model_router
+    if router is None:
+        return {"enabled": False}
+    return dict(router.snapshot(), enabled=True)
+
+@app.get("/admin/reviewers")
+async def reviewer_stats():
+    """审查组的结论分布、提前结束比例和各成员与结论的吻合率（本worker）"""
+    from backend.agents.reviewer_ensemble import ReviewerEnsemble
+
+    reviewer = get_workflow_manager().knowledge_reviewer
+    if not isinstance(reviewer, ReviewerEnsemble):
+        return {"enabled": False}
+    return dict(reviewer.stats.snapshot(), enabled=True, quorum=reviewer.quorum)
+
+@app.get("/admin/circuits")
+async def circuit_stats():
+    """各模型熔断器的状态与降级链配置（本worker）"""
+    from backend.config.settings import settings
+    from backend.utils.circuit_breaker import breaker_snapshot, parse_fallbacks
+
+    return {
+        "enabled": settings.circuit_breaker_enabled,
+        "fallbacks": {model: list(chain) for model, chain in parse_fallbacks(settings.model_fallbacks).items()},
+        "models": breaker_snapshot(),
+    }
+
+@app.get("/admin/hedging")
+async def hedging_stats():
+    """各模型的对冲比例、对冲胜出比例和近期延迟分位数（本worker）"""
+    from backend.config.settings import settings
+    from backend.utils.hedging import hedger_snapshot
+
+    return {
+        "enabled": settings.hedge_enabled,
+        "quantile": settings.hedge_quantile,
+        "budget": settings.hedge_budget,
+        "models": hedger_snapshot(),
+    }
+
+@app.get("/admin/best-of-n")
+async def best_of_n_stats():
+    """并行候选与串行流程的延迟分位数对比及候选的胜出、取消情况（本worker）"""
+    from backend.config.settings import settings
+    from backend.utils.best_of_n import best_of_n_stats as stats
+
+    if settings.best_of_n <= 1:
+        return {"enabled": False}
+    return dict(stats.snapshot(), enabled=True, best_of_n=settings.best_of_n,
+                fraction=settings.best_of_n_fraction, max_cost=settings.best_of_n_max_cost)
+
+@app.get("/admin/admission")
+async def admission_stats():
+    """准入控制的执行槽位、各优先级的队列深度、准入与拒绝次数和排队时间分位数（本worker）"""
+    from backend.config.settings import settings
+
+    if not settings.admission_enabled:
+        return {"enabled": False}
+    return dict(get_admission().snapshot(), enabled=True)
+
+@app.get("/admin/prompts")
+async def prompt_stats():
+    """各Agent提示词模板的版本哈希和前缀缓存命中率（本worker）"""
+    from backend.agents.prompts import prompt_cache_stats
+    from backend.config.settings import settings
+
+    return {"cache_mode": settings.prompt_cache_mode, "agents": prompt_cache_stats.snapshot()}
+
+@app.get("/admin/usage")
+async def usage_stats():
+    """启动以来及最近一小时的token用量与成本，按阶段和模型分项（本worker）"""
+    from backend.utils.usage_tracker import usage_totals
+
+    return usage_totals.snapshot()
+
 @app.get("/health")
 async def health_check():
-    """健康检查接口"""
+    """健康检查接口（关闭排空期间返回503，便于负载均衡摘除流量）"""
+    if _draining:
+        return JSONResponse(status_code=503, content={"status": "draining"})
     return {"status": "healthy"}
 
 def main():
     """主函数"""
+    import uvicorn
+    from backend.config.settings import settings
+    
+    parser = argparse.ArgumentParser(description="中学生知识辅助学习系统Web服务")
+    parser.add_argument("--prod", action="store_true", help="生产模式：多worker、关闭自动重载")
+    parser.add_argument("--workers", type=int, default=settings.server_workers, help="worker进程数，0表示按CPU核数")
+    parser.add_argument("--host", default=settings.server_host, help="监听地址")
+    parser.add_argument("--port", type=int, default=settings.server_port, help="监听端口")
+    args = parser.parse_args()
+    
     print("中学生知识辅助学习系统")
     print("正在启动...")
     
     # 启动Web服务
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
+    if args.prod:
+        workers = args.workers or os.cpu_count() or 1
+        print(f"生产模式：{workers} 个worker，结果缓存{'已启用' if settings.result_cache_enabled else '未启用'}")
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            workers=workers,
+            reload=False,
+            timeout_graceful_shutdown=settings.graceful_shutdown_timeout
+        )
+    else:
+        # 开发模式每次重载都会关闭worker，不等待负载均衡摘除流量
+        os.environ["SHUTDOWN_DRAIN_DELAY"] = "0"
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            reload=True
+        )
 
 if __name__ == "__main__":
     main()
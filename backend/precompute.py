@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+课程主题预计算
+离线批量生成并审查课程主题的对话内容，写入服务共享的结果缓存（启用语义缓存时同时写入语义索引），
+使高峰时段的请求直接命中预计算结果，而不必实时调用模型
+
+主题列表为文本文件：每行一个主题，[学科] 行标记其后主题所属的学科，# 开头的行为注释。
+每批完成后把各主题的结果追加到检查点文件，中断后重新运行会跳过已完成的主题
+
+示例：
+    python backend/precompute.py backend/knowledge_base/curriculum_topics.txt
+    python backend/precompute.py topics.txt --workers 8 --batch-size 40
+    python backend/precompute.py topics.txt --retry-failed   # 重新生成上次未通过审查的主题
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config.settings import settings
+from backend.utils.shared_cache import SharedCache
+from backend.utils.topic_utils import normalize_topic
+from backend.workflow import WorkflowManager, result_cache_key
+
+
+DEFAULT_SUBJECT = "未分类"
+
+
+def load_curriculum(path: str) -> List[Tuple[str, str]]:
+    """
+    读取课程主题列表（归一化后相同的主题只保留第一个）
+
+    Args:
+        path (str): 主题列表文件路径
+
+    Returns:
+        List[Tuple[str, str]]: (学科, 主题) 列表
+    """
+    topics, seen = [], set()
+    subject = DEFAULT_SUBJECT
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                subject = line[1:-1].strip() or DEFAULT_SUBJECT
+                continue
+            key = normalize_topic(line)
+            if key and key not in seen:
+                seen.add(key)
+                topics.append((subject, line))
+    return topics
+
+
+class CurriculumPrecomputer:
+    """课程主题预计算"""
+
+    def __init__(self, curriculum_path: str, checkpoint_path: str, workers: int = 4,
+                 batch_size: int = 20, ttl: Optional[float] = None, verbose: bool = False):
+        """
+        初始化预计算
+
+        Args:
+            curriculum_path (str): 主题列表文件路径
+            checkpoint_path (str): 检查点文件路径（JSON Lines，每行一个主题的结果）
+            workers (int): 并发执行的工作流数
+            batch_size (int): 每批主题数，每批完成后写一次检查点
+            ttl (float, optional): 预计算结果的缓存有效期（秒），默认使用 RESULT_CACHE_TTL
+            verbose (bool): 是否输出工作流的逐步日志
+        """
+        self.curriculum_path = curriculum_path
+        self.checkpoint_path = checkpoint_path
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.verbose = verbose
+        self.topics = load_curriculum(curriculum_path)
+        self.cache = SharedCache(settings.result_cache_path, ttl if ttl is not None else settings.result_cache_ttl)
+        self.workflow_manager = WorkflowManager(result_cache=self.cache)
+        # 预计算为每个主题生成独立的结果，不复用相似主题；结束后统一写入语义索引
+        self.semantic_index = self.workflow_manager.semantic_index
+        self.workflow_manager.semantic_index = None
+        self.run_records: List[Dict[str, Any]] = []
+        self.elapsed = 0.0
+
+    def load_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        """
+        读取检查点
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 归一化主题到最近一次结果的映射
+        """
+        records = {}
+        if not os.path.exists(self.checkpoint_path):
+            return records
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 写入中途被中断的最后一行
+                    continue
+                records[normalize_topic(record["topic"])] = record
+        return records
+
+    def _append_checkpoint(self, records: List[Dict[str, Any]]):
+        """把一批结果追加到检查点文件"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_path)), exist_ok=True)
+        with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _is_cached(self, topic: str) -> bool:
+        """主题的结果是否已在结果缓存中"""
+        return self.cache.get(result_cache_key(topic)) is not None
+
+    def pending_topics(self, retry_failed: bool = False) -> List[Tuple[str, str]]:
+        """
+        需要生成的主题：不在结果缓存中，且（未指定 retry_failed 时）检查点中没有未通过的记录
+
+        Args:
+            retry_failed (bool): 是否重新生成检查点中未通过审查或出错的主题
+
+        Returns:
+            List[Tuple[str, str]]: (学科, 主题) 列表
+        """
+        checkpoint = self.load_checkpoint()
+        pending = []
+        for subject, topic in self.topics:
+            if self._is_cached(topic):
+                continue
+            record = checkpoint.get(normalize_topic(topic))
+            if record is not None and record["status"] != "passed" and not retry_failed:
+                continue
+            pending.append((subject, topic))
+        return pending
+
+    def _process_topic(self, subject: str, topic: str) -> Dict[str, Any]:
+        """生成并审查一个主题，返回检查点记录"""
+        start = time.time()
+        try:
+            result = self.workflow_manager.process_request(topic)
+        except Exception as e:
+            result = {"error": str(e), "review_passed": False, "retry_count": 0}
+        if "error" in result:
+            status = "error"
+        else:
+            status = "passed" if result.get("review_passed") else "failed"
+        return {
+            "topic": topic,
+            "subject": subject,
+            "status": status,
+            # 提示词优化成功后才进入生成-审查循环
+            "attempts": result.get("retry_count", 0) + 1 if result.get("optimized_prompt") else 0,
+            "elapsed": round(time.time() - start, 3),
+            "error": result.get("error", ""),
+            # 本主题实际消耗的token与成本（按模型、阶段分项）
+            "usage": {key: result.get("usage", {}).get(key, {}) for key in ("totals", "by_model", "by_stage")},
+            "finished_at": datetime.now().isoformat(timespec="seconds")
+        }
+
+    def run(self, retry_failed: bool = False) -> List[Dict[str, Any]]:
+        """
+        分批并行生成所有待生成的主题
+
+        Args:
+            retry_failed (bool): 是否重新生成检查点中未通过审查或出错的主题
+
+        Returns:
+            List[Dict[str, Any]]: 本次运行各主题的记录
+        """
+        pending = self.pending_topics(retry_failed)
+        total_batches = (len(pending) + self.batch_size - 1) // self.batch_size
+        print(f"课程主题 {len(self.topics)} 个，本次需要生成 {len(pending)} 个，"
+              f"共 {total_batches} 批（每批 {self.batch_size} 个，并发 {self.workers}）")
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for batch_index in range(total_batches):
+                batch = pending[batch_index * self.batch_size:(batch_index + 1) * self.batch_size]
+                batch_start = time.time()
+                # 并发工作流的逐步日志交织在一起难以阅读，默认不输出
+                output = contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(io.StringIO())
+                with output:
+                    records = list(executor.map(lambda item: self._process_topic(*item), batch))
+                self._append_checkpoint(records)
+                self.run_records.extend(records)
+                passed = sum(1 for record in records if record["status"] == "passed")
+                print(f"批次 {batch_index + 1}/{total_batches}：通过 {passed}/{len(records)}，"
+                      f"用时 {time.time() - batch_start:.1f}s")
+        self.elapsed = time.time() - start
+
+        self._index_semantic_topics()
+        return self.run_records
+
+    def _index_semantic_topics(self):
+        """启用语义缓存时，把已缓存的课程主题写入语义索引"""
+        if self.semantic_index is None:
+            return
+        cached_topics = [topic for _, topic in self.topics if self._is_cached(topic)]
+        added = self.semantic_index.add_many(cached_topics)
+        print(f"语义索引新增 {added} 个主题")
+
+    def build_report(self) -> Dict[str, Any]:
+        """
+        生成覆盖率与成本报告
+
+        覆盖率按运行结束时结果缓存中的实际状态统计（包括之前运行生成、尚未过期的结果）；
+        成本按本次运行各主题实际记录的token用量统计（按 MODEL_PRICING 折算）
+
+        Returns:
+            Dict[str, Any]: 报告
+        """
+        checkpoint = self.load_checkpoint()
+        by_subject: Dict[str, Dict[str, int]] = {}
+        cached_total = 0
+        uncovered = []
+        for subject, topic in self.topics:
+            stats = by_subject.setdefault(subject, {"total": 0, "cached": 0})
+            stats["total"] += 1
+            if self._is_cached(topic):
+                stats["cached"] += 1
+                cached_total += 1
+            else:
+                record = checkpoint.get(normalize_topic(topic))
+                uncovered.append({
+                    "topic": topic,
+                    "subject": subject,
+                    "status": record["status"] if record else "pending",
+                    "error": record.get("error", "") if record else ""
+                })
+        for stats in by_subject.values():
+            stats["coverage"] = round(stats["cached"] / stats["total"], 4)
+
+        # 按各主题实际记录的用量汇总
+        attempts = sum(record["attempts"] for record in self.run_records)
+        totals = {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0, "cost": 0.0}
+        by_model: Dict[str, Dict[str, Any]] = {}
+        by_stage: Dict[str, Dict[str, Any]] = {}
+        for record in self.run_records:
+            usage = record.get("usage", {})
+            for target, buckets in ((by_model, usage.get("by_model", {})), (by_stage, usage.get("by_stage", {}))):
+                for name, bucket in buckets.items():
+                    merged = target.setdefault(name, dict.fromkeys(totals, 0))
+                    for key in totals:
+                        merged[key] += bucket.get(key, 0)
+            for key in totals:
+                totals[key] += usage.get("totals", {}).get(key, 0)
+        for bucket in [totals, *by_model.values(), *by_stage.values()]:
+            bucket["cost"] = round(bucket["cost"], 6)
+
+        processed = len(self.run_records)
+        statuses = [record["status"] for record in self.run_records]
+        return {
+            "curriculum": self.curriculum_path,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "cache_path": settings.result_cache_path,
+            "coverage": {
+                "total": len(self.topics),
+                "cached": cached_total,
+                "coverage": round(cached_total / len(self.topics), 4) if self.topics else 0.0,
+                "by_subject": by_subject
+            },
+            "run": {
+                "processed": processed,
+                "passed": statuses.count("passed"),
+                "failed": statuses.count("failed"),
+                "errors": statuses.count("error"),
+                "elapsed_seconds": round(self.elapsed, 2),
+                "avg_topic_seconds": round(sum(record["elapsed"] for record in self.run_records) / processed, 2) if processed else 0.0
+            },
+            "cost": {
+                "generation_attempts": attempts,
+                "avg_attempts_per_topic": round(attempts / processed, 2) if processed else 0.0,
+                "totals": totals,
+                "avg_cost_per_topic": round(totals["cost"] / processed, 6) if processed else 0.0,
+                "by_model": by_model,
+                "by_stage": by_stage
+            },
+            "uncovered_topics": uncovered
+        }
+
+
+def print_report(report: Dict[str, Any]):
+    """打印报告摘要"""
+    coverage = report["coverage"]
+    run = report["run"]
+    cost = report["cost"]
+    print(f"\n{'=' * 50}")
+    print("预计算报告")
+    print(f"{'=' * 50}")
+    print(f"覆盖率: {coverage['cached']}/{coverage['total']} ({coverage['coverage']:.1%})")
+    for subject, stats in coverage["by_subject"].items():
+        print(f"  {subject}: {stats['cached']}/{stats['total']} ({stats['coverage']:.1%})")
+    print(f"本次生成: {run['processed']} 个主题，通过 {run['passed']}，未通过 {run['failed']}，出错 {run['errors']}，"
+          f"用时 {run['elapsed_seconds']}s")
+    totals = cost["totals"]
+    print(f"模型调用: 共 {totals['calls']} 次，平均每主题尝试 {cost['avg_attempts_per_topic']} 次，"
+          f"token 输入 {totals['input_tokens']}（缓存命中 {totals['cached_tokens']}）/ 输出 {totals['output_tokens']}，"
+          f"成本 {totals['cost']:.4f} 元")
+    for model, bucket in cost["by_model"].items():
+        print(f"  {model}: {bucket['calls']} 次，输入 {bucket['input_tokens']} / 输出 {bucket['output_tokens']} tokens，"
+              f"{bucket['cost']:.4f} 元")
+    if report["uncovered_topics"]:
+        print(f"未覆盖主题 {len(report['uncovered_topics'])} 个（详见报告文件）")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="离线预计算课程主题，写入服务共享的结果缓存")
+    parser.add_argument("curriculum", help="课程主题列表文件")
+    parser.add_argument("--workers", type=int, default=4, help="并发执行的工作流数")
+    parser.add_argument("--batch-size", type=int, default=20, help="每批主题数，每批完成后写一次检查点")
+    parser.add_argument("--checkpoint", default="cache/precompute_checkpoint.jsonl", help="检查点文件")
+    parser.add_argument("--report", default="cache/precompute_report.json", help="报告输出文件")
+    parser.add_argument("--ttl", type=float, default=None, help="预计算结果的缓存有效期（秒），默认使用 RESULT_CACHE_TTL")
+    parser.add_argument("--retry-failed", action="store_true", help="重新生成上次未通过审查或出错的主题")
+    parser.add_argument("--verbose", action="store_true", help="输出工作流的逐步日志")
+    args = parser.parse_args()
+
+    if not settings.result_cache_enabled:
+        print("提示：RESULT_CACHE_ENABLED 未启用，服务不会读取预计算结果")
+
+    precomputer = CurriculumPrecomputer(
+        args.curriculum, args.checkpoint, workers=args.workers,
+        batch_size=args.batch_size, ttl=args.ttl, verbose=args.verbose
+    )
+    precomputer.run(retry_failed=args.retry_failed)
+    report = precomputer.build_report()
+    print_report(report)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"报告已保存到: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+基础模型提供方类
+所有模型提供方（DashScope、本地模拟等）的基类
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class ProviderError(Exception):
+    """模型提供方返回的错误（模拟DashScope的非200响应）"""
+
+    def __init__(self, status_code: int, message: str):
+        """
+        初始化提供方错误
+
+        Args:
+            status_code (int): 状态码
+            message (str): 错误信息
+        """
+        super().__init__(f"API调用失败 (状态码: {status_code}): {message}")
+        self.status_code = status_code
+        self.message = message
+
+
+class BaseProvider(ABC):
+    """基础模型提供方类"""
+
+    # 提供方名称，与 Settings.model_provider 的取值对应
+    name = ""
+
+    @abstractmethod
+    def call(self, model: str, messages: List[Dict[str, str]], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        调用模型并返回完整响应
+
+        Args:
+            model (str): 模型名称
+            messages (List[Dict[str, str]]): 对话消息列表
+            timeout (float, optional): 请求超时（秒），超时抛出 TimeoutError 等异常；None 表示使用提供方默认值
+
+        Returns:
+            Dict[str, Any]: 包含 content 和 usage（input_tokens/output_tokens，
+                支持前缀缓存的提供方另有 cached_tokens）的响应
+        """
+        pass
+
+    def stream(self, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """
+        流式调用模型，逐段返回增量文本
+
+        默认实现退化为一次性返回完整内容，支持流式的提供方应覆盖此方法。
+
+        Args:
+            model (str): 模型名称
+            messages (List[Dict[str, str]]): 对话消息列表
+
+        Returns:
+            Iterator[str]: 增量文本片段
+        """
+        yield self.call(model, messages)["content"]
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+DashScope模型提供方
+通过 dashscope.Generation 调用通义千问系列模型
+"""
+
+from typing import Any, Dict, Iterator, List, Optional
+from backend.providers.base_provider import BaseProvider, ProviderError
+from backend.config.settings import settings
+
+
+class DashScopeProvider(BaseProvider):
+    """DashScope模型提供方"""
+
+    name = "dashscope"
+
+    def __init__(self):
+        """初始化DashScope提供方"""
+        from dashscope import Generation
+
+        self.generation = Generation
+        self.api_key = settings.dashscope_api_key
+
+    def _parse_content(self, output: Any) -> str:
+        """
+        从DashScope响应中提取文本内容
+
+        Args:
+            output: response.output
+
+        Returns:
+            str: 文本内容
+        """
+        # 检查响应结构
+        if hasattr(output, 'choices') and output.choices:
+            return output.choices[0].message.content
+        elif hasattr(output, 'text') and output.text is not None:
+            return output.text
+        else:
+            raise Exception(f"无法解析API响应结构: {output}")
+
+    def _prepare_messages(self, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        按前缀缓存模式处理消息
+
+        explicit 模式下把系统提示词改写为带 cache_control 的内容块，请求服务端为该前缀创建显式缓存；
+        implicit 模式下原样发送，由服务端对重复前缀自动缓存
+
+        Args:
+            messages (List[Dict[str, str]]): 对话消息列表
+
+        Returns:
+            List[Dict[str, Any]]: 发送给API的消息列表
+        """
+        if settings.prompt_cache_mode != "explicit":
+            return messages
+        prepared = []
+        for message in messages:
+            if message["role"] == "system":
+                message = {
+                    "role": "system",
+                    "content": [{"type": "text", "text": message["content"], "cache_control": {"type": "ephemeral"}}],
+                }
+            prepared.append(message)
+        return prepared
+
+    def _cached_tokens(self, usage: Any) -> int:
+        """
+        从用量信息中读取命中前缀缓存的输入token数（模型或模式不支持时为0）
+
+        Args:
+            usage: response.usage
+
+        Returns:
+            int: 命中缓存的token数
+        """
+        # DashScope的用量对象是dict子类，缺少的键不一定按属性访问抛 AttributeError，优先按dict读取
+        if isinstance(usage, dict):
+            details = usage.get("prompt_tokens_details")
+        else:
+            details = getattr(usage, "prompt_tokens_details", None)
+        if details is None:
+            return 0
+        if isinstance(details, dict):
+            return details.get("cached_tokens", 0) or 0
+        return getattr(details, "cached_tokens", 0) or 0
+
+    def call(self, model: str, messages: List[Dict[str, str]], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        调用DashScope模型
+
+        Args:
+            model (str): 模型名称
+            messages (List[Dict[str, str]]): 对话消息列表
+            timeout (float, optional): 请求超时（秒），作为 SDK 的 request_timeout 传入
+
+        Returns:
+            Dict[str, Any]: 包含 content 和 usage 的响应
+        """
+        kwargs = {"request_timeout": max(timeout, 1.0)} if timeout is not None else {}
+        response = self.generation.call(
+            model=model,
+            messages=self._prepare_messages(messages),
+            api_key=self.api_key,
+            **kwargs
+        )
+
+        if response.status_code != 200:
+            raise ProviderError(response.status_code, response.message)
+
+        usage = getattr(response, "usage", None)
+        return {
+            "content": self._parse_content(response.output),
+            "usage": {
+                "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+                "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+                "cached_tokens": self._cached_tokens(usage),
+            },
+        }
+
+    def stream(self, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """
+        流式调用DashScope模型（增量输出）
+
+        Args:
+            model (str): 模型名称
+            messages (List[Dict[str, str]]): 对话消息列表
+
+        Returns:
+            Iterator[str]: 增量文本片段
+        """
+        responses = self.generation.call(
+            model=model,
+            messages=self._prepare_messages(messages),
+            api_key=self.api_key,
+            result_format="message",
+            stream=True,
+            incremental_output=True
+        )
+
+        for response in responses:
+            if response.status_code != 200:
+                raise ProviderError(response.status_code, response.message)
+            yield self._parse_content(response.output)
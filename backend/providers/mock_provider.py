@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟模型提供方
+离线模拟DashScope的响应，用于压测和无网络环境下的开发调试：
+- 按脚本返回 PASS/FAIL 审查结果
+- 可配置的延迟分布（fixed/uniform/normal/lognormal）
+- 按概率注入错误（模拟 429/500/503）
+- 支持逐token流式输出
+- 模拟系统提示词前缀缓存（同一模型、相同系统提示词在有效期内再次调用时命中）
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from backend.providers.base_provider import BaseProvider, ProviderError
+from backend.config.settings import settings
+
+
+# 注入错误时随机选用的状态码及对应信息
+MOCK_ERRORS = [
+    (429, "Requests rate limit exceeded, please try again later."),
+    (500, "Internal server error."),
+    (503, "Service temporarily unavailable."),
+]
+
+# 评分维度（与 batch_tests 的评分提示词保持一致）
+MOCK_SCORE_DIMENSIONS = ["易理解性", "启发性", "趣味性", "完整性", "实用性"]
+
+# 评分提示词中回答内容的位置：单条评分的回答后接评分标准，批量评分的回答后接下一条回答或评分标准
+MOCK_ANSWER_PATTERN = r"问题：.*?\n+回答：\n(.*?)\n\n(?=请从以下)"
+MOCK_BATCH_ANSWER_PATTERN = r"【回答(\d+)】\n问题：.*?\n回答：\n(.*?)\n\n(?=【回答\d+】|请从以下)"
+
+# 模拟的前缀缓存有效期（秒），与服务端缓存的常见有效期一致
+MOCK_PREFIX_CACHE_TTL = 300.0
+
+
+class MockProvider(BaseProvider):
+    """本地模拟模型提供方"""
+
+    name = "mock"
+
+    def __init__(self):
+        """初始化模拟提供方"""
+        self.latency_distribution = settings.mock_latency_distribution
+        self.latency_ms = settings.mock_latency_ms
+        self.latency_jitter_ms = settings.mock_latency_jitter_ms
+        self.latency_sigma = settings.mock_latency_sigma
+        self.tail_rate = settings.mock_tail_rate
+        self.tail_ms = settings.mock_tail_ms
+        self.error_rate = settings.mock_error_rate
+        self.degraded_models = {name.strip() for name in settings.mock_degraded_models.split(",") if name.strip()}
+        self.stream_token_ms = settings.mock_stream_token_ms
+        self.review_script = [
+            item.strip().upper() for item in settings.mock_review_script.split(",") if item.strip()
+        ] or ["PASS"]
+
+        self._rng = random.Random(settings.mock_seed)
+        self._lock = threading.Lock()
+        self._review_index = 0
+        self._prefix_cache: Dict[str, float] = {}
+
+    def sample_latency(self) -> float:
+        """
+        按配置的分布采样一次调用延迟
+
+        Returns:
+            float: 延迟（秒）
+        """
+        mean = self.latency_ms
+        with self._lock:
+            if self.latency_distribution == "uniform":
+                value = self._rng.uniform(mean - self.latency_jitter_ms, mean + self.latency_jitter_ms)
+            elif self.latency_distribution == "normal":
+                value = self._rng.gauss(mean, self.latency_jitter_ms)
+            elif self.latency_distribution == "lognormal":
+                # 以 latency_ms 为中位数，sigma 控制长尾
+                value = mean * self._rng.lognormvariate(0.0, self.latency_sigma)
+            else:
+                value = mean
+            if self.tail_rate > 0 and self._rng.random() < self.tail_rate:
+                # 注入的长尾：少数调用额外等待（模拟上游排队或慢节点）
+                value += self.tail_ms
+        return max(value, 0.0) / 1000.0
+
+    def _maybe_fail(self, model: str):
+        """按配置的错误率注入错误，模拟故障的模型总是失败"""
+        if model in self.degraded_models:
+            raise ProviderError(503, "Service temporarily unavailable.")
+        if self.error_rate <= 0:
+            return
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+            status_code, message = self._rng.choice(MOCK_ERRORS)
+        if failed:
+            raise ProviderError(status_code, message)
+
+    def _next_review_verdict(self) -> str:
+        """按脚本循环取下一个审查结果"""
+        with self._lock:
+            verdict = self.review_script[self._review_index % len(self.review_script)]
+            self._review_index += 1
+        return verdict
+
+    def _digest(self, text: str) -> int:
+        """根据文本计算稳定的整数摘要，保证相同输入得到相同输出"""
+        return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+
+    def _scores(self, answer: str) -> Dict[str, Any]:
+        """根据回答内容给出稳定的模拟评分"""
+        seed = self._digest(answer.strip())
+        scores: Dict[str, Any] = {dim: 6 + (seed >> (i * 3)) % 5 for i, dim in enumerate(MOCK_SCORE_DIMENSIONS)}
+        scores["评语"] = "模拟评分"
+        return scores
+
+    def _render(self, messages: List[Dict[str, str]]) -> str:
+        """
+        根据系统提示词识别调用场景，生成对应的模拟内容
+
+        Args:
+            messages (List[Dict[str, str]]): 对话消息列表
+
+        Returns:
+            str: 模拟的模型输出
+        """
+        system_prompt = ""
+        user_prompt = ""
+        for message in messages:
+            if message["role"] == "system":
+                system_prompt = message["content"]
+            elif message["role"] == "user":
+                user_prompt = message["content"]
+
+        if "[PASS|FAIL]" in system_prompt:
+            if self._next_review_verdict() == "PASS":
+                return "PASS\n内容通过审查，可以发布。"
+            return ("FAIL\n问题：部分表述不够准确\n"
+                    "错误：对话中的概念解释存在偏差\n"
+                    "建议：请核实相关概念后重新表述")
+
+        if "提示词优化" in system_prompt:
+            topic = user_prompt.split("：", 1)[-1]
+            return (f"请以师生对话的形式，向中学生启发式地讲解“{topic}”。要求：\n"
+                    "1. 使用生活化的类比\n2. 通过提问引导学生思考\n3. 确保知识点准确")
+
+        if "中学教师" in system_prompt and "对话" in system_prompt:
+            topic = user_prompt.split("：", 1)[-1][:50]
+            return (f"老师：同学们，今天我们来聊聊“{topic}”。你们先想一想，生活中哪里见过它？\n"
+                    "学生：好像在课本上见过，但不太明白为什么。\n"
+                    "老师：很好！那我们从一个简单的问题开始：如果换一种情况，结果会怎样？\n"
+                    "学生：我猜结果会不一样。\n"
+                    "老师：没错，这正是理解它的关键。")
+
+        prompt = user_prompt or system_prompt
+        if "JSON数组" in prompt and "评分" in prompt:
+            # 批量评分：按【回答N】逐条给出评分，与单条评分对同一回答给出相同分数
+            items = []
+            for answer_id, answer in re.findall(MOCK_BATCH_ANSWER_PATTERN, prompt, re.S):
+                scores = {"id": int(answer_id)}
+                scores.update(self._scores(answer))
+                items.append(scores)
+            return json.dumps(items, ensure_ascii=False)
+
+        if "JSON" in prompt and "评分" in prompt:
+            match = re.search(MOCK_ANSWER_PATTERN, prompt, re.S)
+            scores = self._scores(match.group(1) if match else prompt)
+            scores["总分"] = sum(scores[dim] for dim in MOCK_SCORE_DIMENSIONS)
+            return json.dumps(scores, ensure_ascii=False)
+
+        if "中学生会问的问题" in prompt:
+            return "\n".join([
+                "为什么天空是蓝色的", "光合作用是怎么进行的", "勾股定理是什么",
+                "为什么冰块会浮在水面上", "细菌和病毒有什么区别", "杠杆原理有哪些应用",
+                "温度计里的液体为什么会热胀冷缩", "三角形的内角和为什么是180度",
+            ])
+
+        return f"模拟回答：{prompt[:100]}"
+
+    def _prefix_cached_tokens(self, model: str, messages: List[Dict[str, str]]) -> int:
+        """
+        模拟前缀缓存：首条系统提示词在有效期内被同一模型处理过即命中
+
+        Args:
+            model (str): 模型名称
+            messages (List[Dict[str, str]]): 对话消息列表
+
+        Returns:
+            int: 命中缓存的token数（未命中为0）
+        """
+        if not messages or messages[0]["role"] != "system":
+            return 0
+        prefix = messages[0]["content"]
+        key = f"{model}:{hashlib.md5(prefix.encode('utf-8')).hexdigest()}"
+        now = time.monotonic()
+        with self._lock:
+            hit = self._prefix_cache.get(key, 0.0) > now
+            self._prefix_cache[key] = now + MOCK_PREFIX_CACHE_TTL
+        return len(prefix) if hit else 0
+
+    def _usage(self, model: str, messages: List[Dict[str, str]], content: str) -> Dict[str, int]:
+        """按字符数近似估算token用量（中文约一字一token）"""
+        return {
+            "input_tokens": sum(len(message["content"]) for message in messages),
+            "output_tokens": len(content),
+            "cached_tokens": self._prefix_cached_tokens(model, messages),
+        }
+
+    def call(self, model: str, messages: List[Dict[str, str]], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        模拟一次完整的模型调用
+
+        Args:
+            model (str): 模型名称
+            messages (List[Dict[str, str]]): 对话消息列表
+            timeout (float, optional): 请求超时（秒），采样延迟超过超时时等待超时后抛出 TimeoutError
+
+        Returns:
+            Dict[str, Any]: 包含 content 和 usage 的响应
+        """
+        latency = self.sample_latency()
+        if timeout is not None and latency > timeout:
+            time.sleep(max(timeout, 0.0))
+            raise TimeoutError(f"Request timed out after {timeout:g}s")
+        time.sleep(latency)
+        self._maybe_fail(model)
+        content = self._render(messages)
+        return {"content": content, "usage": self._usage(model, messages, content)}
+
+    def stream(self, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """
+        模拟流式调用：首token前等待采样延迟，之后逐token输出
+
+        Args:
+            model (str): 模型名称
+            messages (List[Dict[str, str]]): 对话消息列表
+
+        Returns:
+            Iterator[str]: 增量文本片段
+        """
+        time.sleep(self.sample_latency())
+        self._maybe_fail(model)
+        content = self._render(messages)
+        # 中文按两个字符近似一个token
+        for start in range(0, len(content), 2):
+            if self.stream_token_ms > 0:
+                time.sleep(self.stream_token_ms / 1000.0)
+            yield content[start:start + 2]
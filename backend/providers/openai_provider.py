@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OpenAI兼容模型提供方
+通过 /chat/completions 接口调用任何OpenAI兼容的服务，如本地 llama.cpp、vLLM、Ollama，
+适合把提示词优化、审查等轻量阶段交给本地模型
+"""
+
+import json
+from typing import Any, Dict, Iterator, List, Optional
+from backend.providers.base_provider import BaseProvider, ProviderError
+from backend.config.settings import settings
+
+
+# 建立连接的超时（秒），本地服务未启动时尽快失败
+CONNECT_TIMEOUT = 10.0
+
+
+class OpenAIProvider(BaseProvider):
+    """OpenAI兼容模型提供方"""
+
+    name = "openai"
+
+    def __init__(self):
+        """初始化OpenAI兼容提供方（连接池在提供方内共享）"""
+        import httpx
+
+        self.httpx = httpx
+        self.base_url = settings.openai_base_url.rstrip("/")
+        headers = {"Content-Type": "application/json"}
+        if settings.openai_api_key:
+            headers["Authorization"] = f"Bearer {settings.openai_api_key}"
+        self.client = httpx.Client(
+            base_url=self.base_url,
+            headers=headers,
+            timeout=httpx.Timeout(None, connect=CONNECT_TIMEOUT),
+        )
+
+    def _timeout(self, timeout: Optional[float]) -> Any:
+        """
+        构造单次请求的超时
+
+        Args:
+            timeout (float, optional): 请求超时（秒），None 表示不限制
+
+        Returns:
+            httpx.Timeout: 请求超时
+        """
+        if timeout is None:
+            return self.httpx.Timeout(None, connect=CONNECT_TIMEOUT)
+        return self.httpx.Timeout(timeout, connect=min(timeout, CONNECT_TIMEOUT))
+
+    def _raise_for_status(self, response: Any):
+        """
+        非200响应转换为 ProviderError（4xx 不计入熔断统计，与DashScope一致）
+
+        Args:
+            response: httpx 响应
+        """
+        if response.status_code == 200:
+            return
+        try:
+            error = response.json().get("error") or {}
+            message = error.get("message", "") if isinstance(error, dict) else str(error)
+        except Exception:
+            message = ""
+        raise ProviderError(response.status_code, message or response.text[:200])
+
+    def _cached_tokens(self, usage: Dict[str, Any]) -> int:
+        """
+        读取命中前缀缓存的输入token数（服务端不返回时为0）
+
+        Args:
+            usage (Dict[str, Any]): 响应中的 usage
+
+        Returns:
+            int: 命中缓存的token数
+        """
+        details = usage.get("prompt_tokens_details") or {}
+        return details.get("cached_tokens", 0) or 0
+
+    def call(self, model: str, messages: List[Dict[str, str]], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        调用OpenAI兼容模型
+
+        Args:
+            model (str): 模型名称（服务端加载的模型名）
+            messages (List[Dict[str, str]]): 对话消息列表
+            timeout (float, optional): 请求超时（秒），超时抛出 TimeoutError
+
+        Returns:
+            Dict[str, Any]: 包含 content 和 usage 的响应
+        """
+        try:
+            response = self.client.post(
+                "/chat/completions",
+                json={"model": model, "messages": messages},
+                timeout=self._timeout(timeout),
+            )
+        except self.httpx.TimeoutException as e:
+            raise TimeoutError(f"模型调用超时: {e}")
+
+        self._raise_for_status(response)
+        data = response.json()
+        try:
+            content = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise Exception(f"无法解析API响应结构: {data}")
+
+        usage = data.get("usage") or {}
+        return {
+            "content": content or "",
+            "usage": {
+                "input_tokens": usage.get("prompt_tokens", 0) or 0,
+                "output_tokens": usage.get("completion_tokens", 0) or 0,
+                "cached_tokens": self._cached_tokens(usage),
+            },
+        }
+
+    def stream(self, model: str, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """
+        流式调用OpenAI兼容模型（解析 SSE 增量输出）
+
+        Args:
+            model (str): 模型名称
+            messages (List[Dict[str, str]]): 对话消息列表
+
+        Returns:
+            Iterator[str]: 增量文本片段
+        """
+        with self.client.stream(
+            "POST",
+            "/chat/completions",
+            json={"model": model, "messages": messages, "stream": True},
+        ) as response:
+            if response.status_code != 200:
+                response.read()
+                self._raise_for_status(response)
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                choices = json.loads(payload).get("choices") or []
+                if not choices:
+                    continue
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
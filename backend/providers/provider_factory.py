@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+模型提供方工厂
+根据名称创建并缓存模型提供方实例
+"""
+
+import threading
+from typing import Dict, Optional
+from backend.providers.base_provider import BaseProvider
+from backend.config.settings import settings
+
+
+_providers: Dict[str, BaseProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name: Optional[str] = None) -> BaseProvider:
+    """
+    获取模型提供方实例（同名提供方在进程内共享）
+
+    Args:
+        name (str, optional): 提供方名称，默认使用 Settings.model_provider
+
+    Returns:
+        BaseProvider: 模型提供方实例
+    """
+    name = (name or settings.model_provider).lower()
+
+    with _providers_lock:
+        if name not in _providers:
+            if name == "dashscope":
+                from backend.providers.dashscope_provider import DashScopeProvider
+                _providers[name] = DashScopeProvider()
+            elif name == "openai":
+                from backend.providers.openai_provider import OpenAIProvider
+                _providers[name] = OpenAIProvider()
+            elif name == "mock":
+                from backend.providers.mock_provider import MockProvider
+                _providers[name] = MockProvider()
+            else:
+                raise ValueError(f"不支持的模型提供方: {name}")
+        return _providers[name]
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+请求准入控制
+工作流按优先级（交互请求优先于批量请求）排队获得执行槽位，一部分槽位只留给交互请求，
+批量请求只在交互请求没有排队时使用剩余的槽位；队列有上限，队列已满或排队超时时立即拒绝，
+并按近期工作流耗时估算建议的重试等待时间。只在事件循环中使用（每个worker各自排队）
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from backend.utils.stats import percentile
+from backend.utils.cancellation import CancelScope, RequestCancelled
+
+
+# 优先级类别，按调度顺序排列
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+# 每个类别保留的最近排队时间记录数
+WAIT_WINDOW = 500
+
+# 工作流耗时的指数滑动平均系数
+SERVICE_TIME_ALPHA = 0.2
+
+# 建议的重试等待时间上限（秒）
+MAX_RETRY_AFTER = 120
+
+# 排队期间检查取消的间隔（秒）
+CANCEL_POLL_INTERVAL = 1.0
+
+
+class AdmissionRejected(Exception):
+    """请求未被准入（队列已满或排队超时）"""
+
+    def __init__(self, reason: str, retry_after: int):
+        """
+        初始化
+
+        Args:
+            reason (str): 拒绝原因
+            retry_after (int): 建议的重试等待时间（秒）
+        """
+        super().__init__(f"服务繁忙（{reason}），请 {retry_after} 秒后重试")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """按优先级排队的工作流准入控制"""
+
+    def __init__(self, capacity: int, interactive_reserved: int,
+                 queue_limits: Dict[str, int], max_waits: Dict[str, float]):
+        """
+        初始化
+
+        Args:
+            capacity (int): 同时执行的工作流数
+            interactive_reserved (int): 只留给交互请求的执行槽位数（至少留一个槽位给批量请求）
+            queue_limits (Dict[str, int]): 各优先级的队列长度上限
+            max_waits (Dict[str, float]): 各优先级的最长排队时间（秒）
+        """
+        self.capacity = max(1, capacity)
+        self.interactive_reserved = min(max(0, interactive_reserved), self.capacity - 1)
+        self.queue_limits = queue_limits
+        self.max_waits = max_waits
+        self.in_flight = {priority: 0 for priority in PRIORITIES}
+        self.service_time: Optional[float] = None
+        self._queues: Dict[str, Deque[asyncio.Future]] = {priority: deque() for priority in PRIORITIES}
+        self._waits: Dict[str, Deque[float]] = {priority: deque(maxlen=WAIT_WINDOW) for priority in PRIORITIES}
+        self._counters = {
+            priority: {"admitted": 0, "rejected_full": 0, "rejected_timeout": 0, "cancelled": 0, "max_queued": 0}
+            for priority in PRIORITIES
+        }
+
+    def _slots(self, priority: str) -> int:
+        """该优先级可以使用的执行槽位数"""
+        return self.capacity if priority == INTERACTIVE else self.capacity - self.interactive_reserved
+
+    def _can_run(self, priority: str) -> bool:
+        """该优先级现在是否有空闲槽位"""
+        return sum(self.in_flight.values()) < self._slots(priority)
+
+    def _dispatch(self):
+        """按优先级把空闲槽位交给排队中的请求"""
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and self._can_run(priority):
+                waiter = queue.popleft()
+                if waiter.done():
+                    continue
+                self.in_flight[priority] += 1
+                waiter.set_result(None)
+
+    def retry_after(self, priority: str) -> int:
+        """
+        估算该优先级的请求需要等待多久才能执行
+
+        Args:
+            priority (str): 优先级
+
+        Returns:
+            int: 建议的重试等待时间（秒）
+        """
+        ahead = len(self._queues[priority])
+        if priority == BATCH:
+            ahead += len(self._queues[INTERACTIVE])
+        service_time = self.service_time or 1.0
+        seconds = math.ceil(service_time * (ahead + 1) / self._slots(priority))
+        return min(max(seconds, 1), MAX_RETRY_AFTER)
+
+    async def acquire(self, priority: str, scope: Optional[CancelScope] = None):
+        """
+        排队获得一个执行槽位
+
+        Args:
+            priority (str): 优先级
+            scope (CancelScope, optional): 请求的取消范围，排队期间被取消时放弃排队
+
+        Returns:
+            None: 获得槽位后返回；队列已满或排队超时时抛出 AdmissionRejected，被取消时抛出 RequestCancelled
+        """
+        counters = self._counters[priority]
+        queue = self._queues[priority]
+        if not queue and self._can_run(priority):
+            self.in_flight[priority] += 1
+            counters["admitted"] += 1
+            self._waits[priority].append(0.0)
+            return
+        if len(queue) >= self.queue_limits[priority]:
+            counters["rejected_full"] += 1
+            raise AdmissionRejected("队列已满", self.retry_after(priority))
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        counters["max_queued"] = max(counters["max_queued"], len(queue))
+        start = time.monotonic()
+        deadline = start + self.max_waits[priority]
+        try:
+            while not waiter.done():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    counters["rejected_timeout"] += 1
+                    raise AdmissionRejected("排队超时", self.retry_after(priority))
+                await asyncio.wait({waiter}, timeout=min(remaining, CANCEL_POLL_INTERVAL))
+                if not waiter.done() and scope is not None and scope.cancelled:
+                    counters["cancelled"] += 1
+                    raise RequestCancelled(scope.reason)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # 刚好获得槽位，归还给下一个请求
+                self.in_flight[priority] -= 1
+                self._dispatch()
+            else:
+                waiter.cancel()
+                if waiter in queue:
+                    queue.remove(waiter)
+            raise
+        counters["admitted"] += 1
+        self._waits[priority].append(time.monotonic() - start)
+
+    def release(self, priority: str, service_time: float):
+        """
+        归还执行槽位
+
+        Args:
+            priority (str): 优先级
+            service_time (float): 本次占用槽位的时间（秒），用于估算重试等待时间
+        """
+        self.in_flight[priority] -= 1
+        if self.service_time is None:
+            self.service_time = service_time
+        else:
+            self.service_time += SERVICE_TIME_ALPHA * (service_time - self.service_time)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: str, scope: Optional[CancelScope] = None) -> AsyncIterator[None]:
+        """
+        在执行槽位内执行
+
+        Args:
+            priority (str): 优先级
+            scope (CancelScope, optional): 请求的取消范围
+
+        Returns:
+            AsyncIterator[None]: 获得槽位后进入
+        """
+        await self.acquire(priority, scope)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(priority, time.monotonic() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出统计
+
+        Returns:
+            Dict[str, Any]: 槽位配置、执行中的工作流数、平均耗时及各优先级的队列深度、准入与拒绝次数和排队时间分位数
+        """
+        classes = {}
+        for priority in PRIORITIES:
+            waits = list(self._waits[priority])
+            report = dict(
+                self._counters[priority],
+                queued=len(self._queues[priority]),
+                queue_limit=self.queue_limits[priority],
+                max_wait=self.max_waits[priority],
+                in_flight=self.in_flight[priority],
+                retry_after=self.retry_after(priority),
+            )
+            for name, q in (("wait_p50", 0.5), ("wait_p95", 0.95), ("wait_p99", 0.99)):
+                value = percentile(waits, q)
+                report[name] = round(value, 3) if value is not None else None
+            classes[priority] = report
+        return {
+            "capacity": self.capacity,
+            "interactive_reserved": self.interactive_reserved,
+            "in_flight": sum(self.in_flight.values()),
+            "avg_service_seconds": round(self.service_time, 3) if self.service_time is not None else None,
+            "classes": classes,
+        }
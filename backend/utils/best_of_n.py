@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+并行候选（best-of-N）统计
+记录并行候选与串行生成-审查流程的延迟分布，用于比较两者的p95延迟；
+同时记录单个候选（一次生成加审查）的平均成本，供按成本上限折算候选数
+"""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from backend.utils.stats import percentile
+
+
+# 每种模式保留的最近延迟记录数
+STATS_WINDOW = 500
+
+PARALLEL_MODE = "parallel"
+SERIAL_MODE = "serial"
+
+
+class BestOfNStats:
+    """并行候选与串行流程的延迟对比（本进程）"""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        """
+        初始化统计
+
+        Args:
+            window (int): 每种模式保留的最近记录数
+        """
+        self.latencies: Dict[str, Deque[float]] = {
+            PARALLEL_MODE: deque(maxlen=window),
+            SERIAL_MODE: deque(maxlen=window),
+        }
+        self.parallel_requests = 0
+        self.candidates_started = 0
+        self.candidates_cancelled = 0
+        self.first_candidate_lost = 0
+        self.all_failed = 0
+        self._candidate_costs: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_candidates(self, started: int, cancelled: int, winner: Optional[int]):
+        """
+        记录一次并行候选的结果
+
+        Args:
+            started (int): 实际开始执行的候选数
+            cancelled (int): 采用其他候选后被取消的候选数（含尚未开始的）
+            winner (int, optional): 采用的候选序号（按提交顺序），全部未通过时为 None
+        """
+        with self._lock:
+            self.parallel_requests += 1
+            self.candidates_started += started
+            self.candidates_cancelled += cancelled
+            if winner is None:
+                self.all_failed += 1
+            elif winner > 0:
+                # 串行流程只会生成第一个候选：它未通过或更慢时，并行候选省下了一次重试或等待
+                self.first_candidate_lost += 1
+
+    def record_candidate_cost(self, cost: float):
+        """记录一个已完成候选的成本（元）"""
+        with self._lock:
+            self._candidate_costs.append(cost)
+
+    def avg_candidate_cost(self) -> Optional[float]:
+        """
+        近期单个候选的平均成本
+
+        Returns:
+            Optional[float]: 平均成本（元），尚无记录或未配置单价时返回 None
+        """
+        with self._lock:
+            costs = list(self._candidate_costs)
+        if not costs or not any(costs):
+            return None
+        return sum(costs) / len(costs)
+
+    def record_latency(self, mode: str, latency: float):
+        """
+        记录一次生成-审查阶段（含重试）的延迟
+
+        Args:
+            mode (str): parallel 或 serial
+            latency (float): 延迟（秒）
+        """
+        with self._lock:
+            self.latencies[mode].append(latency)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出统计
+
+        Returns:
+            Dict[str, Any]: 两种模式的延迟分位数、p95之比、并行请求快于串行p95的比例，以及候选的取消与胜出情况
+        """
+        with self._lock:
+            samples = {mode: list(values) for mode, values in self.latencies.items()}
+            parallel_requests = self.parallel_requests
+            report = {
+                "candidates": {
+                    "requests": parallel_requests,
+                    "avg_started": round(self.candidates_started / parallel_requests, 2) if parallel_requests else None,
+                    "cancelled": self.candidates_cancelled,
+                    "first_candidate_lost_rate": (
+                        round(self.first_candidate_lost / parallel_requests, 4) if parallel_requests else None
+                    ),
+                    "all_failed_rate": round(self.all_failed / parallel_requests, 4) if parallel_requests else None,
+                },
+            }
+        candidate_cost = self.avg_candidate_cost()
+        report["avg_candidate_cost"] = round(candidate_cost, 6) if candidate_cost is not None else None
+        for mode, values in samples.items():
+            p50, p95 = percentile(values, 0.5), percentile(values, 0.95)
+            report[mode] = {
+                "samples": len(values),
+                "p50": round(p50, 3) if p50 is not None else None,
+                "p95": round(p95, 3) if p95 is not None else None,
+            }
+        serial_p95 = report[SERIAL_MODE]["p95"]
+        parallel_p95 = report[PARALLEL_MODE]["p95"]
+        report["p95_speedup"] = round(serial_p95 / parallel_p95, 3) if serial_p95 and parallel_p95 else None
+        # 并行请求中延迟低于串行p95的比例
+        report["beats_serial_p95_rate"] = (
+            round(sum(1 for value in samples[PARALLEL_MODE] if value < serial_p95) / len(samples[PARALLEL_MODE]), 4)
+            if serial_p95 is not None and samples[PARALLEL_MODE] else None
+        )
+        return report
+
+
+# 全局统计实例
+best_of_n_stats = BestOfNStats()
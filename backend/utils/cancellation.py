@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+超时与协作式取消
+每个工作流在一个取消范围（contextvars 传递，跨线程时需复制上下文）内执行：范围带有整个工作流的截止时间，
+客户端断开或任务被取消时由调用方取消范围。模型调用按阶段设置超时，等待期间一旦范围被取消立即返回，
+工作流不再发起后续的生成和审查调用，释放所占的并发槽位；已发出的HTTP请求无法中断，由提供方的请求超时兜底
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, Optional, Set, TypeVar
+
+from backend.config.settings import settings
+
+
+T = TypeVar("T")
+
+_current_scope: contextvars.ContextVar[Optional["CancelScope"]] = contextvars.ContextVar(
+    "cancel_scope", default=None
+)
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class RequestCancelled(Exception):
+    """请求已取消（客户端断开或任务被取消）"""
+
+
+class CancelScope:
+    """一个工作流的取消范围"""
+
+    def __init__(self, timeout: float = 0.0, parent: Optional["CancelScope"] = None):
+        """
+        初始化取消范围
+
+        Args:
+            timeout (float): 整个工作流的超时（秒），0 表示不限制
+            parent (CancelScope, optional): 上级范围（如并行候选所属的工作流），上级取消或超时时本范围随之取消或超时
+        """
+        self.deadline = time.monotonic() + timeout if timeout > 0 else None
+        self.timeout = timeout
+        self.parent = parent
+        self.reason = ""
+        self._cancelled = threading.Event()
+        self._waiters: Set[threading.Event] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已被取消（含上级范围被取消）"""
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def cancel(self, reason: str = "请求已取消"):
+        """
+        取消范围，唤醒所有正在等待模型调用的线程
+
+        Args:
+            reason (str): 取消原因
+        """
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self.reason = reason
+            self._cancelled.set()
+            waiters = list(self._waiters)
+        for waiter in waiters:
+            waiter.set()
+        if self.parent is None:
+            print(f"工作流已取消: {reason}")
+
+    def remaining(self) -> Optional[float]:
+        """距截止时间（含上级范围的截止时间）的秒数，都未设置截止时间时返回 None"""
+        remaining = self.deadline - time.monotonic() if self.deadline is not None else None
+        parent_remaining = self.parent.remaining() if self.parent is not None else None
+        if remaining is None or parent_remaining is None:
+            return remaining if parent_remaining is None else parent_remaining
+        return min(remaining, parent_remaining)
+
+    def check(self):
+        """已取消时抛出 RequestCancelled，超过截止时间时抛出 TimeoutError"""
+        if self.parent is not None:
+            self.parent.check()
+        if self._cancelled.is_set():
+            raise RequestCancelled(self.reason)
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise TimeoutError(f"工作流处理超时（{self.timeout:g} 秒）")
+
+    def add_waiter(self, waiter: threading.Event):
+        """登记等待中的事件，本范围或上级范围取消时一并唤醒"""
+        with self._lock:
+            self._waiters.add(waiter)
+            if self._cancelled.is_set():
+                waiter.set()
+        if self.parent is not None:
+            self.parent.add_waiter(waiter)
+
+    def remove_waiter(self, waiter: threading.Event):
+        """移除等待中的事件"""
+        with self._lock:
+            self._waiters.discard(waiter)
+        if self.parent is not None:
+            self.parent.remove_waiter(waiter)
+
+
+@contextmanager
+def cancel_scope(scope: CancelScope) -> Iterator[CancelScope]:
+    """
+    在当前上下文中进入取消范围
+
+    Args:
+        scope (CancelScope): 取消范围
+
+    Returns:
+        Iterator[CancelScope]: 取消范围
+    """
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+@contextmanager
+def ensure_scope(timeout: float) -> Iterator[CancelScope]:
+    """
+    沿用调用方的取消范围；没有时以给定超时新建一个
+
+    Args:
+        timeout (float): 新建范围时的工作流超时（秒）
+
+    Returns:
+        Iterator[CancelScope]: 取消范围
+    """
+    scope = _current_scope.get()
+    if scope is not None:
+        yield scope
+        return
+    with cancel_scope(CancelScope(timeout)) as scope:
+        yield scope
+
+
+def current_scope() -> Optional[CancelScope]:
+    """当前上下文中的取消范围，不在范围内时返回 None"""
+    return _current_scope.get()
+
+
+def check_cancelled():
+    """当前范围已取消或超时时抛出异常（工作流在发起新的模型调用前调用）"""
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.check()
+
+
+@lru_cache(maxsize=8)
+def parse_timeouts(spec: str) -> Dict[str, float]:
+    """
+    解析按阶段的超时配置
+
+    Args:
+        spec (str): 逗号分隔的 阶段=秒数，阶段为提示词模板名，如 prompt_optimizer=30,knowledge_reviewer=60
+
+    Returns:
+        Dict[str, float]: 阶段到超时的映射
+    """
+    timeouts = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        stage, seconds = item.split("=", 1)
+        try:
+            timeouts[stage.strip()] = float(seconds)
+        except ValueError:
+            print(f"忽略无法解析的阶段超时: {item.strip()}")
+    return timeouts
+
+
+def stage_timeout(stage: str) -> float:
+    """
+    阶段的模型调用超时
+
+    Args:
+        stage (str): 阶段（提示词模板名）
+
+    Returns:
+        float: 超时（秒），0 表示不限制；未单独配置的阶段使用 MODEL_CALL_TIMEOUT
+    """
+    return parse_timeouts(settings.stage_timeouts).get(stage, settings.model_call_timeout)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """可取消的模型调用使用的线程池（首次使用时创建）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 每个工作流可能同时有多个调用（并行候选、审查组）
+            _executor = ThreadPoolExecutor(max_workers=settings.pipeline_concurrency * 8, thread_name_prefix="call")
+        return _executor
+
+
+def call_with_timeout(call: Callable[[Optional[float]], T], timeout: float) -> T:
+    """
+    在超时和当前取消范围的约束下执行一次模型调用
+
+    超时取阶段超时与工作流剩余时间中的较小者，并传给提供方作为请求超时；
+    在取消范围内时调用在线程池中执行，当前线程等待结果或取消，取消后立即返回
+
+    Args:
+        call (Callable[[Optional[float]], T]): 模型调用，参数为本次调用的超时（秒，None 表示不限制）
+        timeout (float): 阶段超时（秒），0 表示不限制
+
+    Returns:
+        T: 调用结果
+    """
+    scope = _current_scope.get()
+    effective = timeout if timeout > 0 else None
+    if scope is not None:
+        scope.check()
+        remaining = scope.remaining()
+        if remaining is not None:
+            effective = remaining if effective is None else min(effective, remaining)
+    if scope is None:
+        return call(effective)
+
+    future = _get_executor().submit(contextvars.copy_context().run, call, effective)
+    waiter = threading.Event()
+    future.add_done_callback(lambda _: waiter.set())
+    scope.add_waiter(waiter)
+    try:
+        waiter.wait(effective)
+        if future.done():
+            return future.result()
+        scope.check()
+        raise TimeoutError(f"模型调用超时（{effective:g} 秒）")
+    finally:
+        scope.remove_waiter(waiter)
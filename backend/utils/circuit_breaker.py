@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+模型熔断与降级
+按模型统计最近调用的失败率和慢调用比例，超过阈值时熔断：熔断期间直接跳过该模型，
+请求改用 Settings.model_fallbacks 中配置的下一个模型，而不是排队等待上游超时；
+熔断一段时间后放行一次探测调用（半开），成功则恢复，失败则继续熔断
+"""
+
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Tuple
+
+from backend.config.settings import settings
+from backend.providers.base_provider import ProviderError
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@lru_cache(maxsize=8)
+def parse_fallbacks(spec: str) -> Dict[str, Tuple[str, ...]]:
+    """
+    解析模型降级链配置
+
+    Args:
+        spec (str): 逗号分隔的 模型=备选1>备选2，如 qwen-plus-character=qwen-max>qwen-flash
+
+    Returns:
+        Dict[str, Tuple[str, ...]]: 模型到备选模型（按顺序）的映射
+    """
+    fallbacks = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        model, chain = item.split("=", 1)
+        fallbacks[model.strip()] = tuple(name.strip() for name in chain.split(">") if name.strip())
+    return fallbacks
+
+
+def model_chain(model: str) -> List[str]:
+    """
+    模型及其降级链
+
+    Args:
+        model (str): 首选模型
+
+    Returns:
+        List[str]: 按尝试顺序排列的模型（去重）
+    """
+    chain = [model]
+    for name in parse_fallbacks(settings.model_fallbacks).get(model, ()):
+        if name not in chain:
+            chain.append(name)
+    return chain
+
+
+def is_client_error(error: Exception) -> bool:
+    """
+    是否为请求本身的问题（4xx，限流除外）：换模型也无法解决，不计入熔断统计
+
+    Args:
+        error (Exception): 调用异常
+
+    Returns:
+        bool: 是否为客户端错误
+    """
+    return isinstance(error, ProviderError) and 400 <= error.status_code < 500 and error.status_code != 429
+
+
+class CircuitBreaker:
+    """单个模型的熔断器"""
+
+    def __init__(self, model: str, window: int, min_calls: int, error_rate: float,
+                 slow_call_seconds: float, slow_rate: float, open_seconds: float):
+        """
+        初始化熔断器
+
+        Args:
+            model (str): 模型名称
+            window (int): 统计最近多少次调用
+            min_calls (int): 窗口内至少多少次调用才判断是否熔断
+            error_rate (float): 失败比例达到该值时熔断
+            slow_call_seconds (float): 耗时超过该值的调用计为慢调用，0 表示不按延迟判断
+            slow_rate (float): 慢调用比例达到该值时熔断
+            open_seconds (float): 熔断持续时间（秒），之后进入半开状态放行一次探测调用；
+                探测调用超过该时间仍未记录结果时放行新的探测调用
+        """
+        self.model = model
+        self.min_calls = max(1, min_calls)
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.calls = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.trips = 0
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=max(window, self.min_calls))
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        是否放行一次调用
+
+        Returns:
+            bool: 关闭状态放行；熔断期间拒绝；半开状态同一时间只放行一次探测调用
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self._opened_at < self.open_seconds:
+                    self.short_circuited += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN:
+                # 探测调用未记录结果就退出时（如进程内异常路径遗漏），超时后放行新的探测调用
+                if self._probing and now - self._probe_started < self.open_seconds:
+                    self.short_circuited += 1
+                    return False
+                self._probing = True
+                self._probe_started = now
+            return True
+
+    def release_probe(self):
+        """放行的调用没有可记录的结果（请求被取消或请求本身有误）：归还半开状态的探测名额，不计入统计"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def record_success(self, latency: float):
+        """
+        记录一次成功的调用
+
+        Args:
+            latency (float): 调用耗时（秒）
+        """
+        slow = self.slow_call_seconds > 0 and latency >= self.slow_call_seconds
+        self._record(False, slow)
+
+    def record_failure(self):
+        """记录一次失败的调用"""
+        self._record(True, False)
+
+    def _record(self, failed: bool, slow: bool):
+        """记录调用结果并判断状态转换"""
+        with self._lock:
+            self.calls += 1
+            self.failures += int(failed)
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if failed or slow:
+                    self._trip("探测调用失败" if failed else "探测调用过慢")
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    print(f"模型 {self.model} 探测调用成功，恢复使用")
+                return
+            if self.state == OPEN:
+                # 熔断前已发出的调用
+                return
+            self._outcomes.append((failed, slow))
+            if len(self._outcomes) < self.min_calls:
+                return
+            error_rate = sum(1 for failed, _ in self._outcomes if failed) / len(self._outcomes)
+            slow_rate = sum(1 for _, slow in self._outcomes if slow) / len(self._outcomes)
+            if error_rate >= self.error_rate:
+                self._trip(f"失败率 {error_rate:.0%}")
+            elif self.slow_call_seconds > 0 and slow_rate >= self.slow_rate:
+                self._trip(f"慢调用比例 {slow_rate:.0%}")
+
+    def _trip(self, reason: str):
+        """进入熔断状态（调用方持有锁）"""
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.trips += 1
+        self._outcomes.clear()
+        print(f"模型 {self.model} 熔断（{reason}），{self.open_seconds:g} 秒后探测恢复")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出状态
+
+        Returns:
+            Dict[str, Any]: 当前状态、调用数、失败数、熔断次数和被跳过的调用数
+        """
+        with self._lock:
+            return {
+                "state": self.state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "trips": self.trips,
+                "short_circuited": self.short_circuited,
+                "window_calls": len(self._outcomes),
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(model: str) -> CircuitBreaker:
+    """
+    获取模型的熔断器（同一模型在进程内共享，按 Settings 中的阈值创建）
+
+    Args:
+        model (str): 模型名称
+
+    Returns:
+        CircuitBreaker: 熔断器
+    """
+    with _breakers_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(
+                model,
+                window=settings.circuit_window,
+                min_calls=settings.circuit_min_calls,
+                error_rate=settings.circuit_error_rate,
+                slow_call_seconds=settings.circuit_slow_call_seconds,
+                slow_rate=settings.circuit_slow_rate,
+                open_seconds=settings.circuit_open_seconds,
+            )
+        return _breakers[model]
+
+
+def breaker_snapshot() -> Dict[str, Dict[str, Any]]:
+    """
+    导出所有模型熔断器的状态
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 模型名称到状态的映射
+    """
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {model: breaker.snapshot() for model, breaker in breakers.items()}
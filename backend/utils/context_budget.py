@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+上下文token预算
+用本地分词器统计token数（DashScope SDK自带的通义千问分词器，不可用时按字符估算），
+组装重试生成的提示词时限制在预算内：超出预算时先压缩之前的对话内容，
+只保留审查反馈指出问题的片段，仍超出时再截断各部分
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# 重试生成的提示词（原始要求 + 之前的生成内容 + 审查反馈）
+RETRY_PROMPT_TEMPLATE = """原始要求：{requirement}
+
+之前的生成内容：
+{previous}
+
+审查反馈：
+{feedback}
+
+请根据审查反馈改进内容，确保事实准确、符合要求。"""
+
+# 超出预算时各部分的预算比例：原始要求最多占可用预算的30%，审查反馈最多占剩余的60%，其余留给之前的内容
+REQUIREMENT_SHARE = 0.3
+FEEDBACK_SHARE = 0.6
+
+# 分词器所用的模型名（同一系列模型共用词表）
+TOKENIZER_MODEL = "qwen-turbo"
+
+# 分词器不可用时的估算：中日韩字符按一字一token，其余字符按四个一token
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+# 审查反馈中引用原文的引号片段，以及 "问题：" "错误：" 字段
+_QUOTE_PATTERN = re.compile(r"[“「『\"]([^”」』\"\n]{2,80})[”」』\"]")
+_FIELD_PATTERN = re.compile(r"(?:问题|错误)[:：]\s*(.+)")
+_CONTENT_PATTERN = re.compile(r"[\s\W_]+")
+
+# 对话行与反馈字段的字对重合比例达到该值时，认为该行被反馈引用
+CITED_OVERLAP = 0.4
+
+ELLIPSIS = "……"
+
+
+@lru_cache(maxsize=1)
+def _load_tokenizer() -> Optional[Any]:
+    """加载本地分词器（首次使用时加载一次），不可用时返回 None"""
+    try:
+        from dashscope import get_tokenizer
+        return get_tokenizer(TOKENIZER_MODEL)
+    except Exception as e:
+        print(f"本地分词器不可用，按字符数估算token: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    统计文本的token数
+
+    Args:
+        text (str): 文本
+
+    Returns:
+        int: token数（分词器不可用时为估算值，偏保守）
+    """
+    if not text:
+        return 0
+    tokenizer = _load_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text))
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    截断文本，使其（含省略号）不超过指定token数
+
+    Args:
+        text (str): 文本
+        max_tokens (int): token上限
+
+    Returns:
+        str: 截断后的文本
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= count_tokens(ELLIPSIS):
+        return ""
+    # 二分查找能放下的最长前缀
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle] + ELLIPSIS) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + ELLIPSIS
+
+
+def _bigrams(text: str) -> set:
+    """去掉空白和标点后的相邻字对"""
+    content = _CONTENT_PATTERN.sub("", text.lower())
+    return {content[i:i + 2] for i in range(len(content) - 1)}
+
+
+def cited_lines(lines: List[str], feedback: str) -> List[int]:
+    """
+    找出被审查反馈引用的对话行：包含引号片段，或与反馈字段的字对重合足够多
+
+    Args:
+        lines (List[str]): 对话行（或轮次）
+        feedback (str): 审查反馈
+
+    Returns:
+        List[int]: 被引用的行下标
+    """
+    quotes = _QUOTE_PATTERN.findall(feedback)
+    fields = [_bigrams(field) for field in _FIELD_PATTERN.findall(feedback)]
+    cited = []
+    for index, line in enumerate(lines):
+        if any(quote.strip() and quote.strip() in line for quote in quotes):
+            cited.append(index)
+            continue
+        line_bigrams = _bigrams(line)
+        if line_bigrams and any(field and len(line_bigrams & field) / len(line_bigrams) >= CITED_OVERLAP
+                                for field in fields):
+            cited.append(index)
+    return cited
+
+
+def condense_dialog(dialog: str, feedback: str, max_tokens: int) -> Tuple[str, str]:
+    """
+    把之前的对话内容压缩到token预算内
+
+    Args:
+        dialog (str): 之前生成的对话内容
+        feedback (str): 审查反馈
+        max_tokens (int): token预算
+
+    Returns:
+        Tuple[str, str]: 压缩后的内容和采用的策略（full/cited_spans/truncated）
+    """
+    if count_tokens(dialog) <= max_tokens:
+        return dialog, "full"
+
+    lines = [line for line in dialog.splitlines() if line.strip()]
+    cited = cited_lines(lines, feedback)
+    if not cited:
+        return truncate_to_tokens(dialog, max_tokens), "truncated"
+
+    # 只保留被引用的行，省略的部分用行数标注
+    parts = []
+    previous = -1
+    for index in cited:
+        if index > previous + 1:
+            parts.append(f"（省略 {index - previous - 1} 行）")
+        parts.append(lines[index])
+        previous = index
+    if previous < len(lines) - 1:
+        parts.append(f"（省略 {len(lines) - previous - 1} 行）")
+    condensed = "\n".join(parts)
+    return truncate_to_tokens(condensed, max_tokens), "cited_spans"
+
+
+def assemble_retry_prompt(requirement: str, previous: str, feedback: str,
+                          budget: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    组装重试生成的提示词，限制在token预算内
+
+    Args:
+        requirement (str): 原始要求（优化后的提示词）
+        previous (str): 之前生成的对话内容
+        feedback (str): 审查反馈
+        budget (int): token预算，0 或负数表示不限制
+
+    Returns:
+        Tuple[str, Dict[str, Any]]: 提示词，以及组装信息（预算、原始与最终token数、之前内容的压缩策略）
+    """
+    prompt = RETRY_PROMPT_TEMPLATE.format(requirement=requirement, previous=previous, feedback=feedback)
+    original_tokens = count_tokens(prompt)
+    info = {"budget": budget, "original_tokens": original_tokens, "tokens": original_tokens, "strategy": "full"}
+    if budget <= 0 or original_tokens <= budget:
+        return prompt, info
+
+    available = max(budget - count_tokens(RETRY_PROMPT_TEMPLATE.format(requirement="", previous="", feedback="")), 0)
+    requirement = truncate_to_tokens(requirement, int(available * REQUIREMENT_SHARE))
+    available -= count_tokens(requirement)
+    kept_feedback = truncate_to_tokens(feedback, int(available * FEEDBACK_SHARE))
+    available -= count_tokens(kept_feedback)
+    # 按完整的反馈查找被引用的片段
+    previous, strategy = condense_dialog(previous, feedback, available)
+
+    prompt = RETRY_PROMPT_TEMPLATE.format(requirement=requirement, previous=previous, feedback=kept_feedback)
+    info.update({"tokens": count_tokens(prompt), "strategy": strategy})
+    return prompt, info
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+对冲请求
+模型调用超过该模型近期延迟的分位数（默认p90）仍未返回时，再发一次相同的调用，
+采用先返回的结果；对冲调用按令牌桶限制在调用总数的一定比例内，避免上游整体变慢时流量翻倍。
+未被采用的调用无法中断，完成后其用量仍计入本次请求
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional
+
+from backend.config.settings import settings
+from backend.utils.stats import percentile
+
+
+# 每个模型保留的最近延迟记录数
+LATENCY_WINDOW = 200
+
+# 令牌桶容量：允许短时间内集中对冲的次数
+BUDGET_BURST = 10.0
+
+
+class ModelHedger:
+    """单个模型的延迟记录、对冲预算与统计"""
+
+    def __init__(self, model: str, quantile: float, budget: float, min_samples: int):
+        """
+        初始化
+
+        Args:
+            model (str): 模型名称
+            quantile (float): 以近期延迟的该分位数作为对冲等待时间
+            budget (float): 对冲调用占调用总数的比例上限
+            min_samples (int): 至少有多少次延迟记录才开始对冲
+        """
+        self.model = model
+        self.quantile = quantile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        开始一次调用：累积对冲预算并返回对冲等待时间
+
+        Returns:
+            Optional[float]: 等待多少秒后对冲，延迟记录不足时返回 None（不对冲）
+        """
+        with self._lock:
+            self.calls += 1
+            self._tokens = min(BUDGET_BURST, self._tokens + self.budget)
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = list(self._latencies)
+        return percentile(latencies, self.quantile)
+
+    def try_hedge(self) -> bool:
+        """
+        尝试消耗一次对冲预算
+
+        Returns:
+            bool: 预算充足时返回 True
+        """
+        with self._lock:
+            if self._tokens < 1.0:
+                self.budget_denied += 1
+                return False
+            self._tokens -= 1.0
+            self.hedged += 1
+            return True
+
+    def record_latency(self, latency: float):
+        """记录一次成功调用的耗时（秒）"""
+        with self._lock:
+            self._latencies.append(latency)
+
+    def record_hedge_win(self):
+        """记录一次对冲调用先于原调用返回"""
+        with self._lock:
+            self.hedge_wins += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出统计
+
+        Returns:
+            Dict[str, Any]: 调用数、对冲比例、对冲胜出比例、预算不足次数和近期延迟分位数
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+            report = {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else None,
+                "hedge_win_rate": round(self.hedge_wins / self.hedged, 4) if self.hedged else None,
+                "budget_denied": self.budget_denied,
+            }
+        for name, q in (("p50", 0.5), (f"p{round(self.quantile * 100)}", self.quantile), ("p99", 0.99)):
+            value = percentile(latencies, q)
+            report[name] = round(value, 3) if value is not None else None
+        return report
+
+
+_hedgers: Dict[str, ModelHedger] = {}
+_hedgers_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_hedger(model: str) -> ModelHedger:
+    """
+    获取模型的对冲状态（同一模型在进程内共享）
+
+    Args:
+        model (str): 模型名称
+
+    Returns:
+        ModelHedger: 对冲状态
+    """
+    with _hedgers_lock:
+        if model not in _hedgers:
+            _hedgers[model] = ModelHedger(model, settings.hedge_quantile, settings.hedge_budget,
+                                          settings.hedge_min_samples)
+        return _hedgers[model]
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """对冲调用使用的线程池（首次使用时创建）"""
+    global _executor
+    with _hedgers_lock:
+        if _executor is None:
+            # 每个工作流可能同时有多个调用（并行候选、审查组），每个调用最多占用两个线程
+            _executor = ThreadPoolExecutor(max_workers=settings.pipeline_concurrency * 8, thread_name_prefix="hedge")
+        return _executor
+
+
+def hedger_snapshot() -> Dict[str, Dict[str, Any]]:
+    """
+    导出所有模型的对冲统计
+
+    Returns:
+        Dict[str, Dict[str, Any]]: 模型名称到统计的映射
+    """
+    with _hedgers_lock:
+        hedgers = dict(_hedgers)
+    return {model: hedger.snapshot() for model, hedger in hedgers.items()}
+
+
+def hedged_call(model: str, call: Callable[[], Dict[str, Any]],
+                on_discarded: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    调用模型，超过对冲等待时间仍未返回时再发一次相同的调用，采用先成功返回的结果
+
+    Args:
+        model (str): 模型名称
+        call (Callable[[], Dict[str, Any]]): 一次模型调用（提供方 call 的响应）
+        on_discarded (Callable, optional): 未被采用的调用成功返回后的回调（用于计入用量），在调用方的上下文中执行
+
+    Returns:
+        Dict[str, Any]: 先成功返回的响应；两次调用都失败时抛出原调用的异常
+    """
+    hedger = get_hedger(model)
+    delay = hedger.hedge_delay()
+
+    def timed_call() -> Dict[str, Any]:
+        start = time.time()
+        response = call()
+        hedger.record_latency(time.time() - start)
+        return response
+
+    if delay is None:
+        return timed_call()
+
+    executor = _get_executor()
+    context = contextvars.copy_context()
+    primary = executor.submit(context.copy().run, timed_call)
+    done, _ = wait([primary], timeout=delay)
+    if done or not hedger.try_hedge():
+        return primary.result()
+
+    hedge = executor.submit(context.copy().run, timed_call)
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                continue
+            if future is hedge:
+                hedger.record_hedge_win()
+            for loser in pending:
+                _discard(loser, context, on_discarded)
+            return future.result()
+    # 两次调用都失败
+    return primary.result()
+
+
+def _discard(future: Future, context: contextvars.Context,
+             on_discarded: Optional[Callable[[Dict[str, Any]], None]]):
+    """未被采用的调用完成后交给回调处理（仍在执行，无法中断）"""
+    if on_discarded is None:
+        return
+
+    def on_done(done: Future):
+        if done.exception() is None:
+            context.copy().run(on_discarded, done.result())
+
+    future.add_done_callback(on_done)
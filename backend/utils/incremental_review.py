@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+增量审查
+把对话按发言切分为轮次并按内容哈希，逐轮记录审查结论：审查通过时送审的轮次全部确认无误，
+未通过时只确认反馈没有引用的轮次；之后只把新增、改动或被反馈引用的轮次交给审查Agent，
+未改动且已确认的轮次直接沿用之前的结论
+"""
+
+import hashlib
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.utils.context_budget import cited_lines
+
+
+# 以 "老师：" "学生：" 等说话人开头的行开始新的一轮
+_SPEAKER_PATTERN = re.compile(r"^\s*[^\s:：]{1,8}[:：]")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def split_turns(dialog: str) -> List[str]:
+    """
+    把对话切分为轮次（没有说话人前缀的行并入上一轮）
+
+    Args:
+        dialog (str): 对话内容
+
+    Returns:
+        List[str]: 轮次列表
+    """
+    turns: List[str] = []
+    for line in dialog.splitlines():
+        if not line.strip():
+            continue
+        if turns and not _SPEAKER_PATTERN.match(line):
+            turns[-1] = f"{turns[-1]}\n{line}"
+        else:
+            turns.append(line)
+    return turns
+
+
+def turn_hash(turn: str) -> str:
+    """
+    轮次内容的哈希（忽略空白差异）
+
+    Args:
+        turn (str): 轮次内容
+
+    Returns:
+        str: 16位十六进制哈希
+    """
+    normalized = _WHITESPACE_PATTERN.sub("", turn)
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ReviewLedger:
+    """单次工作流内已确认无误的轮次"""
+
+    def __init__(self, verified_dialogs: Optional[Iterable[str]] = None):
+        """
+        初始化结论记录
+
+        Args:
+            verified_dialogs (Iterable[str], optional): 之前已审查通过的对话（如会话中之前各轮的回答）
+        """
+        self.verified: Set[str] = set()
+        for dialog in verified_dialogs or ():
+            self.verified.update(turn_hash(turn) for turn in split_turns(dialog))
+
+    def fork(self) -> "ReviewLedger":
+        """
+        复制一份结论记录（并行候选各自记录，互不影响）
+
+        Returns:
+            ReviewLedger: 新的结论记录
+        """
+        ledger = ReviewLedger()
+        ledger.verified = set(self.verified)
+        return ledger
+
+    def merge(self, other: "ReviewLedger"):
+        """
+        并入另一份结论记录（采用某个并行候选继续重试时，沿用该候选的结论）
+
+        Args:
+            other (ReviewLedger): 要并入的结论记录
+        """
+        self.verified.update(other.verified)
+
+    def plan(self, dialog: str) -> Tuple[List[str], List[int]]:
+        """
+        确定需要审查的轮次
+
+        Args:
+            dialog (str): 新生成的对话
+
+        Returns:
+            Tuple[List[str], List[int]]: 全部轮次，以及新增或改动（未确认过）的轮次下标
+        """
+        turns = split_turns(dialog)
+        pending = [index for index, turn in enumerate(turns) if turn_hash(turn) not in self.verified]
+        return turns, pending
+
+    def record(self, turns: List[str], reviewed: List[int], passed: bool, feedback: str):
+        """
+        逐轮记录一次审查的结论：通过时本次审查的轮次全部确认无误；
+        未通过时只确认反馈没有引用的轮次，被引用的轮次下次仍送审。
+        未通过的反馈引用不到任何送审轮次时，无法判断问题所在，不确认任何轮次
+
+        Args:
+            turns (List[str]): 全部轮次
+            reviewed (List[int]): 本次审查的轮次下标
+            passed (bool): 审查是否通过
+            feedback (str): 审查反馈
+        """
+        if passed:
+            self.verified.update(turn_hash(turns[index]) for index in reviewed)
+            return
+        cited = cited_lines([turns[index] for index in reviewed], feedback)
+        if not cited:
+            return
+        cited_hashes = {turn_hash(turns[reviewed[position]]) for position in cited}
+        self.verified.update({turn_hash(turns[index]) for index in reviewed} - cited_hashes)
+
+
+def render_delta(turns: List[str], pending: List[int]) -> str:
+    """
+    只保留待审查的轮次，其余位置标注省略的已审查轮数
+
+    Args:
+        turns (List[str]): 全部轮次
+        pending (List[int]): 待审查的轮次下标（升序）
+
+    Returns:
+        str: 交给审查Agent的内容
+    """
+    parts = []
+    previous = -1
+    for index in pending:
+        if index > previous + 1:
+            parts.append(f"（此处省略 {index - previous - 1} 轮已审查无误的对话）")
+        parts.append(turns[index])
+        previous = index
+    if previous < len(turns) - 1:
+        parts.append(f"（此处省略 {len(turns) - previous - 1} 轮已审查无误的对话）")
+    return "\n".join(parts)
+
+
+def review_scope(turns: List[str], pending: List[int]) -> Dict[str, Any]:
+    """
+    本次审查范围的统计
+
+    Args:
+        turns (List[str]): 全部轮次
+        pending (List[int]): 待审查的轮次下标
+
+    Returns:
+        Dict[str, Any]: 轮次总数、送审轮数、沿用结论的轮数
+    """
+    return {"turns": len(turns), "reviewed": len(pending), "reused": len(turns) - len(pending)}
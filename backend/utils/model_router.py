@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+生成模型路由
+按优化后提示词的复杂度（长度、学科、关键词）在本地打分，简单主题交给快速模型、复杂主题交给重型模型；
+各路由的延迟和首次审查通过率反馈调整分流阈值：快速模型通过率明显低于重型模型时少分流，
+与重型模型相当且更快时多分流
+"""
+
+import re
+import statistics
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from backend.config.settings import settings
+
+
+FAST_ROUTE = "fast"
+HEAVY_ROUTE = "heavy"
+
+# 学科识别关键词及其复杂度加分（推理、计算较多的学科更倾向重型模型）
+# 关键词须是完整的词：单字会误中无关的词（如"力"出现在努力、能力、力量中，"酸"出现在酸奶中）
+SUBJECT_KEYWORDS = {
+    "数学": ("数学", "函数", "方程", "几何", "三角形", "定理", "概率", "因式", "不等式", "勾股", "圆周"),
+    "物理": ("物理", "力学", "受力", "合力", "分力", "重力", "摩擦力", "弹力", "拉力", "引力", "杠杆",
+           "电路", "电流", "电压", "压强", "浮力", "能量", "光的", "折射", "速度", "牛顿"),
+    "化学": ("化学", "反应", "元素", "分子", "原子", "溶液", "酸性", "碱性", "酸碱", "盐酸", "硫酸",
+           "氧化", "燃烧", "金属"),
+    "生物": ("生物", "细胞", "光合", "呼吸作用", "遗传", "DNA", "基因", "植物", "动物", "消化"),
+    "地理": ("地理", "地球", "气候", "板块", "季风", "经纬", "自转", "公转"),
+    "历史": ("历史", "朝代", "战争", "革命", "皇帝"),
+    "语文": ("语文", "古诗", "文言文", "修辞", "作文"),
+}
+SUBJECT_WEIGHTS = {"数学": 0.2, "物理": 0.15, "化学": 0.15, "生物": 0.05, "地理": 0.05, "历史": 0.05, "语文": 0.05}
+
+# 含有学科关键词但与学科无关的常用词，识别学科前先去掉（如"努力学习"中的"力学"）
+NON_SUBJECT_WORDS = ("努力", "能力", "智力", "精力", "实力", "魅力", "注意力", "记忆力", "想象力", "创造力")
+
+# 需要推理、比较或计算的关键词加分，只问概念的关键词减分
+COMPLEX_KEYWORDS = ("证明", "推导", "原理", "机制", "为什么", "比较", "区别", "联系", "计算", "综合",
+                    "分析", "应用", "实验", "过程", "影响", "规律")
+SIMPLE_KEYWORDS = ("是什么", "定义", "概念", "简单", "举例", "含义", "名称", "认识")
+KEYWORD_WEIGHT = 0.1
+MAX_KEYWORD_SCORE = 0.3
+
+# 提示词越长，要求越多
+LENGTH_WEIGHT = 0.2
+LENGTH_SATURATION = 300
+
+_FORMULA_PATTERN = re.compile(r"[0-9=+×÷√^²³∠△≈≠≤≥]")
+FORMULA_WEIGHT = 0.1
+
+# 阈值反馈调整
+ADJUST_INTERVAL = 20      # 每累计多少次路由记录评估一次
+MIN_SAMPLES = 20          # 快速路由至少有多少条记录才调整
+STATS_WINDOW = 200        # 每条路由保留的最近记录数
+THRESHOLD_STEP = 0.05
+MIN_THRESHOLD = 0.1
+MAX_THRESHOLD = 0.9
+QUALITY_MARGIN = 0.05     # 重型模型通过率领先不超过该值时，认为两者质量相当
+
+
+def classify_prompt(prompt: str) -> Dict[str, Any]:
+    """
+    本地估计提示词的复杂度
+
+    Args:
+        prompt (str): 优化后的提示词
+
+    Returns:
+        Dict[str, Any]: 复杂度得分（0-1）、识别出的学科和命中的关键词
+    """
+    text = prompt
+    for word in NON_SUBJECT_WORDS:
+        text = text.replace(word, "，")
+    subject = None
+    best_hits = 0
+    for name, keywords in SUBJECT_KEYWORDS.items():
+        hits = sum(1 for keyword in keywords if keyword in text)
+        if hits > best_hits:
+            subject, best_hits = name, hits
+
+    complex_hits = [keyword for keyword in COMPLEX_KEYWORDS if keyword in prompt]
+    simple_hits = [keyword for keyword in SIMPLE_KEYWORDS if keyword in prompt]
+
+    score = 0.2
+    score += LENGTH_WEIGHT * min(len(prompt) / LENGTH_SATURATION, 1.0)
+    score += SUBJECT_WEIGHTS.get(subject, 0.0)
+    score += min(len(complex_hits) * KEYWORD_WEIGHT, MAX_KEYWORD_SCORE)
+    score -= min(len(simple_hits) * KEYWORD_WEIGHT, MAX_KEYWORD_SCORE)
+    if _FORMULA_PATTERN.search(prompt):
+        score += FORMULA_WEIGHT
+    return {
+        "score": round(min(max(score, 0.0), 1.0), 4),
+        "subject": subject,
+        "complex_keywords": complex_hits,
+        "simple_keywords": simple_hits,
+    }
+
+
+class RouteStats:
+    """单条路由的最近延迟与审查结果"""
+
+    def __init__(self):
+        """初始化统计"""
+        self.count = 0
+        self.latencies: Deque[float] = deque(maxlen=STATS_WINDOW)
+        self.first_pass: Deque[bool] = deque(maxlen=STATS_WINDOW)
+        self.retries: Deque[int] = deque(maxlen=STATS_WINDOW)
+
+    def pass_rate(self) -> Optional[float]:
+        """最近记录的首次审查通过率"""
+        return sum(self.first_pass) / len(self.first_pass) if self.first_pass else None
+
+    def latency_p50(self) -> Optional[float]:
+        """最近记录的首次生成延迟中位数（秒）"""
+        return statistics.median(self.latencies) if self.latencies else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出统计"""
+        pass_rate = self.pass_rate()
+        latency = self.latency_p50()
+        return {
+            "count": self.count,
+            "first_pass_rate": round(pass_rate, 4) if pass_rate is not None else None,
+            "latency_p50": round(latency, 3) if latency is not None else None,
+            "avg_retries": round(sum(self.retries) / len(self.retries), 3) if self.retries else None,
+        }
+
+
+class ModelRouter:
+    """生成模型路由"""
+
+    def __init__(self, fast_model: Optional[str] = None, heavy_model: Optional[str] = None,
+                 threshold: Optional[float] = None, target_pass_rate: Optional[float] = None):
+        """
+        初始化路由
+
+        Args:
+            fast_model (str, optional): 快速模型，默认 Settings.generator_fast_model
+            heavy_model (str, optional): 重型模型，默认 Settings.generator_model
+            threshold (float, optional): 初始分流阈值，得分低于阈值走快速模型，默认 Settings.routing_threshold
+            target_pass_rate (float, optional): 快速模型首次审查通过率目标，默认 Settings.routing_target_pass_rate
+        """
+        self.fast_model = fast_model or settings.generator_fast_model
+        self.heavy_model = heavy_model or settings.generator_model
+        self.threshold = threshold if threshold is not None else settings.routing_threshold
+        self.target_pass_rate = target_pass_rate if target_pass_rate is not None else settings.routing_target_pass_rate
+        self.stats = {FAST_ROUTE: RouteStats(), HEAVY_ROUTE: RouteStats()}
+        self._since_adjust = 0
+        self._lock = threading.Lock()
+
+    def route(self, prompt: str) -> Dict[str, Any]:
+        """
+        为提示词选择生成模型
+
+        Args:
+            prompt (str): 优化后的提示词
+
+        Returns:
+            Dict[str, Any]: 路由名、模型、复杂度得分和学科
+        """
+        classification = classify_prompt(prompt)
+        with self._lock:
+            threshold = self.threshold
+        route = FAST_ROUTE if classification["score"] < threshold else HEAVY_ROUTE
+        return {
+            "route": route,
+            "model": self.fast_model if route == FAST_ROUTE else self.heavy_model,
+            "score": classification["score"],
+            "subject": classification["subject"],
+        }
+
+    def record(self, route: str, latency: float, first_pass: bool, retries: int):
+        """
+        记录一次路由的结果，并按需调整阈值
+
+        Args:
+            route (str): 路由名
+            latency (float): 首次生成耗时（秒）
+            first_pass (bool): 首次生成是否通过审查
+            retries (int): 重试次数
+        """
+        with self._lock:
+            stats = self.stats[route]
+            stats.count += 1
+            stats.latencies.append(latency)
+            stats.first_pass.append(first_pass)
+            stats.retries.append(retries)
+            self._since_adjust += 1
+            if self._since_adjust >= ADJUST_INTERVAL:
+                self._since_adjust = 0
+                self._adjust_threshold()
+
+    def _adjust_threshold(self):
+        """按各路由的近期质量和延迟调整阈值（调用方持有锁）"""
+        fast, heavy = self.stats[FAST_ROUTE], self.stats[HEAVY_ROUTE]
+        if len(fast.first_pass) < MIN_SAMPLES:
+            # 快速路由样本不足时，若重型模型通过率已达标，尝试多分流一些到快速模型
+            if len(heavy.first_pass) >= MIN_SAMPLES and heavy.pass_rate() >= self.target_pass_rate:
+                self._set_threshold(self.threshold + THRESHOLD_STEP)
+            return
+        fast_rate, heavy_rate = fast.pass_rate(), heavy.pass_rate()
+        if heavy_rate is None or len(heavy.first_pass) < MIN_SAMPLES:
+            # 没有可比较的重型路由样本时，只看快速模型是否达标
+            step = THRESHOLD_STEP if fast_rate >= self.target_pass_rate else -THRESHOLD_STEP
+            self._set_threshold(self.threshold + step)
+            return
+        if fast_rate < self.target_pass_rate and fast_rate < heavy_rate - QUALITY_MARGIN:
+            # 快速模型通过率不达标且明显低于重型模型，重试抵消了速度优势：少分流
+            self._set_threshold(self.threshold - THRESHOLD_STEP)
+        elif fast_rate >= heavy_rate - QUALITY_MARGIN and heavy.latency_p50() > fast.latency_p50():
+            # 快速模型质量与重型模型相当且更快：多分流
+            self._set_threshold(self.threshold + THRESHOLD_STEP)
+
+    def _set_threshold(self, threshold: float):
+        """在上下限内更新阈值"""
+        threshold = round(min(max(threshold, MIN_THRESHOLD), MAX_THRESHOLD), 4)
+        if threshold != self.threshold:
+            print(f"模型路由阈值调整: {self.threshold} -> {threshold}")
+            self.threshold = threshold
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出当前阈值和各路由统计
+
+        Returns:
+            Dict[str, Any]: 路由状态
+        """
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "target_pass_rate": self.target_pass_rate,
+                "models": {FAST_ROUTE: self.fast_model, HEAVY_ROUTE: self.heavy_model},
+                "routes": {name: stats.to_dict() for name, stats in self.stats.items()},
+            }
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+提示词优化门控
+在本地判断用户输入是否已经是完整的提示词（足够长、带有教学要求或条目结构），
+据此跳过提示词优化，或让优化与首次生成并行（推测执行）；
+并衡量优化后的提示词相对原始输入新增了多少内容，决定推测生成的结果能否直接使用
+"""
+
+import re
+from typing import Any, Dict, Set
+
+
+# 输入越长，越可能已经写清了要求
+LENGTH_WEIGHT = 0.4
+LENGTH_SATURATION = 120
+
+# 教学提示词常见的要求类词语
+INSTRUCTION_KEYWORDS = ("请", "要求", "形式", "对话", "学生", "讲解", "举例", "类比", "引导", "步骤",
+                        "中学", "初中", "高中", "生动", "通俗", "启发")
+KEYWORD_WEIGHT = 0.08
+MAX_KEYWORD_SCORE = 0.4
+
+# 条目结构：换行后的编号（1. / 2、 / (3)）或 "要求：" 之类的冒号列举
+_STRUCTURE_PATTERN = re.compile(r"(^|\n)\s*(\d+|[一二三四五六七八九十]+)\s*[.、)）]|要求[:：]")
+STRUCTURE_WEIGHT = 0.2
+
+_CONTENT_PATTERN = re.compile(r"[\s\W_]+")
+
+
+def assess_prompt(text: str) -> Dict[str, Any]:
+    """
+    估计输入作为提示词的完整程度
+
+    Args:
+        text (str): 用户输入
+
+    Returns:
+        Dict[str, Any]: 完整度得分（0-1）及命中的要求类词语、是否有条目结构
+    """
+    keywords = [keyword for keyword in INSTRUCTION_KEYWORDS if keyword in text]
+    structured = bool(_STRUCTURE_PATTERN.search(text))
+    score = LENGTH_WEIGHT * min(len(text.strip()) / LENGTH_SATURATION, 1.0)
+    score += min(len(keywords) * KEYWORD_WEIGHT, MAX_KEYWORD_SCORE)
+    if structured:
+        score += STRUCTURE_WEIGHT
+    return {"score": round(min(score, 1.0), 4), "keywords": keywords, "structured": structured}
+
+
+def _bigrams(text: str) -> Set[str]:
+    """去掉空白和标点后的相邻字对"""
+    content = _CONTENT_PATTERN.sub("", text.lower())
+    return {content[i:i + 2] for i in range(len(content) - 1)}
+
+
+def prompt_coverage(raw_input: str, optimized_prompt: str) -> float:
+    """
+    优化后提示词的内容有多少已包含在原始输入中
+
+    Args:
+        raw_input (str): 原始输入
+        optimized_prompt (str): 优化后的提示词
+
+    Returns:
+        float: 优化后提示词的字对中出现在原始输入里的比例（0-1），越高说明优化改动越小
+    """
+    optimized = _bigrams(optimized_prompt)
+    if not optimized:
+        return 1.0
+    return len(optimized & _bigrams(raw_input)) / len(optimized)
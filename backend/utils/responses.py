@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+API响应的精简、序列化与压缩
+- 精简模式只返回客户端需要的字段（完整结果中 dialog_content 与 final_content 重复，且带有大量诊断信息）
+- 用 orjson 序列化JSON响应，未安装时使用标准库 json
+- 对支持的客户端用 brotli（brotli-asgi）压缩响应，其余客户端或未安装时使用 gzip
+- orjson 与 brotli-asgi 已列入依赖；未安装时服务仍可运行，启动时各提示一次
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from backend.config.settings import settings
+
+try:
+    import orjson
+except ImportError:  # 未安装时使用标准库 json
+    orjson = None
+    print("未安装 orjson，JSON响应使用标准库 json 序列化")
+
+
+# 响应视图
+FULL_VIEW = "full"
+LEAN_VIEW = "lean"
+
+
+class FastJSONResponse(JSONResponse):
+    """安装 orjson 时用其序列化的JSON响应（与 JSONResponse 输出相同的紧凑UTF-8 JSON）"""
+
+    def render(self, content: Any) -> bytes:
+        """
+        序列化响应内容
+
+        Args:
+            content: 响应内容
+
+        Returns:
+            bytes: JSON字节串
+        """
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=32)
+def parse_fields(spec: str) -> Tuple[str, ...]:
+    """
+    解析逗号分隔的字段列表
+
+    Args:
+        spec (str): 如 final_content,review_passed
+
+    Returns:
+        Tuple[str, ...]: 字段名
+    """
+    return tuple(field.strip() for field in spec.split(",") if field.strip())
+
+
+def resolve_view(view: Optional[str]) -> str:
+    """请求的响应视图：未指定或无法识别时使用 RESPONSE_MODE"""
+    view = (view or "").strip().lower()
+    if view in (FULL_VIEW, LEAN_VIEW):
+        return view
+    return settings.response_mode
+
+
+def shape_result(result: Dict[str, Any], view: Optional[str] = None, fields: Optional[str] = None) -> Dict[str, Any]:
+    """
+    按请求的视图或字段精简工作流结果
+
+    Args:
+        result (Dict[str, Any]): 工作流结果
+        view (str, optional): full 返回完整结果，lean 只返回 LEAN_RESPONSE_FIELDS，默认 RESPONSE_MODE
+        fields (str, optional): 逗号分隔的字段列表，指定时优先于视图
+
+    Returns:
+        Dict[str, Any]: 响应中的结果；精简时始终保留 error，避免失败被隐藏
+    """
+    if fields:
+        selected = parse_fields(fields)
+    elif resolve_view(view) == LEAN_VIEW:
+        selected = parse_fields(settings.lean_response_fields)
+    else:
+        return result
+    shaped = {field: result[field] for field in selected if field in result}
+    if "error" in result:
+        shaped["error"] = result["error"]
+    return shaped
+
+
+def add_compression(app: FastAPI):
+    """
+    按配置为应用添加响应压缩中间件
+
+    Args:
+        app (FastAPI): 应用
+    """
+    if not settings.response_compression:
+        return
+    try:
+        from brotli_asgi import BrotliMiddleware
+    except ImportError:
+        from starlette.middleware.gzip import GZipMiddleware
+        print("未安装 brotli-asgi，响应压缩只使用 gzip")
+        app.add_middleware(GZipMiddleware, minimum_size=settings.compression_minimum_size)
+        return
+    # 不支持 brotli 的客户端仍按 gzip 压缩
+    app.add_middleware(BrotliMiddleware, minimum_size=settings.compression_minimum_size, gzip_fallback=True)
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+语义近似主题缓存索引
+用字符n-gram哈希向量表示学习主题，做近似最近邻查找，
+使 "什么是勾股定理" 与 "勾股定理是什么" 这类表述不同的主题能复用同一份已审查结果
+
+查找分两步：
+1. 候选召回：每个主题按字对特征取最小的若干个哈希值（bottom-k MinHash）作为分桶键，
+   与查询共享任一分桶键的主题成为候选，候选数量与索引规模基本无关
+2. 精确打分：对候选计算向量余弦相似度，取超过阈值且通过主题校验（语序一致、没有多出实词）的最相似主题
+
+索引文件以追加方式写入，由NumPy内存映射读取，多个worker共享同一份索引：
+- vectors.bin   每行一个主题的int8量化向量
+- sketches.bin  每行一个主题的分桶键（不足时补0）
+- entries.bin   每行一个主题在 topics.txt 中的偏移、长度和主题哈希
+- topics.txt    归一化后的主题文本（即结果缓存键）
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from backend.config.settings import settings
+from backend.utils.topic_utils import normalize_topic
+
+try:
+    import fcntl
+except ImportError:  # Windows 下无文件锁，仅支持单worker写入
+    fcntl = None
+
+
+INDEX_VERSION = 2
+DEFAULT_DIM = 256
+DEFAULT_SKETCH_SIZE = 8
+
+# 新增条数超过该值时重建有序分桶表，之前的新增条目线性扫描
+REBUILD_THRESHOLD = 20000
+
+# 单次查找打分的候选数上限
+MAX_CANDIDATES = 1024
+
+# int8量化比例（向量已L2归一化，分量绝对值不超过1）
+_QUANT_SCALE = 127.0
+
+# 提问句式中的虚词、疑问词和标点，不参与相似度计算
+_FILLER_PATTERN = re.compile(
+    r"请问|请|帮我|给我|讲讲|讲一下|解释一下|解释|介绍一下|介绍|说说|一下|"
+    r"为什么会有|为什么|为何|什么是|是什么|什么|怎么样|是怎么来的|怎么来的|怎么|如何|有哪些|吗|呢|吧|啊|的|了|是|\s|[^\w]"
+)
+
+# n-gram特征权重：单字、相邻字对、间隔一字的字对
+_UNIGRAM_WEIGHT = 1.0
+_PAIR_WEIGHTS = (0.8, 0.4)
+
+# 可以省略的单字（如 "天空" 与 "天"、"蓝色" 与 "蓝"），一方只多出这些字时仍视为同一主题
+_OPTIONAL_CHARS = frozenset("色空儿们子些")
+
+_ENTRY_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u8"), ("key", "<u8")])
+
+
+def topic_content(topic: str) -> str:
+    """
+    提取主题中的实词部分：归一化后去掉提问句式中的虚词和标点
+
+    Args:
+        topic (str): 原始主题
+
+    Returns:
+        str: 实词文本（全部被去掉时退回归一化主题）
+    """
+    normalized = normalize_topic(topic)
+    return _FILLER_PATTERN.sub("", normalized) or normalized.replace(" ", "")
+
+
+def _features(text: str) -> List[Tuple[str, float]]:
+    """主题实词的n-gram特征及权重"""
+    features = [(char, _UNIGRAM_WEIGHT) for char in text]
+    for gap, weight in enumerate(_PAIR_WEIGHTS, start=1):
+        features.extend((text[i] + text[i + gap], weight) for i in range(len(text) - gap))
+    return features
+
+
+def embed_topic(topic: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """
+    把主题编码为字符n-gram哈希向量（L2归一化，内积即余弦相似度）
+
+    Args:
+        topic (str): 原始主题
+        dim (int): 向量维度
+
+    Returns:
+        np.ndarray: float32向量
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in _features(topic_content(topic)):
+        # crc32 在各进程间稳定，不受 PYTHONHASHSEED 影响；最高位决定符号以抵消哈希冲突
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % dim] += weight if h & 0x80000000 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def topic_sketch(topic: str, size: int = DEFAULT_SKETCH_SIZE) -> np.ndarray:
+    """
+    主题的分桶键：字对特征（只有一个字时用单字）哈希值中最小的 size 个
+
+    Args:
+        topic (str): 原始主题
+        size (int): 分桶键个数
+
+    Returns:
+        np.ndarray: uint32数组（不足 size 个时补0）
+    """
+    text = topic_content(topic)
+    keys = {zlib.crc32(feature.encode("utf-8")) or 1 for feature, _ in _features(text) if len(feature) > 1}
+    if not keys and text:
+        keys = {zlib.crc32(text.encode("utf-8")) or 1}
+    sketch = np.zeros(size, dtype=np.uint32)
+    smallest = sorted(keys)[:size]
+    sketch[:len(smallest)] = smallest
+    return sketch
+
+
+def _topic_key(normalized: str) -> int:
+    """归一化主题的64位哈希，用于去重"""
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _common_subsequence(a: str, b: str) -> Tuple[List[bool], List[bool]]:
+    """
+    两段文本的最长公共子序列
+
+    Returns:
+        Tuple[List[bool], List[bool]]: 两侧每个字是否在公共子序列中
+    """
+    lengths = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) - 1, -1, -1):
+        for j in range(len(b) - 1, -1, -1):
+            if a[i] == b[j]:
+                lengths[i][j] = lengths[i + 1][j + 1] + 1
+            else:
+                lengths[i][j] = max(lengths[i + 1][j], lengths[i][j + 1])
+    matched_a, matched_b = [False] * len(a), [False] * len(b)
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] == b[j]:
+            matched_a[i] = matched_b[j] = True
+            i += 1
+            j += 1
+        elif lengths[i + 1][j] >= lengths[i][j + 1]:
+            i += 1
+        else:
+            j += 1
+    return matched_a, matched_b
+
+
+def _extra_runs(text: str, matched: List[bool]) -> List[str]:
+    """不在公共子序列中的连续片段（一方多出或被替换的词）"""
+    runs, current = [], ""
+    for char, is_matched in zip(text, matched):
+        if is_matched:
+            if current:
+                runs.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        runs.append(current)
+    return runs
+
+
+def _is_compatible(a: str, b: str) -> bool:
+    """
+    相似主题的校验：两侧实词按相同顺序出现，且任何一方都没有多出实词
+
+    按最长公共子序列对齐两侧实词，任一方公共部分以外的片段只能是可省略的单字：
+    - 只是多了 "空"、"色" 这类字（如 "天是蓝的" 与 "天空是蓝色"）视为同一主题
+    - 语序不同（如 "太阳绕着地球转" 与 "地球绕着太阳转"）不是
+    - 一方多出实词（如 "一氧化碳中毒" 与 "一氧化碳"、"勾股定理的逆定理" 与 "勾股定理"）范围不同，不是
+    - 有字被替换（如 "牛顿第一定律" 与 "牛顿第二定律"）不是
+    """
+    content_a, content_b = topic_content(a), topic_content(b)
+    matched_a, matched_b = _common_subsequence(content_a, content_b)
+    for text, matched in ((content_a, matched_a), (content_b, matched_b)):
+        for run in _extra_runs(text, matched):
+            if len(run) > 1 or run not in _OPTIONAL_CHARS:
+                return False
+    return True
+
+
+class SemanticIndex:
+    """语义近似主题索引"""
+
+    def __init__(self, path: str, dim: int = DEFAULT_DIM, sketch_size: int = DEFAULT_SKETCH_SIZE):
+        """
+        打开（或创建）索引目录
+
+        Args:
+            path (str): 索引目录
+            dim (int): 向量维度
+            sketch_size (int): 每个主题的分桶键个数，越多召回越高、候选越多
+        """
+        self.path = path
+        self.dim = dim
+        self.sketch_size = sketch_size
+        self._vectors_path = os.path.join(path, "vectors.bin")
+        self._sketches_path = os.path.join(path, "sketches.bin")
+        self._entries_path = os.path.join(path, "entries.bin")
+        self._topics_path = os.path.join(path, "topics.txt")
+        self._lock_path = os.path.join(path, ".lock")
+        # 三个文件按行对齐：(文件路径, 每行字节数)
+        self._row_files = (
+            (self._vectors_path, dim),
+            (self._sketches_path, 4 * sketch_size),
+            (self._entries_path, _ENTRY_DTYPE.itemsize),
+        )
+        self._lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self._check_meta()
+
+        self._size = 0
+        self._vectors = None
+        self._entries = None
+        self._built_size = 0
+        self._sorted_buckets = np.empty(0, dtype=np.uint32)
+        self._bucket_rows = np.empty(0, dtype=np.int64)
+        self._sorted_keys = np.empty(0, dtype=np.uint64)
+        self._tail_sketches = np.empty((0, sketch_size), dtype=np.uint32)
+        self._tail_keys = np.empty(0, dtype=np.uint64)
+        self._refresh()
+
+    def _check_meta(self):
+        """索引参数与已有文件不一致时清空索引（向量不能跨参数复用）"""
+        meta = {"version": INDEX_VERSION, "dim": self.dim, "sketch_size": self.sketch_size}
+        meta_path = os.path.join(self.path, "meta.json")
+        with self._file_lock():
+            if os.path.exists(meta_path):
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    if json.load(f) == meta:
+                        return
+                print("语义缓存索引参数已变更，重建索引")
+            for file_path in (self._vectors_path, self._sketches_path, self._entries_path, self._topics_path):
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """跨进程写锁（多个worker追加同一份索引）"""
+        with open(self._lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _file_rows(self) -> int:
+        """索引文件中完整写入的条数"""
+        try:
+            return min(os.path.getsize(path) // row_bytes for path, row_bytes in self._row_files)
+        except OSError:
+            return 0
+
+    def _refresh(self):
+        """载入其他worker新追加的条目（调用方持有 self._lock 或处于初始化中）"""
+        size = self._file_rows()
+        if size <= self._size:
+            return
+        self._vectors = np.memmap(self._vectors_path, dtype=np.int8, mode="r", shape=(size, self.dim))
+        self._entries = np.memmap(self._entries_path, dtype=_ENTRY_DTYPE, mode="r", shape=(size,))
+        sketches = np.memmap(self._sketches_path, dtype="<u4", mode="r", shape=(size, self.sketch_size))
+        if size - self._built_size > REBUILD_THRESHOLD:
+            # 所有分桶键排序后二分定位，查找耗时只与候选数有关
+            buckets = np.asarray(sketches).ravel()
+            rows = np.repeat(np.arange(size, dtype=np.int64), self.sketch_size)
+            valid = buckets != 0
+            buckets, rows = buckets[valid], rows[valid]
+            order = np.argsort(buckets, kind="stable")
+            self._sorted_buckets, self._bucket_rows = buckets[order], rows[order]
+            self._sorted_keys = np.sort(self._entries["key"])
+            self._built_size = size
+        self._tail_sketches = np.array(sketches[self._built_size:size])
+        self._tail_keys = np.array(self._entries["key"][self._built_size:size])
+        self._size = size
+
+    def _candidates(self, sketch: np.ndarray) -> np.ndarray:
+        """
+        收集与查询共享分桶键的条目
+
+        从最稀有的分桶键开始合并，累计超过 MAX_CANDIDATES 后不再合并更常见的分桶键：
+        近似重复的主题几乎共享全部分桶键，只看稀有的键不影响召回，却避免了常见字对带来的大量候选
+        """
+        sketch = sketch[sketch != 0]
+        lo = np.searchsorted(self._sorted_buckets, sketch, side="left")
+        hi = np.searchsorted(self._sorted_buckets, sketch, side="right")
+        parts, total = [], 0
+        if len(self._tail_sketches):
+            tail_rows = np.flatnonzero(np.isin(self._tail_sketches, sketch).any(axis=1))
+            parts.append(tail_rows + self._built_size)
+            total += len(tail_rows)
+        for i in np.argsort(hi - lo, kind="stable"):
+            if hi[i] == lo[i]:
+                continue
+            if total >= MAX_CANDIDATES:
+                break
+            parts.append(self._bucket_rows[lo[i]:min(hi[i], lo[i] + MAX_CANDIDATES)])
+            total += len(parts[-1])
+        rows = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        if not len(rows):
+            return rows
+        return rows[np.concatenate(([True], rows[1:] != rows[:-1]))]
+
+    def _read_topic(self, row: int) -> str:
+        """读取第 row 条的主题文本"""
+        entry = self._entries[row]
+        with open(self._topics_path, "rb") as f:
+            f.seek(int(entry["offset"]))
+            return f.read(int(entry["length"])).decode("utf-8")
+
+    def _contains_keys(self, keys: np.ndarray) -> np.ndarray:
+        """判断各主题哈希是否已在索引中"""
+        found = np.isin(keys, self._tail_keys)
+        if len(self._sorted_keys):
+            positions = np.searchsorted(self._sorted_keys, keys).clip(max=len(self._sorted_keys) - 1)
+            found |= self._sorted_keys[positions] == keys
+        return found
+
+    def search(self, topic: str, threshold: float, max_checks: int = 5) -> Optional[Tuple[str, float]]:
+        """
+        查找与主题最相似的已索引主题
+
+        Args:
+            topic (str): 原始主题
+            threshold (float): 余弦相似度阈值
+            max_checks (int): 超过阈值的候选中最多做几次主题校验
+
+        Returns:
+            Optional[Tuple[str, float]]: (已索引的归一化主题, 相似度)，无满足条件的主题时返回 None
+        """
+        vector = embed_topic(topic, self.dim)
+        if not vector.any():
+            return None
+        sketch = topic_sketch(topic, self.sketch_size)
+        with self._lock:
+            self._refresh()
+            rows = self._candidates(sketch)
+            if not len(rows):
+                return None
+            similarities = self._vectors[rows].astype(np.float32) @ (vector / _QUANT_SCALE)
+            above = np.flatnonzero(similarities >= threshold)
+            for i in above[np.argsort(-similarities[above])][:max_checks]:
+                matched = self._read_topic(int(rows[i]))
+                if _is_compatible(topic, matched):
+                    return matched, float(min(similarities[i], 1.0))
+        return None
+
+    def add(self, topic: str) -> bool:
+        """
+        把主题加入索引（已存在相同的归一化主题时跳过）
+
+        Args:
+            topic (str): 原始主题
+
+        Returns:
+            bool: 是否新增
+        """
+        return self.add_many([topic]) == 1
+
+    def add_many(self, topics: List[str]) -> int:
+        """
+        批量把主题加入索引（一次加锁、一次追加写入，适合预计算后导入）
+
+        Args:
+            topics (List[str]): 原始主题列表
+
+        Returns:
+            int: 新增的条数（已存在的主题和无实词的主题会被跳过）
+        """
+        normalized_topics = list(dict.fromkeys(normalize_topic(topic) for topic in topics))
+        normalized_topics = [topic for topic in normalized_topics if topic_content(topic)]
+        if not normalized_topics:
+            return 0
+
+        with self._lock, self._file_lock():
+            self._refresh()
+            keys = np.array([_topic_key(topic) for topic in normalized_topics], dtype=np.uint64)
+            new = ~self._contains_keys(keys)
+            normalized_topics = [topic for topic, is_new in zip(normalized_topics, new) if is_new]
+            if not normalized_topics:
+                return 0
+            vectors = np.stack([embed_topic(topic, self.dim) for topic in normalized_topics])
+            sketches = np.stack([topic_sketch(topic, self.sketch_size) for topic in normalized_topics])
+            encoded = [topic.encode("utf-8") + b"\n" for topic in normalized_topics]
+
+            # 上次写入中途退出时各文件条数可能不一致，先截断到相同条数
+            rows = self._file_rows()
+            for file_path, row_bytes in self._row_files:
+                with open(file_path, "ab") as f:
+                    if f.tell() != rows * row_bytes:
+                        f.truncate(rows * row_bytes)
+            with open(self._topics_path, "ab") as f:
+                offset = f.tell()
+                f.write(b"".join(encoded))
+            entries = np.zeros(len(encoded), dtype=_ENTRY_DTYPE)
+            entries["length"] = [len(data) - 1 for data in encoded]
+            entries["offset"] = offset + np.concatenate(([0], np.cumsum(entries["length"] + 1)[:-1]))
+            entries["key"] = keys[new]
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.round(vectors * _QUANT_SCALE).astype(np.int8).tobytes())
+            with open(self._sketches_path, "ab") as f:
+                f.write(sketches.astype("<u4").tobytes())
+            with open(self._entries_path, "ab") as f:
+                f.write(entries.tobytes())
+        return len(encoded)
+
+    def __len__(self) -> int:
+        """已索引的主题数"""
+        with self._lock:
+            self._refresh()
+            return self._size
+
+
+_semantic_index: Optional[SemanticIndex] = None
+_semantic_index_lock = threading.Lock()
+
+
+def get_semantic_index() -> SemanticIndex:
+    """
+    获取进程内共享的语义索引（按 Settings.semantic_cache_path 打开）
+
+    Returns:
+        SemanticIndex: 语义索引
+    """
+    global _semantic_index
+    with _semantic_index_lock:
+        if _semantic_index is None:
+            _semantic_index = SemanticIndex(settings.semantic_cache_path)
+        return _semantic_index
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多轮辅导会话存储
+每个会话在磁盘上是一个只追加的 JSON Lines 文件（首行为会话信息，之后每行一轮问答），
+同一台机器上的多个worker共享；内存中按最近使用保留有限数量的会话，
+文件被其他worker追加后按文件大小变化重新加载。追问时只取最近几轮、不超过token预算的对话作为上下文
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from backend.config.settings import settings
+from backend.utils.context_budget import count_tokens, truncate_to_tokens
+
+
+_SESSION_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class Session:
+    """一个辅导会话"""
+
+    def __init__(self, session_id: str, topic: str, created_at: float, turns: Optional[List[Dict[str, Any]]] = None):
+        """
+        初始化会话
+
+        Args:
+            session_id (str): 会话ID
+            topic (str): 会话主题（首轮的学习主题）
+            created_at (float): 创建时间戳
+            turns (List[Dict[str, Any]], optional): 已有的问答轮次（question/answer/ts）
+        """
+        self.session_id = session_id
+        self.topic = topic
+        self.created_at = created_at
+        self.turns = turns or []
+        # 同一会话的轮次串行处理（本worker内）
+        self.lock = threading.Lock()
+        self.file_size = 0
+
+    def context_window(self, max_turns: int, max_tokens: int) -> str:
+        """
+        取最近几轮对话作为追问的上下文（滑动窗口）
+
+        从最新一轮向前累加，超出token预算时停止；最新一轮本身超出预算时截断
+
+        Args:
+            max_turns (int): 最多取多少轮
+            max_tokens (int): token预算
+
+        Returns:
+            str: 按时间顺序排列的对话上下文
+        """
+        parts: List[str] = []
+        used = 0
+        for turn in reversed(self.turns[-max_turns:] if max_turns > 0 else []):
+            text = f"学生：{turn['question']}\n{turn['answer']}"
+            tokens = count_tokens(text)
+            if used + tokens > max_tokens:
+                if not parts:
+                    parts.append(truncate_to_tokens(text, max_tokens))
+                break
+            parts.append(text)
+            used += tokens
+        return "\n\n".join(reversed(parts))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出会话"""
+        return {
+            "session_id": self.session_id,
+            "topic": self.topic,
+            "created_at": self.created_at,
+            "turns": self.turns,
+        }
+
+
+class SessionStore:
+    """多轮辅导会话存储"""
+
+    def __init__(self, path: str, ttl: float = 86400.0, max_in_memory: int = 1000):
+        """
+        初始化会话存储（目录不存在时自动创建）
+
+        Args:
+            path (str): 会话文件目录
+            ttl (float): 会话闲置多久后过期（秒）
+            max_in_memory (int): 内存中保留的最近使用会话数
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_in_memory = max(1, max_in_memory)
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, session_id: str) -> str:
+        """会话文件路径"""
+        return os.path.join(self.path, f"{session_id}.jsonl")
+
+    def _append(self, session: Session, record: Dict[str, Any]):
+        """向会话文件追加一行并更新已知的文件大小"""
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with open(self._file(session.session_id), "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            session.file_size = f.tell()
+
+    def _load(self, session_id: str) -> Optional[Session]:
+        """从磁盘读取会话，不存在或已过期时返回 None"""
+        path = self._file(session_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if time.time() - stat.st_mtime > self.ttl:
+            self._remove_file(path)
+            return None
+        session = None
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 写入中途被中断的行
+                    continue
+                if session is None:
+                    session = Session(session_id, record["topic"], record["created_at"])
+                else:
+                    session.turns.append(record)
+            if session is not None:
+                session.file_size = f.tell()
+        return session
+
+    def _remove_file(self, path: str):
+        """删除过期的会话文件"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _remember(self, session: Session):
+        """放入内存并淘汰最久未使用的会话（调用方持有锁）"""
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        while len(self._sessions) > self.max_in_memory:
+            self._sessions.popitem(last=False)
+
+    def create(self, topic: str, question: str, answer: str) -> Session:
+        """
+        创建会话并写入首轮问答
+
+        Args:
+            topic (str): 学习主题
+            question (str): 首轮问题（通常即主题）
+            answer (str): 首轮通过审查的内容
+
+        Returns:
+            Session: 新会话
+        """
+        session = Session(uuid.uuid4().hex, topic, time.time())
+        self._append(session, {"topic": topic, "created_at": session.created_at})
+        self.add_turn(session, question, answer)
+        with self._lock:
+            self._remember(session)
+        self._cleanup_expired()
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """
+        读取会话（其他worker追加过轮次时重新加载）
+
+        Args:
+            session_id (str): 会话ID
+
+        Returns:
+            Optional[Session]: 会话，不存在或已过期时返回 None
+        """
+        if not _SESSION_ID_PATTERN.match(session_id):
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is not None:
+            try:
+                stat = os.stat(self._file(session_id))
+            except FileNotFoundError:
+                stat = None
+            if stat is not None and stat.st_size == session.file_size and time.time() - stat.st_mtime <= self.ttl:
+                with self._lock:
+                    self._sessions.move_to_end(session_id)
+                return session
+        session = self._load(session_id)
+        with self._lock:
+            if session is None:
+                self._sessions.pop(session_id, None)
+            else:
+                self._remember(session)
+        return session
+
+    def add_turn(self, session: Session, question: str, answer: str) -> Dict[str, Any]:
+        """
+        追加一轮问答
+
+        Args:
+            session (Session): 会话
+            question (str): 学生的问题
+            answer (str): 通过审查的回答
+
+        Returns:
+            Dict[str, Any]: 新的轮次记录
+        """
+        turn = {"question": question, "answer": answer, "ts": round(time.time(), 3)}
+        self._append(session, turn)
+        session.turns.append(turn)
+        return turn
+
+    def _cleanup_expired(self):
+        """删除闲置超过有效期的会话文件（随创建会话顺带执行，约每100次一次）"""
+        if uuid.uuid4().int % 100:
+            return
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".jsonl") and entry.stat().st_mtime < cutoff:
+                self._remove_file(entry.path)
+
+
+_session_store: Optional[SessionStore] = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """
+    获取进程内共享的会话存储（按 Settings.session_store_path 打开）
+
+    Returns:
+        SessionStore: 会话存储
+    """
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = SessionStore(settings.session_store_path, settings.session_ttl,
+                                          settings.session_max_in_memory)
+        return _session_store
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+跨进程共享缓存
+基于SQLite（WAL模式 + mmap读取）的键值缓存，同一台机器上的多个服务worker共享同一份缓存文件，
+任一worker写入的工作流结果对所有worker可见
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+from backend.config.settings import settings
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache (expires_at);
+"""
+
+
+class SharedCache:
+    """跨进程共享缓存"""
+
+    def __init__(self, path: str, default_ttl: float = 86400.0):
+        """
+        初始化共享缓存（文件不存在时自动创建）
+
+        Args:
+            path (str): SQLite缓存文件路径
+            default_ttl (float): 默认过期时间（秒）
+        """
+        self.path = path
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接（每个线程一个连接）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            # WAL 允许多进程并发读写，mmap 让读取直接命中页缓存
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA mmap_size=268435456")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存
+
+        Args:
+            key (str): 缓存键
+
+        Returns:
+            缓存值，不存在或已过期时返回 None
+        """
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        写入缓存
+
+        Args:
+            key (str): 缓存键
+            value: 可JSON序列化的缓存值
+            ttl (float, optional): 过期时间（秒），默认使用 default_ttl
+        """
+        expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), expires_at)
+        )
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """
+        仅当键不存在（或已过期）时写入，可用作跨进程的互斥租约
+
+        Args:
+            key (str): 缓存键
+            value: 可JSON序列化的缓存值
+            ttl (float, optional): 过期时间（秒），默认使用 default_ttl
+
+        Returns:
+            bool: 是否写入成功
+        """
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.default_ttl)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def delete(self, key: str):
+        """
+        删除缓存
+
+        Args:
+            key (str): 缓存键
+        """
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        """
+        清理已过期的缓存
+
+        Returns:
+            int: 清理的条数
+        """
+        cursor = self._connection().execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        """未过期的缓存条数"""
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM cache WHERE expires_at > ?", (time.time(),)
+        ).fetchone()
+        return row[0]
+
+
+_shared_cache: Optional[SharedCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache:
+    """
+    获取进程内共享的缓存实例（按 Settings.result_cache_path 打开）
+
+    Returns:
+        SharedCache: 共享缓存
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = SharedCache(settings.result_cache_path, settings.result_cache_ttl)
+        return _shared_cache
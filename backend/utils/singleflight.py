@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+请求合并（singleflight）
+相同键的并发请求只执行一次，所有等待者共享同一结果：
+- 进程内：同一事件循环中的协程共享一个 asyncio.Future
+- 跨进程：借助共享缓存中的租约选出唯一执行者，其他worker轮询其结果
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from backend.utils.shared_cache import SharedCache
+
+
+class SingleFlight:
+    """请求合并器"""
+
+    def __init__(self, shared_cache: Optional[SharedCache] = None, lease_ttl: float = 300.0,
+                 poll_interval: float = 0.2, result_ttl: float = 60.0):
+        """
+        初始化请求合并器
+
+        Args:
+            shared_cache (SharedCache, optional): 共享缓存，提供时跨worker合并
+            lease_ttl (float): 执行租约的有效期（秒），执行者异常退出后租约到期自动释放
+            poll_interval (float): 其他worker轮询结果的间隔（秒）
+            result_ttl (float): 执行结果在共享缓存中的保留时间（秒）
+        """
+        self.shared_cache = shared_cache
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"executions": 0, "local_shared": 0, "remote_shared": 0, "publish_errors": 0}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        执行或加入一次相同键的调用
+
+        Args:
+            key (str): 合并键（如归一化后的主题）
+            func (Callable[[], Awaitable[Any]]): 实际执行的协程函数
+
+        Returns:
+            Tuple[Any, bool]: 结果，以及该结果是否来自其他请求的执行
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["local_shared"] += 1
+            # shield：等待者被取消时不影响执行者
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result, shared = await self._execute(key, func)
+            future.set_result(result)
+            return result, shared
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _execute(self, key: str, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """在本进程执行，或在跨进程模式下等待持有租约的worker"""
+        if self.shared_cache is None:
+            self.stats["executions"] += 1
+            return await func(), False
+
+        lease_key = f"singleflight:lease:{key}"
+        deadline = time.monotonic() + self.lease_ttl
+        while True:
+            token = uuid.uuid4().hex
+            if await asyncio.to_thread(self.shared_cache.add, lease_key, token, self.lease_ttl):
+                return await self._execute_as_leader(lease_key, token, func), False
+
+            # 其他worker正在执行：等待其结果或租约释放
+            holder = await asyncio.to_thread(self.shared_cache.get, lease_key)
+            while holder is not None and time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                result = await asyncio.to_thread(self.shared_cache.get, f"singleflight:result:{holder}")
+                if result is not None:
+                    self.stats["remote_shared"] += 1
+                    return result["value"], True
+                holder = await asyncio.to_thread(self.shared_cache.get, lease_key)
+
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"等待其他worker执行超时: {key}")
+            # 租约已释放但没有结果（执行者失败），由本进程重新竞争执行
+
+    async def _execute_as_leader(self, lease_key: str, token: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """持有租约执行，并把结果发布给其他worker"""
+        self.stats["executions"] += 1
+        try:
+            result = await func()
+            try:
+                await asyncio.to_thread(self.shared_cache.set, f"singleflight:result:{token}",
+                                        {"value": result}, self.result_ttl)
+            except Exception as e:
+                # 发布失败只影响其他worker：租约释放后它们重新竞争执行，本请求照常返回结果
+                self.stats["publish_errors"] += 1
+                print(f"发布合并结果失败: {e}")
+            return result
+        finally:
+            try:
+                await asyncio.to_thread(self.shared_cache.delete, lease_key)
+            except Exception as e:
+                # 租约到期后自动释放
+                print(f"释放合并租约失败: {e}")
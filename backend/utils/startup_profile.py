@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+启动耗时分析
+以 python -X importtime 方式导入服务入口模块，汇总各模块的导入耗时，
+用于定位拖慢冷启动的依赖
+
+示例：
+    python backend/utils/startup_profile.py            # 分析 backend/main.py
+    python backend/utils/startup_profile.py --warm-up  # 同时统计预热耗时
+    python backend/utils/startup_profile.py --json startup_profile.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# importtime 输出格式：import time: self [us] | cumulative | imported package
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_importtime(module: str = "main", warm_up: bool = False) -> Dict[str, Any]:
+    """
+    在子进程中导入模块并采集 importtime 数据
+
+    Args:
+        module (str): 要导入的模块（相对 backend 目录）
+        warm_up (bool): 导入后是否调用模块的 warm_up()
+
+    Returns:
+        Dict[str, Any]: 总耗时、预热耗时及逐模块的导入耗时
+    """
+    warm_up_call = f"{module}.warm_up()" if warm_up else "pass"
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "imported = time.perf_counter()\n"
+        f"{warm_up_call}\n"
+        "print('__timing__', imported - start, time.perf_counter() - imported)\n"
+    )
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    wall_time = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{completed.stderr[-2000:]}")
+
+    modules = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                "module": name,
+                "self_ms": int(self_us) / 1000.0,
+                "cumulative_ms": int(cumulative_us) / 1000.0,
+                "depth": (len(indent) - 1) // 2,
+            })
+
+    import_s, warm_up_s = 0.0, 0.0
+    for line in completed.stdout.splitlines():
+        if line.startswith("__timing__"):
+            _, import_s, warm_up_s = line.split()
+    return {
+        "module": module,
+        "process_wall_ms": wall_time * 1000.0,
+        "import_ms": float(import_s) * 1000.0,
+        "warm_up_ms": float(warm_up_s) * 1000.0 if warm_up else None,
+        "modules": modules,
+    }
+
+
+def top_modules(modules: List[Dict[str, Any]], key: str, limit: int) -> List[Dict[str, Any]]:
+    """按指定字段取耗时最多的模块"""
+    return sorted(modules, key=lambda item: item[key], reverse=True)[:limit]
+
+
+def print_report(profile: Dict[str, Any], limit: int = 15):
+    """打印启动耗时报告"""
+    print(f"=== 启动耗时分析: {profile['module']} ===")
+    print(f"进程总耗时: {profile['process_wall_ms']:.1f} ms")
+    print(f"导入耗时:   {profile['import_ms']:.1f} ms（共 {len(profile['modules'])} 个模块）")
+    if profile["warm_up_ms"] is not None:
+        print(f"预热耗时:   {profile['warm_up_ms']:.1f} ms")
+
+    print(f"\n累计耗时最多的顶层依赖:")
+    # depth 0 为入口模块本身及预热时才导入的模块，depth 1 为入口模块直接导入的依赖
+    top_level = [item for item in profile["modules"]
+                 if item["depth"] <= 1 and item["module"] != profile["module"]]
+    for item in top_modules(top_level, "cumulative_ms", limit):
+        print(f"  {item['cumulative_ms']:9.1f} ms  {item['module']}")
+
+    print(f"\n自身耗时最多的模块:")
+    for item in top_modules(profile["modules"], "self_ms", limit):
+        print(f"  {item['self_ms']:9.1f} ms  {item['module']}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="服务启动耗时分析（python -X importtime）")
+    parser.add_argument("--module", default="main", help="要分析的模块（相对backend目录）")
+    parser.add_argument("--warm-up", action="store_true", help="同时统计 warm_up() 预热耗时")
+    parser.add_argument("--top", type=int, default=15, help="显示的模块数")
+    parser.add_argument("--json", default="", help="将完整结果写入JSON文件")
+    args = parser.parse_args()
+
+    profile = run_importtime(args.module, warm_up=args.warm_up)
+    print_report(profile, args.top)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(profile, f, ensure_ascii=False, indent=2)
+        print(f"\n[SUCCESS] 完整结果已保存至: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+统计工具
+延迟等样本的分位数计算，供并行候选、对冲请求、准入控制和压测脚本共用
+"""
+
+import math
+from typing import List, Optional
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    计算分位数（最近秩法）
+
+    Args:
+        values (List[float]): 样本
+        q (float): 分位（0-1）
+
+    Returns:
+        Optional[float]: 分位数，无样本时返回 None
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+主题文本工具
+对用户输入的学习主题做归一化，作为缓存、请求合并等场景的键
+"""
+
+import re
+import unicodedata
+
+
+# 主题首尾可忽略的标点和空白
+_TRIM_CHARS = " \t\r\n。.,，!！?？;；:：~～…、\"'“”‘’"
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_topic(topic: str) -> str:
+    """
+    归一化学习主题：全角转半角、统一大小写、合并空白、去掉首尾标点
+
+    例如 "  为什么天空是蓝色的？" 与 "为什么天空是蓝色的" 得到相同结果
+
+    Args:
+        topic (str): 原始主题
+
+    Returns:
+        str: 归一化后的主题
+    """
+    text = unicodedata.normalize("NFKC", topic).lower()
+    text = _WHITESPACE_PATTERN.sub(" ", text)
+    return text.strip(_TRIM_CHARS)
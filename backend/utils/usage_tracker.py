@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+token用量与成本统计
+每次模型调用的输入、输出和命中前缀缓存的token数按请求（contextvars 传递，跨线程时需复制上下文）、
+阶段、模型和尝试次数汇总，并按 Settings.model_pricing 折算成本；
+进程内同时累计各阶段、各模型的总量和最近一段时间的滚动总量，以及结果缓存节省的用量
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from backend.config.settings import settings
+
+
+# 滚动统计的时间窗口（秒）
+ROLLING_WINDOW = 3600
+
+_current_usage: contextvars.ContextVar[Optional["RequestUsage"]] = contextvars.ContextVar(
+    "request_usage", default=None
+)
+
+
+@lru_cache(maxsize=8)
+def parse_pricing(spec: str) -> Dict[str, Tuple[float, float]]:
+    """
+    解析模型单价配置
+
+    Args:
+        spec (str): 逗号分隔的 模型=输入单价/输出单价（元/百万token），如 qwen-flash=0.15/1.5
+
+    Returns:
+        Dict[str, Tuple[float, float]]: 模型到（输入单价, 输出单价）的映射
+    """
+    pricing = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        model, prices = item.split("=", 1)
+        try:
+            input_price, output_price = (float(value) for value in prices.split("/", 1))
+        except ValueError:
+            print(f"忽略无法解析的模型单价: {item.strip()}")
+            continue
+        pricing[model.strip()] = (input_price, output_price)
+    return pricing
+
+
+def call_cost(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> Optional[float]:
+    """
+    计算一次模型调用的成本
+
+    Args:
+        model (str): 模型名称
+        input_tokens (int): 输入token数（含命中缓存的部分）
+        output_tokens (int): 输出token数
+        cached_tokens (int): 命中前缀缓存的输入token数，按 CACHED_INPUT_PRICE_RATIO 折算
+
+    Returns:
+        Optional[float]: 成本（元），未配置单价的模型返回 None
+    """
+    price = parse_pricing(settings.model_pricing).get(model)
+    if price is None:
+        return None
+    input_price, output_price = price
+    cached_tokens = min(cached_tokens, input_tokens)
+    billed_input = (input_tokens - cached_tokens) + cached_tokens * settings.cached_input_price_ratio
+    return (billed_input * input_price + output_tokens * output_price) / 1_000_000
+
+
+def _empty_bucket() -> Dict[str, Any]:
+    """空的用量汇总"""
+    return {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0, "cost": 0.0}
+
+
+def _add_to_bucket(bucket: Dict[str, Any], record: Dict[str, Any]):
+    """把一次调用（或一段汇总）累加到用量汇总"""
+    bucket["calls"] += record.get("calls", 1)
+    bucket["input_tokens"] += record["input_tokens"]
+    bucket["output_tokens"] += record["output_tokens"]
+    bucket["cached_tokens"] += record["cached_tokens"]
+    bucket["cost"] += record["cost"] or 0.0
+
+
+def _rounded(bucket: Dict[str, Any]) -> Dict[str, Any]:
+    """导出时把成本保留6位小数"""
+    return dict(bucket, cost=round(bucket["cost"], 6))
+
+
+class RequestUsage:
+    """单个请求内各次模型调用的用量"""
+
+    def __init__(self):
+        """初始化用量记录"""
+        self.calls: List[Dict[str, Any]] = []
+        # 当前处于第几次生成-审查尝试（由工作流设置），用于区分首次尝试与重试的开销
+        self.attempt = 1
+        self._lock = threading.Lock()
+
+    def add(self, record: Dict[str, Any]):
+        """
+        记录一次调用
+
+        Args:
+            record (Dict[str, Any]): 调用记录（stage/model/input_tokens/output_tokens/cached_tokens/cost）
+        """
+        with self._lock:
+            self.calls.append(dict(record, attempt=self.attempt))
+    
+    def merge(self, other: "RequestUsage"):
+        """
+        并入另一份用量记录（保留其中各调用的尝试次数），用于单独记账的子任务
+
+        Args:
+            other (RequestUsage): 子任务的用量记录
+        """
+        with other._lock:
+            calls = list(other.calls)
+        with self._lock:
+            self.calls.extend(calls)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        按阶段、模型和尝试次数汇总
+
+        Returns:
+            Dict[str, Any]: 总量及 by_stage / by_model / by_attempt 分项，未配置单价的模型列在 unpriced_models
+        """
+        with self._lock:
+            calls = list(self.calls)
+        totals = _empty_bucket()
+        by_stage: Dict[str, Dict[str, Any]] = {}
+        by_model: Dict[str, Dict[str, Any]] = {}
+        by_attempt: Dict[str, Dict[str, Any]] = {}
+        unpriced = set()
+        for call in calls:
+            _add_to_bucket(totals, call)
+            _add_to_bucket(by_stage.setdefault(call["stage"], _empty_bucket()), call)
+            _add_to_bucket(by_model.setdefault(call["model"], _empty_bucket()), call)
+            _add_to_bucket(by_attempt.setdefault(str(call["attempt"]), _empty_bucket()), call)
+            if call["cost"] is None:
+                unpriced.add(call["model"])
+        return {
+            "totals": _rounded(totals),
+            "by_stage": {name: _rounded(bucket) for name, bucket in by_stage.items()},
+            "by_model": {name: _rounded(bucket) for name, bucket in by_model.items()},
+            "by_attempt": {name: _rounded(bucket) for name, bucket in by_attempt.items()},
+            "unpriced_models": sorted(unpriced),
+        }
+
+
+class UsageTotals:
+    """进程内的累计用量（本worker）"""
+
+    def __init__(self):
+        """初始化累计统计"""
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.totals = _empty_bucket()
+        self.by_stage: Dict[str, Dict[str, Any]] = {}
+        self.by_model: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+        self.cache_hits = 0
+        self.saved = _empty_bucket()
+        self._recent: Deque[Tuple[float, Dict[str, Any]]] = deque()
+        self._lock = threading.Lock()
+
+    def record_call(self, record: Dict[str, Any]):
+        """
+        累计一次模型调用
+
+        Args:
+            record (Dict[str, Any]): 调用记录
+        """
+        with self._lock:
+            _add_to_bucket(self.totals, record)
+            _add_to_bucket(self.by_stage.setdefault(record["stage"], _empty_bucket()), record)
+            _add_to_bucket(self.by_model.setdefault(record["model"], _empty_bucket()), record)
+            self._recent.append((time.time(), record))
+            self._expire()
+
+    def record_request(self, cached_usage: Optional[Dict[str, Any]] = None):
+        """
+        累计一次请求
+
+        Args:
+            cached_usage (Dict[str, Any], optional): 命中结果缓存时，缓存结果首次生成时的用量汇总（即本次节省的用量）
+        """
+        with self._lock:
+            self.requests += 1
+            if cached_usage is not None:
+                self.cache_hits += 1
+                totals = cached_usage.get("totals")
+                if totals:
+                    _add_to_bucket(self.saved, totals)
+
+    def _expire(self):
+        """移除滚动窗口之外的调用记录（调用方持有锁）"""
+        cutoff = time.time() - ROLLING_WINDOW
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出累计用量
+
+        Returns:
+            Dict[str, Any]: 启动以来的总量、分阶段与分模型用量、请求数与缓存节省，以及最近一小时的滚动总量
+        """
+        with self._lock:
+            self._expire()
+            recent = _empty_bucket()
+            for _, record in self._recent:
+                _add_to_bucket(recent, record)
+            return {
+                "since": self.started_at,
+                "totals": _rounded(self.totals),
+                "by_stage": {name: _rounded(bucket) for name, bucket in self.by_stage.items()},
+                "by_model": {name: _rounded(bucket) for name, bucket in self.by_model.items()},
+                "requests": {
+                    "count": self.requests,
+                    "cache_hits": self.cache_hits,
+                    "avg_cost": round(self.totals["cost"] / self.requests, 6) if self.requests else None,
+                    "saved_by_cache": _rounded(self.saved),
+                },
+                "rolling": dict(_rounded(recent), window_seconds=ROLLING_WINDOW),
+            }
+
+
+# 全局累计统计实例
+usage_totals = UsageTotals()
+
+
+@contextmanager
+def track_request_usage() -> Iterator[RequestUsage]:
+    """
+    在当前上下文中记录一个请求的用量
+
+    Returns:
+        Iterator[RequestUsage]: 本请求的用量记录
+    """
+    usage = RequestUsage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+def current_request_usage() -> Optional[RequestUsage]:
+    """当前上下文中的请求用量记录，不在请求内时返回 None"""
+    return _current_usage.get()
+
+
+def record_usage(stage: str, model: str, usage: Dict[str, Any]):
+    """
+    记录一次模型调用的用量（计入当前请求和进程累计）
+
+    Args:
+        stage (str): 阶段（提示词模板名称）
+        model (str): 模型名称
+        usage (Dict[str, Any]): 提供方返回的 usage
+    """
+    input_tokens = usage.get("input_tokens", 0) or 0
+    output_tokens = usage.get("output_tokens", 0) or 0
+    cached_tokens = usage.get("cached_tokens", 0) or 0
+    record = {
+        "stage": stage,
+        "model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cached_tokens": cached_tokens,
+        "cost": call_cost(model, input_tokens, output_tokens, cached_tokens),
+    }
+    request_usage = _current_usage.get()
+    if request_usage is not None:
+        request_usage.add(record)
+    usage_totals.record_call(record)
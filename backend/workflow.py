@@ -6,20 +6,146 @@
 协调各个Agent完成完整的知识辅助学习流程
 """
 
-from typing import Dict, Any
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple, Union
 from backend.agents.prompt_optimizer_agent import PromptOptimizerAgent
 from backend.agents.content_generator_agent import ContentGeneratorAgent
 from backend.agents.knowledge_reviewer_agent import KnowledgeReviewerAgent
+from backend.agents.reviewer_ensemble import ReviewerEnsemble, parse_members
+from backend.config.settings import settings
+from backend.utils.best_of_n import PARALLEL_MODE, SERIAL_MODE, best_of_n_stats
+from backend.utils.cancellation import (
+    CancelScope, RequestCancelled, cancel_scope, check_cancelled, current_scope, ensure_scope
+)
+from backend.utils.context_budget import assemble_retry_prompt, count_tokens
+from backend.utils.incremental_review import ReviewLedger, render_delta, review_scope
+from backend.utils.model_router import ModelRouter
+from backend.utils.prompt_gate import assess_prompt, prompt_coverage
+from backend.utils.shared_cache import SharedCache, get_shared_cache
+from backend.utils.topic_utils import normalize_topic
+from backend.utils.usage_tracker import RequestUsage, current_request_usage, track_request_usage, usage_totals
+
+if TYPE_CHECKING:
+    from backend.utils.semantic_cache import SemanticIndex
+
+
+def result_cache_key(topic: str) -> str:
+    """
+    工作流结果在共享缓存中的键（按归一化主题）
+    
+    Args:
+        topic (str): 学习主题
+        
+    Returns:
+        str: 缓存键
+    """
+    return f"workflow:{normalize_topic(topic)}"
+
+
+_speculation_executor: Optional[ThreadPoolExecutor] = None
+_speculation_lock = threading.Lock()
+
+
+def _get_speculation_executor() -> ThreadPoolExecutor:
+    """推测生成使用的线程池（所有工作流管理器共享，首次使用时创建）"""
+    global _speculation_executor
+    with _speculation_lock:
+        if _speculation_executor is None:
+            _speculation_executor = ThreadPoolExecutor(
+                max_workers=settings.pipeline_concurrency, thread_name_prefix="speculative"
+            )
+        return _speculation_executor
+
+
+_candidate_executor: Optional[ThreadPoolExecutor] = None
+_candidate_lock = threading.Lock()
+
+
+def _get_candidate_executor() -> ThreadPoolExecutor:
+    """并行候选使用的线程池（所有工作流管理器共享，首次使用时创建）"""
+    global _candidate_executor
+    with _candidate_lock:
+        if _candidate_executor is None:
+            _candidate_executor = ThreadPoolExecutor(
+                max_workers=settings.pipeline_concurrency * max(settings.best_of_n, 1), thread_name_prefix="candidate"
+            )
+        return _candidate_executor
 
 
 class WorkflowManager:
     """工作流管理器"""
     
-    def __init__(self):
-        """初始化工作流管理器"""
-        self.prompt_optimizer = PromptOptimizerAgent()
-        self.content_generator = ContentGeneratorAgent()
-        self.knowledge_reviewer = KnowledgeReviewerAgent()
+    def __init__(self, result_cache: Optional[SharedCache] = None,
+                 semantic_index: Optional["SemanticIndex"] = None,
+                 model_router: Optional[ModelRouter] = None):
+        """
+        初始化工作流管理器（各Agent在首次使用时创建）
+        
+        Args:
+            result_cache (SharedCache, optional): 结果缓存，默认在 RESULT_CACHE_ENABLED 时使用共享缓存
+            semantic_index (SemanticIndex, optional): 语义近似主题索引，默认在 SEMANTIC_CACHE_ENABLED 时使用共享索引，
+                需配合结果缓存使用
+            model_router (ModelRouter, optional): 生成模型路由，默认在 MODEL_ROUTING_ENABLED 时创建
+        """
+        self._prompt_optimizer = None
+        self._content_generator = None
+        self._knowledge_reviewer = None
+        # 并发请求同时首次使用时只创建一次Agent
+        self._agents_lock = threading.Lock()
+        if result_cache is None and settings.result_cache_enabled:
+            result_cache = get_shared_cache()
+        self.result_cache = result_cache
+        if semantic_index is None and settings.semantic_cache_enabled and result_cache is not None:
+            # 语义索引依赖NumPy，仅在启用时导入，不拖慢默认配置的冷启动
+            from backend.utils.semantic_cache import get_semantic_index
+            semantic_index = get_semantic_index()
+        self.semantic_index = semantic_index
+        if model_router is None and settings.model_routing_enabled:
+            model_router = ModelRouter()
+        self.model_router = model_router
+    
+    @property
+    def prompt_optimizer(self) -> PromptOptimizerAgent:
+        """提示词优化Agent"""
+        if self._prompt_optimizer is None:
+            with self._agents_lock:
+                if self._prompt_optimizer is None:
+                    self._prompt_optimizer = PromptOptimizerAgent()
+        return self._prompt_optimizer
+    
+    @property
+    def content_generator(self) -> ContentGeneratorAgent:
+        """内容生成Agent"""
+        if self._content_generator is None:
+            with self._agents_lock:
+                if self._content_generator is None:
+                    self._content_generator = ContentGeneratorAgent()
+        return self._content_generator
+    
+    @property
+    def knowledge_reviewer(self) -> Union[KnowledgeReviewerAgent, ReviewerEnsemble]:
+        """知识审查Agent（配置了 REVIEW_ENSEMBLE 时为并行审查组）"""
+        if self._knowledge_reviewer is None:
+            with self._agents_lock:
+                if self._knowledge_reviewer is None:
+                    members = parse_members(settings.review_ensemble)
+                    if len(members) > 1:
+                        self._knowledge_reviewer = ReviewerEnsemble(members, settings.review_quorum)
+                    elif members:
+                        self._knowledge_reviewer = KnowledgeReviewerAgent(*members[0])
+                    else:
+                        self._knowledge_reviewer = KnowledgeReviewerAgent()
+        return self._knowledge_reviewer
+    
+    def warm_up(self):
+        """预热：创建所有Agent并初始化其模型提供方，加载本地分词器"""
+        for agent in (self.prompt_optimizer, self.content_generator, self.knowledge_reviewer):
+            agent.warm_up()
+        count_tokens("预热")
     
     def process_request(self, user_input: str) -> Dict[str, Any]:
         """
@@ -28,6 +154,26 @@ class WorkflowManager:
         Args:
             user_input (str): 用户输入的原始请求
             
+        Returns:
+            Dict[str, Any]: 处理结果，usage 字段为本次请求各阶段、各模型的token用量和成本
+        """
+        # 沿用调用方（如Web服务按客户端连接）的取消范围；没有时按 WORKFLOW_TIMEOUT 限制整个工作流
+        with ensure_scope(settings.workflow_timeout), track_request_usage() as usage:
+            result = self._process_request(user_input, usage)
+        # 命中结果缓存时，缓存结果中的用量是首次生成时的开销，即本次节省的用量
+        cached_usage = result.get("usage") if result.get("cached") else None
+        result["usage"] = usage.summary()
+        usage_totals.record_request(cached_usage)
+        return result
+    
+    def _process_request(self, user_input: str, usage: RequestUsage) -> Dict[str, Any]:
+        """
+        执行工作流
+        
+        Args:
+            user_input (str): 用户输入的原始请求
+            usage (RequestUsage): 本次请求的用量记录
+            
         Returns:
             Dict[str, Any]: 处理结果
         """
@@ -38,48 +184,90 @@ class WorkflowManager:
             "review_passed": False,
             "review_feedback": "",
             "final_content": "",
-            "retry_count": 0  # 添加重试次数记录
+            "retry_count": 0,  # 添加重试次数记录
+            "cached": False
         }
         
+        # 命中结果缓存时直接返回（缓存由所有worker共享）
+        cache_key = result_cache_key(user_input)
+        cached = self._get_cached_result(cache_key)
+        if cached is not None:
+            print("命中结果缓存，直接返回")
+            cached.update({"original_input": user_input, "cached": True})
+            return cached
+        
+        # 表述不同但主题相同时复用相似主题的结果
+        cached = self._get_semantic_result(user_input)
+        if cached is not None:
+            return cached
+        
         try:
-            # 1. 优化提示词（只需要一次）
-            print("正在优化提示词...")
-            optimized_prompt = self.prompt_optimizer.process(user_input)
+            # 1. 优化提示词（只需要一次；输入已是完整提示词时可跳过，或与首次生成并行）
+            optimized_prompt, speculative = self._optimize_prompt(user_input, result)
             result["optimized_prompt"] = optimized_prompt
             
+            # 按提示词复杂度选择生成模型；重试时改用重型模型
+            if speculative is not None:
+                route = speculative["route"]
+            else:
+                route = self.model_router.route(optimized_prompt) if self.model_router else None
+            first_model = retry_model = None
+            if route is not None:
+                result["model_route"] = route
+                first_model, retry_model = route["model"], self.model_router.heavy_model
+                print(f"模型路由: {route['route']}（{route['model']}，复杂度 {route['score']}）")
+            first_latency = 0.0
+            
             # 2. 生成对话内容并进行审查，最多重试3次
+            ledger = ReviewLedger() if settings.incremental_review_enabled else None
             max_retries = 3
             current_attempt = 0
             dialog_content = ""
             review_passed = False
             review_feedback = ""
+            candidates = self._candidate_count() if speculative is None else 1
+            loop_start = time.time()
             
             while current_attempt <= max_retries:
+                check_cancelled()
                 current_attempt += 1
+                usage.attempt = current_attempt
                 print(f"正在进行第 {current_attempt} 次生成和审查...")
+                reviewed = False
                 
-                if current_attempt == 1:
+                if current_attempt == 1 and candidates > 1:
+                    # 并行生成并审查多个候选，采用最先通过审查的一个
+                    dialog_content, review_passed, review_feedback, first_latency = self._best_of_n(
+                        optimized_prompt, first_model, candidates, ledger, result
+                    )
+                    reviewed = True
+                elif current_attempt == 1 and speculative is not None:
+                    # 推测生成的内容已可直接使用
+                    dialog_content = speculative["content"]
+                    first_latency = speculative["latency"]
+                elif current_attempt == 1:
                     # 第一次尝试，直接使用优化后的提示词
                     print("正在生成对话内容...")
-                    dialog_content = self.content_generator.process(optimized_prompt)
+                    generation_start = time.time()
+                    dialog_content = self.content_generator.process(optimized_prompt, model_name=first_model)
+                    first_latency = time.time() - generation_start
                 else:
                     # 重试时，将审查反馈作为上下文提供给内容生成器
                     print(f"第 {current_attempt} 次生成（基于审查反馈）...")
-                    # 构造新的提示词，包含审查反馈
-                    feedback_enhanced_prompt = f"""原始要求：{optimized_prompt}
-
-之前的生成内容：
-{dialog_content}
-
-审查反馈：
-{review_feedback}
-
-请根据审查反馈改进内容，确保事实准确、符合要求。"""
-                    dialog_content = self.content_generator.process(feedback_enhanced_prompt)
+                    # 构造新的提示词，包含审查反馈（超出token预算时只保留反馈指出问题的片段）
+                    feedback_enhanced_prompt, context_info = assemble_retry_prompt(
+                        optimized_prompt, dialog_content, review_feedback, settings.retry_context_budget
+                    )
+                    result.setdefault("retry_context", []).append(context_info)
+                    if context_info["strategy"] != "full":
+                        print(f"重试提示词超出预算（{context_info['original_tokens']} > {context_info['budget']} tokens），"
+                              f"压缩为 {context_info['tokens']} tokens（{context_info['strategy']}）")
+                    dialog_content = self.content_generator.process(feedback_enhanced_prompt, model_name=retry_model)
                 
-                # 3. 知识审查
-                print("正在审查内容...")
-                review_passed, review_feedback = self.knowledge_reviewer.process(dialog_content)
+                # 3. 知识审查（并行候选已各自审查）
+                if not reviewed:
+                    print("正在审查内容...")
+                    review_passed, review_feedback = self._review(dialog_content, ledger, result)
                 
                 # 记录审查结果
                 result["review_feedback"] = review_feedback
@@ -98,18 +286,384 @@ class WorkflowManager:
                     else:
                         print("已达到最大重试次数，停止生成")
             
+            if route is not None:
+                self.model_router.record(route["route"], first_latency, result["retry_count"] == 0 and review_passed,
+                                         result["retry_count"])
+            if settings.best_of_n > 1 and speculative is None:
+                # 串行请求作为对照，比较两种模式生成-审查阶段（含重试）的延迟
+                best_of_n_stats.record_latency(PARALLEL_MODE if candidates > 1 else SERIAL_MODE,
+                                               time.time() - loop_start)
+            
             # 如果所有尝试都失败了
             if not review_passed:
                 result["review_passed"] = False
                 result["final_content"] = ""
                 print("所有尝试均未通过审查，无法提供内容")
                 
+        except RequestCancelled as e:
+            print(f"工作流已停止: {e}")
+            result.update({"error": f"请求已取消: {e}", "cancelled": True})
         except Exception as e:
             print(f"处理过程中发生错误: {e}")
             result["error"] = str(e)
         
+        # 只缓存通过审查的结果（连同生成它的用量，供命中缓存时统计节省的开销）
+        if result["review_passed"] and "error" not in result:
+            result["usage"] = usage.summary()
+            self._set_cached_result(cache_key, result)
+            self._add_semantic_topic(user_input)
+        
         return result
     
+    def process_followup(self, topic: str, history: str, question: str,
+                         previous_answers: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        处理会话中的追问：跳过提示词优化，以最近几轮对话为上下文只生成新增内容，并只审查新增内容
+        
+        Args:
+            topic (str): 会话主题
+            history (str): 最近几轮对话（滑动窗口内的上下文）
+            question (str): 学生的追问
+            previous_answers (List[str], optional): 会话中之前各轮已审查通过的回答，增量审查时不再送审其中的轮次
+            
+        Returns:
+            Dict[str, Any]: 处理结果，dialog_content/final_content 为新增的对话内容
+        """
+        with ensure_scope(settings.workflow_timeout), track_request_usage() as usage:
+            result = self._process_followup(topic, history, question, previous_answers, usage)
+        result["usage"] = usage.summary()
+        usage_totals.record_request()
+        return result
+    
+    def _process_followup(self, topic: str, history: str, question: str,
+                          previous_answers: Optional[List[str]], usage: RequestUsage) -> Dict[str, Any]:
+        """
+        执行追问的生成-审查循环
+        
+        Args:
+            topic (str): 会话主题
+            history (str): 最近几轮对话
+            question (str): 学生的追问
+            previous_answers (List[str], optional): 之前各轮已审查通过的回答
+            usage (RequestUsage): 本次请求的用量记录
+            
+        Returns:
+            Dict[str, Any]: 处理结果
+        """
+        result = {
+            "question": question,
+            "dialog_content": "",
+            "review_passed": False,
+            "review_feedback": "",
+            "final_content": "",
+            "retry_count": 0
+        }
+        try:
+            # 追问通常比首轮主题简单，按问题本身路由；不计入路由统计，以免影响完整工作流的阈值调整
+            route = self.model_router.route(question) if self.model_router else None
+            first_model = retry_model = None
+            if route is not None:
+                result["model_route"] = route
+                first_model, retry_model = route["model"], self.model_router.heavy_model
+            
+            ledger = ReviewLedger(previous_answers) if settings.incremental_review_enabled else None
+            content = ""
+            review_feedback = ""
+            for attempt in range(1, settings.session_followup_retries + 2):
+                check_cancelled()
+                usage.attempt = attempt
+                if attempt == 1:
+                    print("正在生成追问的回答...")
+                    content = self.content_generator.continue_dialog(topic, history, question, model_name=first_model)
+                else:
+                    print(f"第 {attempt} 次生成追问的回答（基于审查反馈）...")
+                    retry_prompt, context_info = assemble_retry_prompt(
+                        f"围绕“{topic}”回答学生的追问：{question}", content, review_feedback,
+                        settings.retry_context_budget
+                    )
+                    result.setdefault("retry_context", []).append(context_info)
+                    content = self.content_generator.process(retry_prompt, model_name=retry_model)
+                
+                # 之前的轮次已审查通过，只审查新增内容
+                review_passed, review_feedback = self._review(content, ledger, result)
+                result["review_feedback"] = review_feedback
+                result["retry_count"] = attempt - 1
+                if review_passed:
+                    result.update({"review_passed": True, "dialog_content": content, "final_content": content})
+                    break
+                print(f"追问的回答第 {attempt} 次审查未通过，{review_feedback}")
+        except RequestCancelled as e:
+            print(f"追问处理已停止: {e}")
+            result.update({"error": f"请求已取消: {e}", "cancelled": True})
+        except Exception as e:
+            print(f"处理追问时发生错误: {e}")
+            result["error"] = str(e)
+        return result
+    
+    def _candidate_count(self) -> int:
+        """
+        本次请求首次生成的候选数（按 BEST_OF_N、采用比例和成本上限确定）
+
+        Returns:
+            int: 候选数，1 表示走串行流程
+        """
+        count = settings.best_of_n
+        if count <= 1 or random.random() >= settings.best_of_n_fraction:
+            return 1
+        candidate_cost = best_of_n_stats.avg_candidate_cost()
+        if settings.best_of_n_max_cost > 0 and candidate_cost:
+            count = min(count, int(settings.best_of_n_max_cost / candidate_cost))
+        return max(count, 1)
+
+    def _best_of_n(self, prompt: str, model_name: Optional[str], candidates: int,
+                   ledger: Optional[ReviewLedger], result: Dict[str, Any]) -> Tuple[str, bool, str, float]:
+        """
+        并行生成并审查多个候选，采用最先通过审查的一个并取消其余候选：
+        尚未开始的不再执行，已在执行的不再等待当前调用、也不再发起后续调用；
+        返回前等待所有候选结束，使其用量在汇总前全部并入本次请求
+
+        Args:
+            prompt (str): 优化后的提示词
+            model_name (str, optional): 生成模型，默认使用 GENERATOR_MODEL
+            candidates (int): 候选数
+            ledger (ReviewLedger, optional): 本次工作流的审查结论记录
+            result (Dict[str, Any]): 本次处理结果
+
+        Returns:
+            Tuple[str, bool, str, float]: 采用的内容、是否通过审查、审查反馈和该候选的生成耗时；
+                全部未通过时返回最先完成审查的候选，供后续重试使用
+        """
+        print(f"并行生成 {candidates} 个候选...")
+        executor = _get_candidate_executor()
+        parent_usage = current_request_usage()
+        futures: Dict[Future, int] = {}
+        scopes: List[CancelScope] = []
+        for index in range(candidates):
+            scope = CancelScope(parent=current_scope())
+            scopes.append(scope)
+            future = executor.submit(contextvars.copy_context().run, self._run_candidate, prompt, model_name,
+                                     ledger.fork() if ledger is not None else None, parent_usage, scope)
+            futures[future] = index
+
+        pending = set(futures)
+        winner: Optional[Tuple[int, Dict[str, Any]]] = None
+        failed = []
+        errors = []
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=futures.get):
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if not outcome["passed"]:
+                    failed.append((futures[future], outcome))
+                elif winner is None:
+                    winner = (futures[future], outcome)
+        not_started = sum(1 for future in pending if future.cancel())
+        for future in pending:
+            scopes[futures[future]].cancel("已采用其他候选")
+        # 被取消的候选很快结束；等待其用量并入后再返回，请求的用量汇总才完整且稳定
+        wait(pending)
+        cancelled = len(pending)
+        best_of_n_stats.record_candidates(candidates - not_started, cancelled, winner[0] if winner else None)
+
+        if winner is not None:
+            index, outcome = winner
+            print(f"采用第 {index + 1} 个候选（取消其余 {cancelled} 个候选，其中 {not_started} 个尚未开始）")
+        elif failed:
+            index, outcome = failed[0]
+            print(f"{candidates} 个候选均未通过审查")
+        else:
+            # 所有候选都出错
+            raise errors[0]
+        result["candidates"] = {"count": candidates, "winner": index if winner else None, "cancelled": cancelled}
+        if outcome["review_scope"]:
+            result.setdefault("review_scope", []).extend(outcome["review_scope"])
+        if ledger is not None:
+            # 之后基于该候选重试，沿用其逐轮审查结论
+            ledger.merge(outcome["ledger"])
+        return outcome["content"], outcome["passed"], outcome["feedback"], outcome["latency"]
+
+    def _run_candidate(self, prompt: str, model_name: Optional[str], ledger: Optional[ReviewLedger],
+                       parent_usage: Optional[RequestUsage], scope: CancelScope) -> Dict[str, Any]:
+        """
+        在候选自己的取消范围内生成并审查一个候选（单独记账以统计单个候选的成本，结束后并入本次请求的用量）
+
+        Args:
+            prompt (str): 优化后的提示词
+            model_name (str, optional): 生成模型
+            ledger (ReviewLedger, optional): 该候选自己的审查结论记录
+            parent_usage (RequestUsage, optional): 本次请求的用量记录
+            scope (CancelScope): 候选的取消范围，采用其他候选后被取消
+
+        Returns:
+            Dict[str, Any]: 候选内容、审查结果、反馈、生成耗时、送审范围和该候选的审查结论记录
+        """
+        scratch: Dict[str, Any] = {}
+        with cancel_scope(scope), track_request_usage() as candidate_usage:
+            try:
+                start = time.time()
+                content = self.content_generator.process(prompt, model_name=model_name)
+                latency = time.time() - start
+                passed, feedback = self._review(content, ledger, scratch)
+            finally:
+                if parent_usage is not None:
+                    parent_usage.merge(candidate_usage)
+        best_of_n_stats.record_candidate_cost(candidate_usage.summary()["totals"]["cost"])
+        return {
+            "content": content,
+            "passed": passed,
+            "feedback": feedback,
+            "latency": latency,
+            "review_scope": scratch.get("review_scope", []),
+            "ledger": ledger,
+        }
+
+    def _review(self, content: str, ledger: Optional[ReviewLedger], result: Dict[str, Any]) -> Tuple[bool, str]:
+        """
+        审查内容；启用增量审查时只送审新增、改动或上次被反馈引用的轮次，并把送审范围记入 result["review_scope"]
+        
+        Args:
+            content (str): 待审查的对话内容
+            ledger (ReviewLedger, optional): 本次工作流的审查结论记录，未启用增量审查时为 None
+            result (Dict[str, Any]): 本次处理结果
+            
+        Returns:
+            Tuple[bool, str]: 审查结果和反馈信息
+        """
+        if ledger is None:
+            return self.knowledge_reviewer.process(content)
+        
+        turns, pending = ledger.plan(content)
+        result.setdefault("review_scope", []).append(review_scope(turns, pending))
+        if turns and not pending:
+            print("所有轮次均已审查无误，沿用之前的审查结论")
+            return True, "内容通过审查（沿用之前的审查结论），可以发布。"
+        if len(pending) < len(turns):
+            print(f"增量审查：送审 {len(pending)}/{len(turns)} 轮新增或改动的对话")
+            review_input = render_delta(turns, pending)
+        else:
+            review_input = content
+        passed, feedback = self.knowledge_reviewer.process(review_input)
+        ledger.record(turns, pending, passed, feedback)
+        return passed, feedback
+    
+    def _optimize_prompt(self, user_input: str, result: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        按 OPTIMIZER_FAST_PATH 优化提示词，把采用的方式记入 result["optimizer_mode"]
+        
+        - optimized：先优化再生成（默认）
+        - skipped：输入已是完整提示词，直接用于生成
+        - speculative_kept：优化与首次生成并行，优化改动不大，采用以原输入生成的内容
+        - speculative_discarded：优化改动较大，放弃推测生成的内容，改用优化后的提示词生成
+        
+        Args:
+            user_input (str): 用户输入
+            result (Dict[str, Any]): 本次处理结果
+            
+        Returns:
+            Tuple[str, Optional[Dict[str, Any]]]: 优化后的提示词；推测生成被采用时附带其内容、耗时和路由
+        """
+        fast_path = settings.optimizer_fast_path
+        assessment = assess_prompt(user_input) if fast_path in ("skip", "speculative") else None
+        
+        if assessment is not None and assessment["score"] >= settings.optimizer_skip_score:
+            print(f"输入已是完整提示词（完整度 {assessment['score']}），跳过提示词优化")
+            result["optimizer_mode"] = "skipped"
+            return user_input, None
+        
+        if fast_path != "speculative" or assessment["score"] < settings.speculative_min_score:
+            print("正在优化提示词...")
+            result["optimizer_mode"] = "optimized"
+            return self.prompt_optimizer.process(user_input), None
+        
+        # 推测执行：以原输入开始首次生成，同时优化提示词
+        print(f"正在优化提示词，同时以原输入推测生成（完整度 {assessment['score']}）...")
+        route = self.model_router.route(user_input) if self.model_router else None
+        
+        def generate():
+            start = time.time()
+            content = self.content_generator.process(user_input, model_name=route["model"] if route else None)
+            return content, time.time() - start
+        
+        # 复制上下文，推测生成的用量计入本次请求
+        future = _get_speculation_executor().submit(contextvars.copy_context().run, generate)
+        try:
+            optimized_prompt = self.prompt_optimizer.process(user_input)
+        except Exception:
+            future.cancel()
+            raise
+        
+        coverage = prompt_coverage(user_input, optimized_prompt)
+        if coverage >= settings.speculative_min_coverage:
+            try:
+                content, latency = future.result()
+                print(f"优化后的提示词与原输入重合度 {coverage:.2f}，采用推测生成的内容")
+                result["optimizer_mode"] = "speculative_kept"
+                return optimized_prompt, {"content": content, "latency": latency, "route": route}
+            except Exception as e:
+                print(f"推测生成出错，改用优化后的提示词生成: {e}")
+        else:
+            # 已在执行的模型调用无法中断，其结果直接丢弃
+            future.cancel()
+            print(f"优化后的提示词与原输入重合度 {coverage:.2f}，放弃推测生成的内容")
+        result["optimizer_mode"] = "speculative_discarded"
+        return optimized_prompt, None
+    
+    def _get_cached_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """读取结果缓存，缓存不可用时返回 None"""
+        if self.result_cache is None:
+            return None
+        try:
+            return self.result_cache.get(cache_key)
+        except Exception as e:
+            print(f"读取结果缓存出错: {e}")
+            return None
+    
+    def _get_semantic_result(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """查找语义相似主题的缓存结果，未启用或未命中时返回 None"""
+        if self.semantic_index is None or self.result_cache is None:
+            return None
+        try:
+            match = self.semantic_index.search(user_input, settings.semantic_cache_threshold)
+        except Exception as e:
+            print(f"查询语义缓存出错: {e}")
+            return None
+        if match is None:
+            return None
+        matched_topic, similarity = match
+        # 索引只增不删，相似主题的结果可能已过期
+        cached = self._get_cached_result(result_cache_key(matched_topic))
+        if cached is None:
+            return None
+        print(f"命中语义缓存：{matched_topic}（相似度 {similarity:.2f}）")
+        cached.update({
+            "original_input": user_input,
+            "cached": True,
+            "semantic_match": {"topic": matched_topic, "similarity": round(similarity, 4)}
+        })
+        return cached
+    
+    def _add_semantic_topic(self, user_input: str):
+        """把已缓存结果的主题加入语义索引，失败时不影响本次请求"""
+        if self.semantic_index is None:
+            return
+        try:
+            self.semantic_index.add(user_input)
+        except Exception as e:
+            print(f"写入语义缓存出错: {e}")
+    
+    def _set_cached_result(self, cache_key: str, result: Dict[str, Any]):
+        """写入结果缓存，失败时不影响本次请求"""
+        if self.result_cache is None:
+            return
+        try:
+            self.result_cache.set(cache_key, result)
+        except Exception as e:
+            print(f"写入结果缓存出错: {e}")
+    
     def regenerate_content(self, user_input: str) -> Dict[str, Any]:
         """
         重新生成内容（当审查未通过时）
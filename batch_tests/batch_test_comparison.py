@@ -17,20 +17,44 @@ from datetime import datetime
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-from dashscope import Generation
 from backend.workflow import WorkflowManager
-from backend.config.settings import settings
+from backend.providers.base_provider import ProviderError
+from backend.providers.provider_factory import get_provider
+from batch_tests.results_store import ResultsStore
+
+
+# 评分维度
+SCORE_DIMENSIONS = ["易理解性", "启发性", "趣味性", "完整性", "实用性"]
+
+# 评分标准（单条评估与批量评估共用）
+EVALUATION_RUBRIC = """请从以下几个维度评分（每项0-10分）：
+1. 易理解性：语言是否简单易懂，没有过多专业术语
+2. 启发性：是否引导我思考，而不是直接灌输答案
+3. 趣味性：内容是否生动有趣，有吸引力
+4. 完整性：是否完整回答了我的问题
+5. 实用性：是否对我的学习有实际帮助"""
 
 
 class BatchTestComparison:
     """批量测试对比类"""
     
-    def __init__(self, num_questions=6):
-        """初始化测试"""
+    def __init__(self, num_questions=6, eval_batch_size=1):
+        """
+        初始化测试
+        
+        Args:
+            num_questions: 测试问题数量
+            eval_batch_size: 每次评估调用评分的回答数，大于1时启用批量评估
+        """
         self.workflow_manager = WorkflowManager()
-        self.api_key = settings.dashscope_api_key
+        # 与工作流共用同一模型提供方（MODEL_PROVIDER=mock 时可离线运行）
+        self.provider = get_provider()
         self.test_results = []
         self.num_questions = num_questions
+        self.report_file = None
+        self.run_id = None
+        self.eval_batch_size = max(1, eval_batch_size)
+        self.eval_calls = 0  # 评估API调用次数
         
     def generate_student_questions(self, num_questions: int = None) -> List[str]:
         """
@@ -63,34 +87,25 @@ class BatchTestComparison:
 """
         
         try:
-            response = Generation.call(
+            response = self.provider.call(
                 model='qwen-flash',
-                prompt=system_prompt,
-                api_key=self.api_key
+                messages=[{"role": "user", "content": system_prompt}]
             )
+            questions_text = response["content"].strip()
             
-            if response.status_code == 200:
-                # 兼容不同的响应结构
-                if hasattr(response.output, 'text'):
-                    questions_text = response.output.text.strip()
-                elif hasattr(response.output, 'choices') and response.output.choices:
-                    questions_text = response.output.choices[0].message.content.strip()
-                else:
-                    questions_text = str(response.output).strip()
-                
-                questions = [q.strip() for q in questions_text.split('\n') if q.strip()]
-                # 取前num_questions个问题
-                questions = questions[:num_questions]
-                
-                print(f"\n[SUCCESS] 成功生成 {len(questions)} 个问题:")
-                for i, q in enumerate(questions, 1):
-                    print(f"  {i}. {q}")
-                
-                return questions
-            else:
-                print(f"[ERROR] 问题生成失败: {response.message}")
-                return []
+            questions = [q.strip() for q in questions_text.split('\n') if q.strip()]
+            # 取前num_questions个问题
+            questions = questions[:num_questions]
+            
+            print(f"\n[SUCCESS] 成功生成 {len(questions)} 个问题:")
+            for i, q in enumerate(questions, 1):
+                print(f"  {i}. {q}")
+            
+            return questions
                 
+        except ProviderError as e:
+            print(f"[ERROR] 问题生成失败: {e.message}")
+            return []
         except Exception as e:
             print(f"[ERROR] 生成问题时出错: {e}")
             return []
@@ -146,41 +161,32 @@ class BatchTestComparison:
         system_prompt = """你是一位中学教师，请用简洁易懂的语言回答学生的问题。"""
         
         try:
-            response = Generation.call(
+            response = self.provider.call(
                 model='qwen-max',
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": question}
-                ],
-                api_key=self.api_key
+                ]
             )
             
             elapsed_time = time.time() - start_time
             
-            if response.status_code == 200:
-                # 兼容不同的响应结构
-                if hasattr(response.output, 'choices') and response.output.choices:
-                    content = response.output.choices[0].message.content
-                elif hasattr(response.output, 'text'):
-                    content = response.output.text
-                else:
-                    content = str(response.output)
-                
-                return {
-                    "method": "直接使用qwen-max",
-                    "response": content,
-                    "time_cost": elapsed_time,
-                    "success": True
-                }
-            else:
-                return {
-                    "method": "直接使用qwen-max",
-                    "response": "",
-                    "error": response.message,
-                    "time_cost": elapsed_time,
-                    "success": False
-                }
+            return {
+                "method": "直接使用qwen-max",
+                "response": response["content"],
+                "time_cost": elapsed_time,
+                "success": True
+            }
                 
+        except ProviderError as e:
+            elapsed_time = time.time() - start_time
+            return {
+                "method": "直接使用qwen-max",
+                "response": "",
+                "error": e.message,
+                "time_cost": elapsed_time,
+                "success": False
+            }
         except Exception as e:
             elapsed_time = time.time() - start_time
             return {
@@ -213,12 +219,7 @@ class BatchTestComparison:
 回答：
 {response}
 
-请从以下几个维度评分（每项0-10分）：
-1. 易理解性：语言是否简单易懂，没有过多专业术语
-2. 启发性：是否引导我思考，而不是直接灌输答案
-3. 趣味性：内容是否生动有趣，有吸引力
-4. 完整性：是否完整回答了我的问题
-5. 实用性：是否对我的学习有实际帮助
+{EVALUATION_RUBRIC}
 
 请严格按照以下JSON格式返回（不要添加任何其他内容）：
 {{
@@ -233,55 +234,25 @@ class BatchTestComparison:
 """
         
         try:
-            response_obj = Generation.call(
+            self.eval_calls += 1
+            response_obj = self.provider.call(
                 model='qwen-flash',
-                prompt=evaluation_prompt,
-                api_key=self.api_key
+                messages=[{"role": "user", "content": evaluation_prompt}]
             )
             
-            if response_obj.status_code == 200:
-                result_text = response_obj.output.text.strip()
+            result_text = response_obj["content"].strip()
+            
+            # 尝试提取JSON
+            try:
+                result_text = self._extract_json_text(result_text)
+                scores = json.loads(result_text)
                 
-                # 尝试提取JSON
-                try:
-                    # 如果响应包含markdown代码块，提取其中的JSON
-                    if "```json" in result_text:
-                        start = result_text.find("```json") + 7
-                        end = result_text.find("```", start)
-                        result_text = result_text[start:end].strip()
-                    elif "```" in result_text:
-                        start = result_text.find("```") + 3
-                        end = result_text.find("```", start)
-                        result_text = result_text[start:end].strip()
-                    
-                    scores = json.loads(result_text)
-                    
-                    # 程序自己计算总分，而不是依赖模型计算
-                    if all(key in scores for key in ["易理解性", "启发性", "趣味性", "完整性", "实用性"]):
-                        calculated_total = scores["易理解性"] + scores["启发性"] + scores["趣味性"] + scores["完整性"] + scores["实用性"]
-                        scores["总分"] = calculated_total
-                    else:
-                        # 如果缺少某些分数，则计算可用分数的总和
-                        total = 0
-                        for key in ["易理解性", "启发性", "趣味性", "完整性", "实用性"]:
-                            if key in scores:
-                                total += scores[key]
-                        scores["总分"] = total
-                    
-                    return scores
-                except json.JSONDecodeError:
-                    print(f"  [ERROR] JSON解析失败，原始响应: {result_text[:100]}...")
-                    return {
-                        "易理解性": 0,
-                        "启发性": 0,
-                        "趣味性": 0,
-                        "完整性": 0,
-                        "实用性": 0,
-                        "总分": 0,
-                        "评语": "评分失败"
-                    }
-            else:
-                print(f"  [ERROR] 评估失败: {response_obj.message}")
+                # 程序自己计算总分，而不是依赖模型计算
+                scores["总分"] = sum(scores[key] for key in SCORE_DIMENSIONS if key in scores)
+                
+                return scores
+            except json.JSONDecodeError:
+                print(f"  [ERROR] JSON解析失败，原始响应: {result_text[:100]}...")
                 return {
                     "易理解性": 0,
                     "启发性": 0,
@@ -289,9 +260,20 @@ class BatchTestComparison:
                     "完整性": 0,
                     "实用性": 0,
                     "总分": 0,
-                    "评语": "评估失败"
+                    "评语": "评分失败"
                 }
                 
+        except ProviderError as e:
+            print(f"  [ERROR] 评估失败: {e.message}")
+            return {
+                "易理解性": 0,
+                "启发性": 0,
+                "趣味性": 0,
+                "完整性": 0,
+                "实用性": 0,
+                "总分": 0,
+                "评语": "评估失败"
+            }
         except Exception as e:
             print(f"  [ERROR] 评估时出错: {e}")
             return {
@@ -304,6 +286,124 @@ class BatchTestComparison:
                 "评语": f"评估出错: {str(e)}"
             }
     
+    def _extract_json_text(self, result_text: str) -> str:
+        """
+        如果响应包含markdown代码块，提取其中的JSON
+        
+        Args:
+            result_text: 模型原始响应
+            
+        Returns:
+            JSON文本
+        """
+        if "```json" in result_text:
+            start = result_text.find("```json") + 7
+            end = result_text.find("```", start)
+            return result_text[start:end].strip()
+        elif "```" in result_text:
+            start = result_text.find("```") + 3
+            end = result_text.find("```", start)
+            return result_text[start:end].strip()
+        return result_text
+    
+    def _validate_batch_item(self, item: Any) -> bool:
+        """校验批量评估结果中的单条评分是否符合约定的结构"""
+        if not isinstance(item, dict):
+            return False
+        for key in SCORE_DIMENSIONS:
+            value = item.get(key)
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 10:
+                return False
+        return True
+    
+    def evaluate_responses_batch(self, items: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        在一次qwen-flash调用中评估多条回答
+        
+        模型须返回严格的JSON数组，每个元素用 id 对应输入序号；
+        整体解析失败或某条结果不合规时，对应回答退回单条评估。
+        同一问题的两种回答放在一次调用中会被相互比较，调用方应只把同一方法的回答放在一批
+        
+        Args:
+            items: 待评估列表（同一方法），每项包含 question、response、method
+            
+        Returns:
+            与 items 一一对应的评分结果
+        """
+        if len(items) == 1:
+            item = items[0]
+            return [self.evaluate_response(item["question"], item["response"], item["method"])]
+        
+        print(f"  → 批量评估 {len(items)} 条回答...")
+        
+        answers = "\n\n".join(
+            f"【回答{i}】\n问题：{item['question']}\n回答：\n{item['response']}"
+            for i, item in enumerate(items, 1)
+        )
+        evaluation_prompt = f"""你是一位初中生，刚刚问了老师一些问题并得到了回答。
+请从中学生的视角分别评估下面{len(items)}条回答的质量，各条回答之间相互独立评分。
+
+{answers}
+
+{EVALUATION_RUBRIC}
+
+请严格按照以下JSON数组格式返回（不要添加任何其他内容），数组长度为{len(items)}，id与回答序号一一对应：
+[
+    {{"id": 1, "易理解性": 分数, "启发性": 分数, "趣味性": 分数, "完整性": 分数, "实用性": 分数, "评语": "简短评语"}}
+]
+"""
+        
+        parsed: Dict[int, Dict[str, Any]] = {}
+        try:
+            self.eval_calls += 1
+            response_obj = self.provider.call(
+                model='qwen-flash',
+                messages=[{"role": "user", "content": evaluation_prompt}]
+            )
+            result = json.loads(self._extract_json_text(response_obj["content"].strip()))
+            if isinstance(result, list):
+                for entry in result:
+                    if isinstance(entry, dict) and isinstance(entry.get("id"), int):
+                        parsed.setdefault(entry["id"], entry)
+            else:
+                print("  [ERROR] 批量评估结果不是JSON数组，逐条重新评估")
+        except json.JSONDecodeError:
+            print("  [ERROR] 批量评估JSON解析失败，逐条重新评估")
+        except ProviderError as e:
+            print(f"  [ERROR] 批量评估失败: {e.message}，逐条重新评估")
+        except Exception as e:
+            print(f"  [ERROR] 批量评估时出错: {e}，逐条重新评估")
+        
+        scores_list = []
+        for i, item in enumerate(items, 1):
+            entry = parsed.get(i)
+            if entry is not None and self._validate_batch_item(entry):
+                scores = {key: entry[key] for key in SCORE_DIMENSIONS}
+                # 程序自己计算总分，而不是依赖模型计算
+                scores["总分"] = sum(scores.values())
+                scores["评语"] = entry.get("评语", "")
+                scores_list.append(scores)
+            else:
+                if parsed:
+                    print(f"  [INFO] 第 {i} 条批量评分缺失或不合规，单独评估")
+                scores_list.append(self.evaluate_response(item["question"], item["response"], item["method"]))
+        return scores_list
+    
+    def _flush_evaluations(self, pending: List[Dict[str, Any]]):
+        """
+        评估所有待评分回答，并写回对应的测试用例
+        
+        Args:
+            pending: 待评估列表，每项包含 test_case、score_field 及评估所需字段
+        """
+        if not pending:
+            return
+        scores_list = self.evaluate_responses_batch(pending)
+        for item, scores in zip(pending, scores_list):
+            item["test_case"][item["score_field"]] = scores
+            print(f"  [SUCCESS] 【{item['question']}】{item['method']}得分: {scores.get('总分', 0)}/50")
+        pending.clear()
+    
     def run_comparison_test(self):
         """运行对比测试"""
         print("\n" + "="*60)
@@ -323,6 +423,9 @@ class BatchTestComparison:
         print("步骤2: 对比测试")
         print(f"{'='*60}")
         
+        # 待评估的回答（批量评估时按方法分别跨问题累积，同一问题的两种回答不在同一次调用中评分）
+        pending: Dict[str, List[Dict[str, Any]]] = {"workflow_score": [], "direct_max_score": []}
+        
         for i, question in enumerate(questions, 1):
             print(f"\n【问题 {i}/{len(questions)}】: {question}")
             print("-" * 60)
@@ -340,13 +443,13 @@ class BatchTestComparison:
             test_case["workflow_result"] = workflow_result
             
             if workflow_result["success"]:
-                workflow_score = self.evaluate_response(
-                    question, 
-                    workflow_result["response"], 
-                    "三阶段工作流"
-                )
-                test_case["workflow_score"] = workflow_score
-                print(f"  [SUCCESS] 三阶段工作流得分: {workflow_score.get('总分', 0)}/50")
+                pending["workflow_score"].append({
+                    "test_case": test_case,
+                    "score_field": "workflow_score",
+                    "question": question,
+                    "response": workflow_result["response"],
+                    "method": "三阶段工作流"
+                })
             else:
                 print(f"  [ERROR] 三阶段工作流失败")
             
@@ -355,21 +458,32 @@ class BatchTestComparison:
             test_case["direct_max_result"] = direct_result
             
             if direct_result["success"]:
-                direct_score = self.evaluate_response(
-                    question,
-                    direct_result["response"],
-                    "直接使用qwen-max"
-                )
-                test_case["direct_max_score"] = direct_score
-                print(f"  [SUCCESS] 直接qwen-max得分: {direct_score.get('总分', 0)}/50")
+                pending["direct_max_score"].append({
+                    "test_case": test_case,
+                    "score_field": "direct_max_score",
+                    "question": question,
+                    "response": direct_result["response"],
+                    "method": "直接使用qwen-max"
+                })
             else:
                 print(f"  [ERROR] 直接qwen-max失败")
             
+            # 同一方法的待评估回答攒够一批后统一评估
+            for queue in pending.values():
+                while len(queue) >= self.eval_batch_size:
+                    batch, queue[:] = queue[:self.eval_batch_size], queue[self.eval_batch_size:]
+                    self._flush_evaluations(batch)
+            
             self.test_results.append(test_case)
             
             # 避免API调用过快
             time.sleep(1)
         
+        # 评估剩余的回答
+        for queue in pending.values():
+            self._flush_evaluations(queue)
+        print(f"\n评估API调用次数: {self.eval_calls}")
+        
         # 3. 生成测试报告
         self.generate_report()
     
@@ -393,6 +507,7 @@ class BatchTestComparison:
         report = {
             "测试时间": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             "测试问题数": len(self.test_results),
+            "评估调用次数": self.eval_calls,
             "三阶段工作流": {
                 "平均分": sum(workflow_scores) / len(workflow_scores) if workflow_scores else 0,
                 "最高分": max(workflow_scores) if workflow_scores else 0,
@@ -419,6 +534,14 @@ class BatchTestComparison:
             json.dump(report, f, ensure_ascii=False, indent=2)
         
         print(f"\n[SUCCESS] 详细报告已保存至: {report_file}")
+        self.report_file = report_file
+        
+        # 追加到结果库，便于跨运行的趋势分析
+        try:
+            self.run_id = ResultsStore().append_report(report, report_path=report_file)
+            print(f"[SUCCESS] 结果已追加到结果库，运行标识: {self.run_id}")
+        except Exception as e:
+            print(f"[ERROR] 写入结果库失败: {e}")
         
         # 打印摘要
         print(f"\n{'='*60}")
@@ -454,13 +577,16 @@ class BatchTestComparison:
         
         return report
 
-    def generate_visualization(self, report_file_path: str):
-        """生成可视化图表"""
+    def generate_visualization(self, report_file_path: str = None):
+        """生成可视化图表（优先从结果库读取本次运行）"""
         try:
             # 导入可视化模块
-            from batch_tests.visualize_results import generate_visualizations
+            from batch_tests.visualize_results import generate_visualizations, generate_visualizations_from_store
             # 生成带时间戳的图表
-            generate_visualizations(report_file_path)
+            if self.run_id and (report_file_path is None or report_file_path == self.report_file):
+                generate_visualizations_from_store(self.run_id)
+            else:
+                generate_visualizations(report_file_path or self.report_file)
             print(f"✓ 可视化图表已生成")
         except ImportError:
             print("[INFO] 无法导入可视化模块，跳过图表生成")
@@ -478,20 +604,20 @@ def main():
             num_questions = int(sys.argv[1])
         except ValueError:
             print(f"[INFO] 无效的参数，使用默认值: {num_questions}")
+    # 第二个参数为批量评估的批大小，默认为1（逐条评估）
+    eval_batch_size = 1
+    if len(sys.argv) > 2:
+        try:
+            eval_batch_size = int(sys.argv[2])
+        except ValueError:
+            print(f"[INFO] 无效的批量评估参数，使用默认值: {eval_batch_size}")
     
-    tester = BatchTestComparison(num_questions=num_questions)
+    tester = BatchTestComparison(num_questions=num_questions, eval_batch_size=eval_batch_size)
     report = tester.run_comparison_test()
     
     # 在测试完成后自动生成可视化图表
-    if hasattr(tester, 'test_results') and tester.test_results:
-        # 获取最新生成的报告文件路径
-        time_str = datetime.now().strftime('%Y%m%d_%H%M%S')
-        results_dir = f"batch_tests/test_results_{time_str}"
-        import glob
-        report_files = glob.glob(f"{results_dir}/test_report_*.json")
-        if report_files:
-            latest_report = max(report_files, key=os.path.getctime)
-            tester.generate_visualization(latest_report)
+    if tester.test_results and tester.report_file:
+        tester.generate_visualization()
 
 
 if __name__ == "__main__":
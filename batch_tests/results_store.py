@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量测试结果库
+将每次批量测试的评分按 "一行 = 一次运行 × 一个问题 × 一种方法 × 一个维度" 追加到SQLite表中，
+跨运行的趋势分析只需一次查询扫描，无需逐个加载历史JSON报告
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+# 默认结果库路径
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results_store.db")
+
+# 方法标识：(结果库中的方法名, 报告中的回答字段, 报告中的评分字段, 报告中的汇总字段)
+ARMS = [
+    ("workflow", "workflow_result", "workflow_score", "三阶段工作流"),
+    ("direct_max", "direct_max_result", "direct_max_score", "直接qwen-max"),
+]
+
+# 评分维度（"总分" 也作为一个维度存储，便于直接聚合）
+DIMENSIONS = ["易理解性", "启发性", "趣味性", "完整性", "实用性", "总分"]
+
+# 允许用于分组的列
+GROUP_COLUMNS = {"run_id", "test_time", "arm", "dimension", "question"}
+
+# 允许的聚合函数
+AGGREGATES = {"avg": "AVG", "max": "MAX", "min": "MIN", "count": "COUNT", "sum": "SUM"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    test_time TEXT NOT NULL,
+    num_questions INTEGER NOT NULL,
+    report_path TEXT,
+    label TEXT
+);
+CREATE TABLE IF NOT EXISTS scores (
+    run_id TEXT NOT NULL,
+    test_time TEXT NOT NULL,
+    question_idx INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    arm TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    score REAL NOT NULL,
+    success INTEGER NOT NULL,
+    time_cost REAL
+);
+CREATE INDEX IF NOT EXISTS idx_scores_run ON scores (run_id, arm, dimension);
+CREATE INDEX IF NOT EXISTS idx_scores_arm_dim ON scores (arm, dimension);
+"""
+
+
+class ResultsStore:
+    """批量测试结果库"""
+
+    def __init__(self, db_path: str = DEFAULT_STORE_PATH):
+        """
+        初始化结果库（不存在时自动建表）
+
+        Args:
+            db_path (str): SQLite数据库路径
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """创建数据库连接，退出时提交并关闭"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def append_report(self, report: Dict[str, Any], report_path: Optional[str] = None,
+                      run_id: Optional[str] = None, label: str = "") -> str:
+        """
+        将一次批量测试报告追加到结果库
+
+        Args:
+            report (Dict[str, Any]): BatchTestComparison.generate_report 生成的报告
+            report_path (str, optional): 报告JSON文件路径
+            run_id (str, optional): 运行标识，默认由测试时间生成
+            label (str): 运行标签（如版本号）
+
+        Returns:
+            str: 运行标识
+        """
+        test_time = report["测试时间"]
+        run_id = run_id or datetime.strptime(test_time, "%Y-%m-%d %H:%M:%S").strftime("%Y%m%d_%H%M%S")
+
+        rows = []
+        for idx, item in enumerate(report["详细结果"]):
+            for arm, result_field, score_field, _ in ARMS:
+                result = item.get(result_field) or {}
+                scores = item.get(score_field) or {}
+                success = 1 if result.get("success") else 0
+                for dim in DIMENSIONS:
+                    if dim in scores:
+                        rows.append((run_id, test_time, idx, item["question"], arm, dim,
+                                     float(scores[dim] or 0), success, result.get("time_cost")))
+
+        with self._connect() as conn:
+            # 同一运行重复写入时覆盖旧数据
+            conn.execute("DELETE FROM scores WHERE run_id = ?", (run_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, test_time, num_questions, report_path, label) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (run_id, test_time, len(report["详细结果"]), report_path, label)
+            )
+            conn.executemany(
+                "INSERT INTO scores (run_id, test_time, question_idx, question, arm, dimension, score, "
+                "success, time_cost) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return run_id
+
+    def import_report_file(self, report_path: str, label: str = "") -> str:
+        """
+        导入历史JSON报告
+
+        Args:
+            report_path (str): 报告JSON文件路径
+            label (str): 运行标签
+
+        Returns:
+            str: 运行标识
+        """
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        return self.append_report(report, report_path=report_path, label=label)
+
+    def list_runs(self) -> List[Dict[str, Any]]:
+        """
+        列出所有运行（按测试时间排序）
+
+        Returns:
+            List[Dict[str, Any]]: 运行信息列表
+        """
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM runs ORDER BY test_time").fetchall()
+        return [dict(row) for row in rows]
+
+    def latest_run_id(self) -> Optional[str]:
+        """返回最近一次运行的标识，结果库为空时返回 None"""
+        runs = self.list_runs()
+        return runs[-1]["run_id"] if runs else None
+
+    def load_columns(self, run_ids: Optional[Sequence[str]] = None, arms: Optional[Sequence[str]] = None,
+                     dimensions: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        一次扫描读取评分明细，按列返回NumPy数组
+
+        Args:
+            run_ids (Sequence[str], optional): 限定运行
+            arms (Sequence[str], optional): 限定方法
+            dimensions (Sequence[str], optional): 限定维度
+
+        Returns:
+            Dict[str, np.ndarray]: 列名到数组的映射
+        """
+        where, params = self._where(run_ids=run_ids, arms=arms, dimensions=dimensions)
+        columns = ["run_id", "test_time", "question_idx", "question", "arm", "dimension", "score", "success"]
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(columns)} FROM scores {where} ORDER BY test_time, question_idx", params
+            ).fetchall()
+
+        if not rows:
+            return {column: np.array([]) for column in columns}
+        values = list(zip(*rows))
+        result = {column: np.array(values[i], dtype=object) for i, column in enumerate(columns)}
+        result["question_idx"] = result["question_idx"].astype(int)
+        result["score"] = result["score"].astype(float)
+        result["success"] = result["success"].astype(bool)
+        return result
+
+    def aggregate(self, group_by: Sequence[str] = ("run_id", "arm", "dimension"), metric: str = "avg",
+                  run_ids: Optional[Sequence[str]] = None, arms: Optional[Sequence[str]] = None,
+                  dimensions: Optional[Sequence[str]] = None, nonzero: bool = False) -> List[Dict[str, Any]]:
+        """
+        跨运行聚合评分
+
+        Args:
+            group_by (Sequence[str]): 分组列，可选 run_id/test_time/arm/dimension/question
+            metric (str): 聚合函数，可选 avg/max/min/count/sum
+            run_ids (Sequence[str], optional): 限定运行
+            arms (Sequence[str], optional): 限定方法
+            dimensions (Sequence[str], optional): 限定维度
+            nonzero (bool): 是否忽略0分（评分失败）的记录
+
+        Returns:
+            List[Dict[str, Any]]: 每组一条记录，包含分组列与 value
+        """
+        unknown = set(group_by) - GROUP_COLUMNS
+        if unknown:
+            raise ValueError(f"不支持的分组列: {', '.join(sorted(unknown))}")
+        if metric not in AGGREGATES:
+            raise ValueError(f"不支持的聚合函数: {metric}")
+
+        where, params = self._where(run_ids=run_ids, arms=arms, dimensions=dimensions, nonzero=nonzero)
+        group_sql = ", ".join(group_by)
+        select_sql = f"{group_sql}, " if group_by else ""
+        sql = f"SELECT {select_sql}{AGGREGATES[metric]}(score) AS value FROM scores {where}"
+        if group_by:
+            sql += f" GROUP BY {group_sql} ORDER BY {group_sql}"
+
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def load_report(self, run_id: str) -> Dict[str, Any]:
+        """
+        按运行重建可视化所需的报告数据和评分矩阵
+
+        Args:
+            run_id (str): 运行标识
+
+        Returns:
+            Dict[str, Any]: 与JSON报告汇总字段一致的报告数据，
+                            并在 "score_matrix" 中附带 visualize_results.build_score_matrix 格式的矩阵
+        """
+        with self._connect() as conn:
+            run = conn.execute("SELECT test_time, num_questions FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if run is None:
+            raise ValueError(f"结果库中不存在运行: {run_id}")
+        test_time, num_questions = run
+
+        columns = self.load_columns(run_ids=[run_id])
+        dims = DIMENSIONS[:-1]
+        scores = np.zeros((len(ARMS), num_questions, len(dims)))
+        totals = np.zeros((len(ARMS), num_questions))
+        questions = [""] * num_questions
+
+        # 通过索引数组一次性把明细行散布到矩阵中
+        arm_index = {arm: i for i, (arm, _, _, _) in enumerate(ARMS)}
+        dim_index = {dim: i for i, dim in enumerate(dims)}
+        if len(columns["score"]):
+            arm_idx = np.array([arm_index[arm] for arm in columns["arm"]])
+            q_idx = columns["question_idx"]
+            is_total = columns["dimension"] == "总分"
+            dim_idx = np.array([dim_index.get(dim, -1) for dim in columns["dimension"]])
+
+            totals[arm_idx[is_total], q_idx[is_total]] = columns["score"][is_total]
+            is_dim = dim_idx >= 0
+            scores[arm_idx[is_dim], q_idx[is_dim], dim_idx[is_dim]] = columns["score"][is_dim]
+            for idx, question in zip(q_idx, columns["question"]):
+                questions[idx] = question
+
+        report = {"测试时间": test_time, "测试问题数": num_questions}
+        for i, (_, _, _, summary_field) in enumerate(ARMS):
+            valid = totals[i][totals[i] > 0]
+            report[summary_field] = {
+                "平均分": float(valid.mean()) if valid.size else 0,
+                "最高分": float(valid.max()) if valid.size else 0,
+                "最低分": float(valid.min()) if valid.size else 0,
+                "成功率": f"{valid.size / num_questions * 100:.1f}%" if num_questions else "0.0%",
+            }
+        report["score_matrix"] = {"questions": questions, "scores": scores, "totals": totals}
+        return report
+
+    def _where(self, run_ids: Optional[Sequence[str]] = None, arms: Optional[Sequence[str]] = None,
+               dimensions: Optional[Sequence[str]] = None, nonzero: bool = False):
+        """构建过滤条件"""
+        clauses, params = [], []
+        for column, values in [("run_id", run_ids), ("arm", arms), ("dimension", dimensions)]:
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        if nonzero:
+            clauses.append("score > 0")
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
@@ -3,17 +3,69 @@
 
 """
 根据测试报告生成可视化图表
+- matplotlib 延迟导入并固定使用无界面的 Agg 后端
+- 评分数据一次性整理为 NumPy 矩阵，统计量向量化计算
+- 四张图互不依赖，使用多进程并行渲染
+- 报告内容未变化时直接复用已生成的图表
 """
 
+import hashlib
 import json
-import matplotlib.pyplot as plt
-import numpy as np
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-# 设置中文字体支持
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans']
-plt.rcParams['axes.unicode_minus'] = False  # 正常显示负号
+import numpy as np
+
+# 添加项目根目录到Python路径，以便直接运行脚本时导入结果库
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+
+# 评分维度
+DIMENSIONS = ['易理解性', '启发性', '趣味性', '完整性', '实用性']
+
+# 对比的两种方法：(报告中的评分字段, 图例名称)
+METHODS = [('workflow_score', '三阶段工作流'), ('direct_max_score', '直接qwen-max')]
+
+# 结果库中的方法名与图例名称
+ARM_LABELS = [('workflow', '三阶段工作流'), ('direct_max', '直接qwen-max')]
+
+# 问题数超过该值时改用阶梯图、不再逐柱标注数值和列出完整问题文本，避免大报告渲染过慢
+ANNOTATE_MAX_QUESTIONS = 30
+
+# 图片分辨率
+DPI = 300
+
+# 渲染缓存文件名，记录报告哈希与已生成的图表
+RENDER_CACHE_FILE = '.render_cache.json'
+
+# 绘图代码变化时递增，使旧缓存失效
+RENDER_VERSION = 2
+
+_plt = None
+
+
+def get_pyplot():
+    """
+    延迟导入 pyplot，并使用无界面的 Agg 后端
+
+    Returns:
+        module: matplotlib.pyplot
+    """
+    global _plt
+    if _plt is None:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        # 设置中文字体支持
+        plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans']
+        plt.rcParams['axes.unicode_minus'] = False  # 正常显示负号
+        _plt = plt
+    return _plt
 
 
 def load_test_report(report_path):
@@ -30,28 +82,96 @@ def load_test_report(report_path):
         return json.load(f)
 
 
-def plot_overall_comparison(report_data, results_dir):
+def build_score_matrix(report_data):
+    """
+    将详细结果整理为评分矩阵（只遍历一次报告）
+
+    Args:
+        report_data (dict): 测试报告数据
+
+    Returns:
+        dict: questions 为问题列表，scores 为形状 (方法数, 问题数, 维度数) 的评分矩阵，
+              totals 为形状 (方法数, 问题数) 的总分矩阵
+    """
+    details = report_data['详细结果']
+    questions = [item['question'] for item in details]
+
+    # 某种方法失败时评分为空字典，按0分处理
+    scores = np.array([
+        [[item.get(field, {}).get(dim, 0) or 0 for dim in DIMENSIONS] for item in details]
+        for field, _ in METHODS
+    ], dtype=float).reshape(len(METHODS), len(details), len(DIMENSIONS))
+    totals = np.array([
+        [item.get(field, {}).get('总分', 0) or 0 for item in details]
+        for field, _ in METHODS
+    ], dtype=float).reshape(len(METHODS), len(details))
+
+    return {'questions': questions, 'scores': scores, 'totals': totals}
+
+
+def _annotate_bars(ax, bars, fmt, fontsize, skip_zero=False):
+    """为柱状图添加数值标签"""
+    for bar in bars:
+        height = bar.get_height()
+        if skip_zero and height <= 0:
+            continue
+        ax.annotate(fmt.format(height),
+                    xy=(bar.get_x() + bar.get_width() / 2, height),
+                    xytext=(0, 3),  # 3 points vertical offset
+                    textcoords="offset points",
+                    ha='center', va='bottom', fontsize=fontsize)
+
+
+def _draw_series(ax, values, offset, width, label, color, dense):
+    """
+    绘制一组按问题排列的分数
+
+    问题较少时绘制分组柱状图；问题较多时改用阶梯填充图，
+    每组数据只生成一个图形对象，避免上千个柱子拖慢渲染
+
+    Returns:
+        柱状图对象，阶梯图时返回 None
+    """
+    if dense:
+        edges = np.arange(len(values) + 1) - 0.5
+        ax.stairs(values, edges, fill=True, label=label, color=color, alpha=0.5)
+        return None
+    x = np.arange(len(values))
+    return ax.bar(x + offset, values, width, label=label, color=color, alpha=0.8)
+
+
+def _save_figure(fig, results_dir, name, timestamp, message):
+    """保存图表并释放图形资源"""
+    plt = get_pyplot()
+    filename = f'{name}_{timestamp}.png'
+    filepath = os.path.join(results_dir, filename)
+    fig.savefig(filepath, dpi=DPI, bbox_inches='tight')
+    plt.close(fig)
+    print(f"{message}: {filepath}")
+    return filepath
+
+
+def plot_overall_comparison(report_data, results_dir, timestamp=None):
     """
     绘制整体对比图
 
     Args:
         report_data (dict): 测试报告数据
         results_dir (str): 结果保存目录
+        timestamp (str, optional): 文件名时间戳，默认为当前时间
+
+    Returns:
+        str: 图片路径
     """
+    plt = get_pyplot()
+    timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+
     # 准备数据
     methods = ['三阶段工作流', '直接qwen-max']
-    avg_scores = [
-        report_data['三阶段工作流']['平均分'],
-        report_data['直接qwen-max']['平均分']
-    ]
-    max_scores = [
-        report_data['三阶段工作流']['最高分'],
-        report_data['直接qwen-max']['最高分']
-    ]
-    min_scores = [
-        report_data['三阶段工作流']['最低分'],
-        report_data['直接qwen-max']['最低分']
-    ]
+    summary = np.array([
+        [report_data[method][key] for method in methods]
+        for key in ['平均分', '最高分', '最低分']
+    ], dtype=float)
     
     # 创建子图
     fig, ax = plt.subplots(figsize=(12, 8))
@@ -61,19 +181,11 @@ def plot_overall_comparison(report_data, results_dir):
     width = 0.25
     
     # 绘制柱状图
-    bars1 = ax.bar(x - width, avg_scores, width, label='平均分', color='skyblue', alpha=0.8)
-    bars2 = ax.bar(x, max_scores, width, label='最高分', color='lightgreen', alpha=0.8)
-    bars3 = ax.bar(x + width, min_scores, width, label='最低分', color='lightcoral', alpha=0.8)
-    
-    # 添加数值标签
-    for bars in [bars1, bars2, bars3]:
-        for bar in bars:
-            height = bar.get_height()
-            ax.annotate(f'{height:.1f}',
-                       xy=(bar.get_x() + bar.get_width() / 2, height),
-                       xytext=(0, 3),  # 3 points vertical offset
-                       textcoords="offset points",
-                       ha='center', va='bottom', fontsize=10)
+    for offset, values, label, color in zip(
+            [-width, 0, width], summary, ['平均分', '最高分', '最低分'],
+            ['skyblue', 'lightgreen', 'lightcoral']):
+        bars = ax.bar(x + offset, values, width, label=label, color=color, alpha=0.8)
+        _annotate_bars(ax, bars, '{:.1f}', 10)
     
     # 设置图表标题和标签
     ax.set_xlabel('方法', fontsize=12)
@@ -86,120 +198,113 @@ def plot_overall_comparison(report_data, results_dir):
     # 添加网格
     ax.grid(axis='y', alpha=0.3)
     
-    # 生成带时间戳的文件名
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'overall_comparison_{timestamp}.png'
-    filepath = os.path.join(results_dir, filename)
-    
     # 调整布局
-    plt.tight_layout()
+    fig.tight_layout()
     
-    # 保存图片
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    print(f"已生成整体对比图: {filepath}")
-    
-    return fig
+    return _save_figure(fig, results_dir, 'overall_comparison', timestamp, "已生成整体对比图")
 
 
-def plot_detailed_comparison(report_data, results_dir):
+def plot_detailed_comparison(report_data, results_dir, timestamp=None, matrix=None):
     """
     绘制详细对比图（各维度评分）
 
     Args:
         report_data (dict): 测试报告数据
         results_dir (str): 结果保存目录
+        timestamp (str, optional): 文件名时间戳，默认为当前时间
+        matrix (dict, optional): build_score_matrix 的结果，避免重复整理数据
+
+    Returns:
+        str: 图片路径
     """
-    # 准备数据
-    questions = [item['question'] for item in report_data['详细结果']]
-    dimensions = ['易理解性', '启发性', '趣味性', '完整性', '实用性']
-    
-    # 为每个问题和方法创建评分矩阵
-    workflow_scores = []
-    direct_scores = []
-    
-    for item in report_data['详细结果']:
-        workflow_scores.append([item['workflow_score'][dim] for dim in dimensions])
-        direct_scores.append([item['direct_max_score'][dim] for dim in dimensions])
+    plt = get_pyplot()
+    timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+    matrix = matrix or build_score_matrix(report_data)
+    questions = matrix['questions']
+    scores = matrix['scores']
+    annotate = len(questions) <= ANNOTATE_MAX_QUESTIONS
     
     # 创建子图
     fig, axes = plt.subplots(2, 3, figsize=(18, 14))  # 增加高度以容纳问题说明
     axes = axes.flatten()
     
+    x = np.arange(len(questions))
+    width = 0.35
+    
     # 为每个维度绘制对比图
-    for i, dim in enumerate(dimensions):
-        if i < len(axes):
-            ax = axes[i]
-            
-            # 准备数据
-            x = np.arange(len(questions))
-            width = 0.35
-            
-            # 提取当前维度的评分
-            workflow_dim_scores = [scores[i] for scores in workflow_scores]
-            direct_dim_scores = [scores[i] for scores in direct_scores]
-            
-            # 绘制柱状图
-            bars1 = ax.bar(x - width/2, workflow_dim_scores, width, label='三阶段工作流', 
-                          color='skyblue', alpha=0.8)
-            bars2 = ax.bar(x + width/2, direct_dim_scores, width, label='直接qwen-max', 
-                          color='lightcoral', alpha=0.8)
-            
-            # 添加数值标签
-            for bars in [bars1, bars2]:
-                for bar in bars:
-                    height = bar.get_height()
-                    if height > 0:  # 只为非零值添加标签
-                        ax.annotate(f'{int(height)}',
-                                   xy=(bar.get_x() + bar.get_width() / 2, height),
-                                   xytext=(0, 3),
-                                   textcoords="offset points",
-                                   ha='center', va='bottom', fontsize=8)
-            
-            # 设置标题和标签
-            ax.set_title(f'{dim}评分对比', fontsize=12)
-            ax.set_xticks(x)
+    for i, dim in enumerate(DIMENSIONS):
+        ax = axes[i]
+        
+        # 绘制柱状图（直接取评分矩阵的对应切片）
+        for m, ((_, label), offset, color) in enumerate(zip(METHODS, [-width / 2, width / 2],
+                                                            ['skyblue', 'lightcoral'])):
+            bars = _draw_series(ax, scores[m, :, i], offset, width, label, color, dense=not annotate)
+            if annotate:
+                _annotate_bars(ax, bars, '{:.0f}', 8, skip_zero=True)
+        
+        # 设置标题和标签
+        ax.set_title(f'{dim}评分对比', fontsize=12)
+        if annotate:
             # 使用问题1, 问题2...作为标签
-            question_labels = [f'问题{i+1}' for i in range(len(questions))]
-            ax.set_xticklabels(question_labels, rotation=0, ha='center', fontsize=9)
-            ax.set_ylabel('分数', fontsize=10)
-            ax.legend(fontsize=9)
-            ax.grid(axis='y', alpha=0.3)
+            ax.set_xticks(x)
+            ax.set_xticklabels([f'问题{j+1}' for j in range(len(questions))], rotation=0, ha='center', fontsize=9)
+        else:
+            ax.set_xlabel('问题序号', fontsize=10)
+        ax.set_ylabel('分数', fontsize=10)
+        ax.legend(fontsize=9)
+        ax.grid(axis='y', alpha=0.3)
     
     # 隐藏多余的子图
-    for i in range(len(dimensions), len(axes)):
+    for i in range(len(DIMENSIONS), len(axes)):
         axes[i].set_visible(False)
     
     # 在图下方添加问题说明
-    fig.text(0.5, 0.02, '问题列表：\n' + '\n'.join([f'问题{i+1}: {q}' for i, q in enumerate(questions)]), 
-             ha='center', va='bottom', fontsize=10, wrap=True)
+    if annotate:
+        fig.text(0.5, 0.02, '问题列表：\n' + '\n'.join([f'问题{i+1}: {q}' for i, q in enumerate(questions)]), 
+                 ha='center', va='bottom', fontsize=10, wrap=True)
     
     # 调整布局，为底部文本留出空间
-    plt.subplots_adjust(bottom=0.15)
+    fig.subplots_adjust(bottom=0.15)
     
-    # 生成带时间戳的文件名
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'detailed_comparison_{timestamp}.png'
-    filepath = os.path.join(results_dir, filename)
-    
-    # 保存图片
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    print(f"已生成详细对比图: {filepath}")
-    
-    return fig
+    return _save_figure(fig, results_dir, 'detailed_comparison', timestamp, "已生成详细对比图")
 
 
-def plot_total_scores_comparison(report_data, results_dir):
+def _format_question_label(question, max_len=15):
+    """过长的问题标签按空格换行"""
+    if len(question) <= max_len:
+        return question
+    lines = []
+    current_line = ""
+    for word in question.split():
+        if len(current_line + word) <= max_len:
+            current_line += word + " "
+        else:
+            lines.append(current_line.strip())
+            current_line = word + " "
+    if current_line:
+        lines.append(current_line.strip())
+    return '\n'.join(lines)
+
+
+def plot_total_scores_comparison(report_data, results_dir, timestamp=None, matrix=None):
     """
     绘制总分对比图
 
     Args:
         report_data (dict): 测试报告数据
         results_dir (str): 结果保存目录
+        timestamp (str, optional): 文件名时间戳，默认为当前时间
+        matrix (dict, optional): build_score_matrix 的结果，避免重复整理数据
+
+    Returns:
+        str: 图片路径
     """
-    # 准备数据
-    questions = [item['question'] for item in report_data['详细结果']]
-    workflow_total_scores = [item['workflow_score']['总分'] for item in report_data['详细结果']]
-    direct_total_scores = [item['direct_max_score']['总分'] for item in report_data['详细结果']]
+    plt = get_pyplot()
+    timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+    matrix = matrix or build_score_matrix(report_data)
+    questions = matrix['questions']
+    totals = matrix['totals']
+    annotate = len(questions) <= ANNOTATE_MAX_QUESTIONS
     
     # 创建子图
     fig, ax = plt.subplots(figsize=(14, 8))
@@ -209,150 +314,252 @@ def plot_total_scores_comparison(report_data, results_dir):
     width = 0.35
     
     # 绘制柱状图
-    bars1 = ax.bar(x - width/2, workflow_total_scores, width, label='三阶段工作流', 
-                  color='skyblue', alpha=0.8)
-    bars2 = ax.bar(x + width/2, direct_total_scores, width, label='直接qwen-max', 
-                  color='lightcoral', alpha=0.8)
-    
-    # 添加数值标签
-    for bars in [bars1, bars2]:
-        for bar in bars:
-            height = bar.get_height()
-            ax.annotate(f'{int(height)}',
-                       xy=(bar.get_x() + bar.get_width() / 2, height),
-                       xytext=(0, 3),
-                       textcoords="offset points",
-                       ha='center', va='bottom', fontsize=10)
+    for m, ((_, label), offset, color) in enumerate(zip(METHODS, [-width / 2, width / 2],
+                                                        ['skyblue', 'lightcoral'])):
+        bars = _draw_series(ax, totals[m], offset, width, label, color, dense=not annotate)
+        if annotate:
+            _annotate_bars(ax, bars, '{:.0f}', 10)
     
     # 设置标题和标签
     ax.set_xlabel('问题', fontsize=12)
     ax.set_ylabel('总分', fontsize=12)
     ax.set_title('各问题总分对比 - 三阶段启发式工作流 vs 直接使用qwen-max', fontsize=14)
-    ax.set_xticks(x)
-    # 水平显示标签，并在过长时换行
-    formatted_labels = []
-    for q in questions:
-        if len(q) > 15:
-            # 将长标签按空格分割成多行
-            words = q.split()
-            lines = []
-            current_line = ""
-            for word in words:
-                if len(current_line + word) <= 15:
-                    current_line += word + " "
-                else:
-                    lines.append(current_line.strip())
-                    current_line = word + " "
-            if current_line:
-                lines.append(current_line.strip())
-            formatted_labels.append('\n'.join(lines))
-        else:
-            formatted_labels.append(q)
-    ax.set_xticklabels(formatted_labels, rotation=0, ha='center', fontsize=10)
+    if annotate:
+        # 水平显示标签，并在过长时换行
+        ax.set_xticks(x)
+        ax.set_xticklabels([_format_question_label(q) for q in questions], rotation=0, ha='center', fontsize=10)
     ax.legend()
     
     # 添加网格
     ax.grid(axis='y', alpha=0.3)
     
     # 调整布局
-    plt.tight_layout()
-    
-    # 生成带时间戳的文件名
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'total_scores_comparison_{timestamp}.png'
-    filepath = os.path.join(results_dir, filename)
-    
-    # 保存图片
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    print(f"已生成总分对比图: {filepath}")
+    fig.tight_layout()
     
-    return fig
+    return _save_figure(fig, results_dir, 'total_scores_comparison', timestamp, "已生成总分对比图")
 
 
-def plot_dimension_averages(report_data, results_dir):
+def plot_dimension_averages(report_data, results_dir, timestamp=None, matrix=None):
     """
     绘制各维度平均分对比图
 
     Args:
         report_data (dict): 测试报告数据
         results_dir (str): 结果保存目录
+        timestamp (str, optional): 文件名时间戳，默认为当前时间
+        matrix (dict, optional): build_score_matrix 的结果，避免重复整理数据
+
+    Returns:
+        str: 图片路径
     """
-    # 准备数据
-    dimensions = ['易理解性', '启发性', '趣味性', '完整性', '实用性']
+    plt = get_pyplot()
+    timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+    matrix = matrix or build_score_matrix(report_data)
     
-    # 计算各维度的平均分
-    workflow_avg_scores = []
-    direct_avg_scores = []
-    
-    for dim in dimensions:
-        workflow_scores = [item['workflow_score'][dim] for item in report_data['详细结果']]
-        direct_scores = [item['direct_max_score'][dim] for item in report_data['详细结果']]
-        
-        workflow_avg_scores.append(sum(workflow_scores) / len(workflow_scores))
-        direct_avg_scores.append(sum(direct_scores) / len(direct_scores))
+    # 沿问题轴求各维度平均分，得到形状 (方法数, 维度数)
+    scores = matrix['scores']
+    averages = scores.mean(axis=1) if scores.shape[1] else np.zeros((len(METHODS), len(DIMENSIONS)))
     
     # 创建子图
     fig, ax = plt.subplots(figsize=(12, 8))
     
     # 设置位置
-    x = np.arange(len(dimensions))
+    x = np.arange(len(DIMENSIONS))
     width = 0.35
     
     # 绘制柱状图
-    bars1 = ax.bar(x - width/2, workflow_avg_scores, width, label='三阶段工作流', 
-                  color='skyblue', alpha=0.8)
-    bars2 = ax.bar(x + width/2, direct_avg_scores, width, label='直接qwen-max', 
-                  color='lightcoral', alpha=0.8)
-    
-    # 添加数值标签
-    for bars in [bars1, bars2]:
-        for i, bar in enumerate(bars):
-            height = bar.get_height()
-            ax.annotate(f'{height:.1f}',
-                       xy=(bar.get_x() + bar.get_width() / 2, height),
-                       xytext=(0, 3),
-                       textcoords="offset points",
-                       ha='center', va='bottom', fontsize=10)
+    for m, ((_, label), offset, color) in enumerate(zip(METHODS, [-width / 2, width / 2],
+                                                        ['skyblue', 'lightcoral'])):
+        bars = ax.bar(x + offset, averages[m], width, label=label, color=color, alpha=0.8)
+        _annotate_bars(ax, bars, '{:.1f}', 10)
     
     # 设置标题和标签
     ax.set_xlabel('评分维度', fontsize=12)
     ax.set_ylabel('平均分', fontsize=12)
     ax.set_title('各维度平均分对比 - 三阶段启发式工作流 vs 直接使用qwen-max', fontsize=14)
     ax.set_xticks(x)
-    ax.set_xticklabels(dimensions)
+    ax.set_xticklabels(DIMENSIONS)
+    ax.legend()
+    
+    # 添加网格
+    ax.grid(axis='y', alpha=0.3)
+    
+    # 调整布局
+    fig.tight_layout()
+    
+    return _save_figure(fig, results_dir, 'dimension_averages_comparison', timestamp, "已生成维度平均分对比图")
+
+
+# 需要生成的图表，按名称在子进程中查找
+PLOTS = {
+    'overall': plot_overall_comparison,
+    'detailed': plot_detailed_comparison,
+    'total_scores': plot_total_scores_comparison,
+    'dimension_averages': plot_dimension_averages,
+}
+
+
+def _render_plot(name, report_data, results_dir, timestamp, matrix):
+    """在子进程中渲染单张图表"""
+    if name == 'overall':
+        return PLOTS[name](report_data, results_dir, timestamp)
+    return PLOTS[name](report_data, results_dir, timestamp, matrix)
+
+
+def _report_hash(report_bytes):
+    """计算报告内容哈希（包含绘图版本与分辨率）"""
+    digest = hashlib.sha256(report_bytes)
+    digest.update(f"{RENDER_VERSION}:{DPI}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _load_render_cache(results_dir, report_hash):
+    """
+    读取渲染缓存，报告哈希一致且图片齐全时返回已生成的文件列表
+
+    Returns:
+        list: 图片路径列表，缓存失效时返回 None
+    """
+    cache_path = os.path.join(results_dir, RENDER_CACHE_FILE)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    files = cache.get('files', [])
+    if cache.get('report_hash') != report_hash or not files:
+        return None
+    if not all(os.path.exists(path) for path in files):
+        return None
+    return files
+
+
+def _save_render_cache(results_dir, report_hash, files):
+    """写入渲染缓存"""
+    cache_path = os.path.join(results_dir, RENDER_CACHE_FILE)
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump({'report_hash': report_hash, 'files': files}, f, ensure_ascii=False, indent=2)
+
+
+def plot_history_trend(store, results_dir, timestamp=None):
+    """
+    绘制历次运行的总分趋势图（从结果库一次聚合查询得到）
+
+    Args:
+        store (ResultsStore): 批量测试结果库
+        results_dir (str): 结果保存目录
+        timestamp (str, optional): 文件名时间戳，默认为当前时间
+
+    Returns:
+        str: 图片路径，结果库为空时返回 None
+    """
+    plt = get_pyplot()
+    timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    rows = store.aggregate(group_by=('test_time', 'run_id', 'arm'), metric='avg',
+                           dimensions=['总分'], nonzero=True)
+    if not rows:
+        print("[INFO] 结果库为空，跳过趋势图")
+        return None
+    
+    # 查询结果已按测试时间排序
+    run_ids = list(dict.fromkeys(row['run_id'] for row in rows))
+    run_index = {run_id: i for i, run_id in enumerate(run_ids)}
+    
+    # 创建子图
+    fig, ax = plt.subplots(figsize=(14, 8))
+    
+    for (arm, label), color in zip(ARM_LABELS, ['skyblue', 'lightcoral']):
+        arm_rows = [row for row in rows if row['arm'] == arm]
+        x = np.array([run_index[row['run_id']] for row in arm_rows])
+        y = np.array([row['value'] for row in arm_rows])
+        ax.plot(x, y, marker='o', label=label, color=color)
+    
+    # 设置标题和标签
+    ax.set_xlabel('运行', fontsize=12)
+    ax.set_ylabel('平均总分', fontsize=12)
+    ax.set_title('历次批量测试平均总分趋势 - 三阶段启发式工作流 vs 直接使用qwen-max', fontsize=14)
+    if len(run_ids) <= ANNOTATE_MAX_QUESTIONS:
+        ax.set_xticks(np.arange(len(run_ids)))
+        ax.set_xticklabels(run_ids, rotation=45, ha='right', fontsize=9)
     ax.legend()
     
     # 添加网格
     ax.grid(axis='y', alpha=0.3)
     
     # 调整布局
-    plt.tight_layout()
+    fig.tight_layout()
     
-    # 生成带时间戳的文件名
+    return _save_figure(fig, results_dir, 'history_trend', timestamp, "已生成历史趋势图")
+
+
+def _render_all(report_data, report_dir, cache_key, matrix, parallel):
+    """
+    渲染全部对比图（带缓存）
+
+    Args:
+        report_data (dict): 测试报告数据
+        report_dir (str): 结果保存目录
+        cache_key (str): 报告内容哈希
+        matrix (dict): build_score_matrix 格式的评分矩阵
+        parallel (bool): 是否多进程并行渲染
+
+    Returns:
+        list: 图片路径
+    """
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'dimension_averages_comparison_{timestamp}.png'
-    filepath = os.path.join(results_dir, filename)
     
-    # 保存图片
-    plt.savefig(filepath, dpi=300, bbox_inches='tight')
-    print(f"已生成维度平均分对比图: {filepath}")
+    print("正在生成可视化图表...")
+    
+    # 生成各种对比图（互不依赖，可并行）
+    files = None
+    if parallel:
+        try:
+            with ProcessPoolExecutor(max_workers=min(len(PLOTS), os.cpu_count() or 1)) as executor:
+                futures = [executor.submit(_render_plot, name, report_data, report_dir, timestamp, matrix)
+                           for name in PLOTS]
+                files = [future.result() for future in futures]
+        except (OSError, RuntimeError) as e:
+            print(f"[INFO] 并行渲染不可用，改为顺序渲染: {e}")
+    if files is None:
+        files = [_render_plot(name, report_data, report_dir, timestamp, matrix) for name in PLOTS]
+    
+    _save_render_cache(report_dir, cache_key, files)
     
-    return fig
+    print("\n可视化图表生成完成！")
+    print(f"生成的文件保存在: {report_dir}")
+    return files
+
 
+def _cached_or_none(report_dir, cache_key, force):
+    """命中缓存时打印并返回已有图表"""
+    if force:
+        return None
+    cached_files = _load_render_cache(report_dir, cache_key)
+    if cached_files:
+        print("测试报告未变化，复用已生成的图表:")
+        for path in cached_files:
+            print(f"  {path}")
+    return cached_files
 
-def generate_visualizations(report_path='test_report_20251030_210320.json'):
+
+def generate_visualizations(report_path='test_report_20251030_210320.json', parallel=True, force=False):
     """
     生成所有可视化图表
 
     Args:
         report_path (str): 测试报告文件路径
+        parallel (bool): 是否多进程并行渲染各图表
+        force (bool): 是否忽略缓存强制重新渲染
+
+    Returns:
+        list: 生成（或复用）的图片路径
     """
     print(f"正在加载测试报告: {report_path}")
-    report_data = load_test_report(report_path)
+    with open(report_path, 'rb') as f:
+        report_bytes = f.read()
     
     # 从报告路径中提取日期目录
-    import os
-    from datetime import datetime
     report_dir = os.path.dirname(report_path)
     if not report_dir:
         # 如果报告路径中没有目录，则创建默认日期目录
@@ -360,25 +567,87 @@ def generate_visualizations(report_path='test_report_20251030_210320.json'):
         report_dir = f"test_results_{date_str}"
         os.makedirs(report_dir, exist_ok=True)
     
-    print("正在生成可视化图表...")
-    
-    # 生成各种对比图
-    plot_overall_comparison(report_data, report_dir)
-    plot_detailed_comparison(report_data, report_dir)
-    plot_total_scores_comparison(report_data, report_dir)
-    plot_dimension_averages(report_data, report_dir)
+    # 报告未变化时直接复用上次的图表，无需解析和渲染
+    report_hash = _report_hash(report_bytes)
+    cached_files = _cached_or_none(report_dir, report_hash, force)
+    if cached_files:
+        return cached_files
     
-    print("\n可视化图表生成完成！")
-    print(f"生成的文件保存在: {report_dir}")
+    report_data = json.loads(report_bytes.decode('utf-8'))
+    matrix = build_score_matrix(report_data)
+    return _render_all(report_data, report_dir, report_hash, matrix, parallel)
+
+
+def generate_visualizations_from_store(run_id=None, store=None, results_dir=None, parallel=True, force=False):
+    """
+    从批量测试结果库生成某次运行的可视化图表
+
+    Args:
+        run_id (str, optional): 运行标识，默认为最近一次运行
+        store (ResultsStore, optional): 结果库，默认使用 batch_tests/results_store.db
+        results_dir (str, optional): 结果保存目录，默认与该次运行的JSON报告同目录
+        parallel (bool): 是否多进程并行渲染各图表
+        force (bool): 是否忽略缓存强制重新渲染
+
+    Returns:
+        list: 生成（或复用）的图片路径
+    """
+    from batch_tests.results_store import ResultsStore
+    
+    store = store or ResultsStore()
+    run_id = run_id or store.latest_run_id()
+    if run_id is None:
+        print("[ERROR] 结果库为空，没有可视化的运行")
+        return []
+    
+    print(f"正在从结果库加载运行: {run_id}")
+    report_data = store.load_report(run_id)
+    matrix = report_data.pop('score_matrix')
+    
+    if results_dir is None:
+        run = next(run for run in store.list_runs() if run['run_id'] == run_id)
+        results_dir = os.path.dirname(run['report_path'] or '') or f"batch_tests/test_results_{run_id}"
+    os.makedirs(results_dir, exist_ok=True)
+    
+    # 以评分矩阵内容作为缓存键
+    digest = hashlib.sha256(run_id.encode('utf-8'))
+    digest.update(matrix['scores'].tobytes())
+    digest.update(matrix['totals'].tobytes())
+    digest.update(f"{RENDER_VERSION}:{DPI}".encode('utf-8'))
+    cache_key = digest.hexdigest()
+    cached_files = _cached_or_none(results_dir, cache_key, force)
+    if cached_files:
+        return cached_files
+    
+    return _render_all(report_data, results_dir, cache_key, matrix, parallel)
 
 
 if __name__ == "__main__":
-    # 查找最新的测试报告
-    report_files = [f for f in os.listdir('.') if f.startswith('test_report_') and f.endswith('.json') and not f.startswith('test_report_sample')]
-    if report_files:
-        latest_report = max(report_files, key=lambda x: x)
-        print(f"找到最新的测试报告: {latest_report}")
-        generate_visualizations(latest_report)
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="根据测试报告生成可视化图表")
+    parser.add_argument("report", nargs="?", default="", help="测试报告JSON路径，默认使用当前目录最新的报告")
+    parser.add_argument("--run-id", default="", help="从结果库读取指定运行")
+    parser.add_argument("--latest", action="store_true", help="从结果库读取最近一次运行")
+    parser.add_argument("--history", action="store_true", help="生成历次运行的总分趋势图")
+    parser.add_argument("--force", action="store_true", help="忽略缓存强制重新渲染")
+    args = parser.parse_args()
+    
+    if args.history:
+        from batch_tests.results_store import ResultsStore
+        os.makedirs("batch_tests/history", exist_ok=True)
+        plot_history_trend(ResultsStore(), "batch_tests/history")
+    elif args.run_id or args.latest:
+        generate_visualizations_from_store(run_id=args.run_id or None, force=args.force)
+    elif args.report:
+        generate_visualizations(args.report, force=args.force)
     else:
-        print("未找到测试报告文件，使用默认文件: test_report_20251030_210320.json")
-        generate_visualizations()
+        # 查找最新的测试报告
+        report_files = [f for f in os.listdir('.') if f.startswith('test_report_') and f.endswith('.json') and not f.startswith('test_report_sample')]
+        if report_files:
+            latest_report = max(report_files, key=lambda x: x)
+            print(f"找到最新的测试报告: {latest_report}")
+            generate_visualizations(latest_report, force=args.force)
+        else:
+            print("未找到测试报告文件，使用默认文件: test_report_20251030_210320.json")
+            generate_visualizations(force=args.force)
@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+FastAPI服务压测脚本
+基于开环到达模型（泊松到达）按配置的RPS向 /learn、/upload、/health 发送请求，
+逐级提升RPS，统计延迟直方图、错误率和饱和点，并输出可跨版本对比的JSON报告
+
+示例：
+    # 服务端使用本地模拟提供方，避免产生API费用
+    cd backend && MODEL_PROVIDER=mock MOCK_LATENCY_MS=500 python main.py
+    # 压测：5/10/20/40 RPS 各30秒
+    python load_tests/load_generator.py --stages 5,10,20,40 --duration 30 --label v1.0.0
+    # 与历史报告对比
+    python load_tests/load_generator.py --stages 5,10,20,40 --compare load_tests/results/load_report_v1.0.0.json
+    # 评估对冲请求：服务端注入长尾延迟，分别以 HEDGE_ENABLED=False/True 启动后压测，并记录服务端对冲统计
+    cd backend && MODEL_PROVIDER=mock MOCK_LATENCY_MS=500 MOCK_TAIL_RATE=0.05 MOCK_TAIL_MS=5000 HEDGE_ENABLED=True python main.py
+    python load_tests/load_generator.py --stages 5,10 --label hedged --server-stats /admin/hedging \
+        --compare load_tests/results/load_report_unhedged.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# 添加项目根目录到Python路径，以便共用backend中的统计工具
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from backend.utils.stats import percentile
+
+
+# 默认主题分布（主题: 权重）
+DEFAULT_TOPICS = {
+    "为什么天空是蓝色的": 3,
+    "光合作用是怎么进行的": 3,
+    "勾股定理是什么": 2,
+    "为什么冰块会浮在水面上": 2,
+    "细菌和病毒有什么区别": 1,
+    "请解释牛顿第一定律": 1,
+}
+
+# 默认接口分布（接口: 权重）
+DEFAULT_ENDPOINT_MIX = {"learn": 0.8, "upload": 0.05, "health": 0.15}
+
+# 延迟直方图的桶上界（毫秒），最后一个桶收纳所有更慢的请求
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000]
+
+# 判定饱和的阈值
+SATURATION_THROUGHPUT_RATIO = 0.9  # 窗口内的吞吐低于对齐窗口发送速率的90%
+SATURATION_ERROR_RATE = 0.05  # 错误率超过5%
+
+
+def parse_weights(text: str) -> Dict[str, float]:
+    """
+    解析 "a=1,b=2" 形式的权重配置
+
+    Args:
+        text (str): 权重配置字符串
+
+    Returns:
+        Dict[str, float]: 名称到权重的映射
+    """
+    weights = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight) if weight else 1.0
+    return weights
+
+
+def load_topics(path: Optional[str]) -> Dict[str, float]:
+    """
+    加载主题分布：每行一个主题，可用 "主题<TAB>权重" 指定权重
+
+    Args:
+        path (str, optional): 主题文件路径，为空时使用默认主题
+
+    Returns:
+        Dict[str, float]: 主题到权重的映射
+    """
+    if not path:
+        return dict(DEFAULT_TOPICS)
+
+    topics = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            topic, _, weight = line.partition("\t")
+            topics[topic] = float(weight) if weight else 1.0
+    return topics
+
+
+def build_upload_document() -> bytes:
+    """生成用于 /upload 压测的小型DOCX文档"""
+    from docx import Document
+
+    document = Document()
+    document.add_paragraph("光合作用是绿色植物利用光能，把二氧化碳和水合成有机物并释放氧气的过程。")
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def window_rates(samples: List[Dict[str, Any]], duration: float) -> Tuple[float, float]:
+    """
+    计算发送窗口内对齐的发送速率与完成速率
+
+    完成统计从第一个请求完成到窗口结束，发送统计从第一个请求发送到窗口结束前同样的间隔，
+    两者时长相同：服务端只有固定延迟时两者相等，处理能力不足时完成速率低于发送速率；
+    窗口结束后排空在途请求的时间不计入
+
+    Args:
+        samples (List[Dict[str, Any]]): 请求样本
+        duration (float): 发送窗口时长（秒）
+
+    Returns:
+        Tuple[float, float]: 发送速率与完成速率（RPS）；窗口内没有完成的请求时完成速率为0
+    """
+    if not samples:
+        return 0.0, 0.0
+    finished = [sample["finished_s"] for sample in samples if sample["finished_s"] <= duration]
+    if not finished or min(finished) >= duration:
+        return len(samples) / duration if duration > 0 else 0.0, 0.0
+    first_finished = min(finished)
+    first_sent = min(sample["sent_s"] for sample in samples)
+    last_sent = duration - (first_finished - first_sent)
+    span = duration - first_finished
+    sent = sum(1 for sample in samples if first_sent < sample["sent_s"] <= last_sent)
+    completed = sum(1 for finished_s in finished if finished_s > first_finished)
+    return sent / span, completed / span
+
+
+def summarize(samples: List[Dict[str, Any]], duration: float, elapsed: float) -> Dict[str, Any]:
+    """
+    汇总一组请求样本
+
+    Args:
+        samples (List[Dict[str, Any]]): 请求样本
+        duration (float): 发送窗口时长（秒）
+        elapsed (float): 包含排空在途请求的实际耗时（秒）
+
+    Returns:
+        Dict[str, Any]: 请求数、错误率、窗口内的发送速率与吞吐、延迟分位数与直方图
+    """
+    latencies = sorted(sample["latency_ms"] for sample in samples)
+    window_offered, throughput = window_rates(samples, duration)
+    errors = [sample for sample in samples if not sample["ok"]]
+
+    histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+    for latency in latencies:
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if latency <= bound:
+                histogram[i] += 1
+                break
+        else:
+            histogram[-1] += 1
+
+    error_kinds: Dict[str, int] = {}
+    for sample in errors:
+        error_kinds[sample["error"]] = error_kinds.get(sample["error"], 0) + 1
+
+    return {
+        "requests": len(samples),
+        "errors": len(errors),
+        "error_rate": len(errors) / len(samples) if samples else 0.0,
+        "error_kinds": error_kinds,
+        "window_offered_rps": window_offered,
+        "throughput_rps": throughput,
+        "completion_rps": len(samples) / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50": percentile(latencies, 0.5) or 0.0,
+            "p90": percentile(latencies, 0.9) or 0.0,
+            "p95": percentile(latencies, 0.95) or 0.0,
+            "p99": percentile(latencies, 0.99) or 0.0,
+            "max": latencies[-1] if latencies else 0.0,
+        },
+        "histogram": {
+            "bucket_upper_ms": HISTOGRAM_BUCKETS_MS + ["+Inf"],
+            "counts": histogram,
+        },
+    }
+
+
+class LoadGenerator:
+    """开环压测生成器"""
+
+    def __init__(self, base_url: str, topics: Dict[str, float], endpoint_mix: Dict[str, float],
+                 timeout: float = 120.0, seed: int = 42, max_in_flight: int = 10000):
+        """
+        初始化压测生成器
+
+        Args:
+            base_url (str): 服务地址
+            topics (Dict[str, float]): 主题分布
+            endpoint_mix (Dict[str, float]): 接口分布
+            timeout (float): 单个请求超时（秒）
+            seed (int): 随机种子，保证相同配置下到达序列可复现
+            max_in_flight (int): 客户端在途请求上限，超出时记为客户端过载而不发送
+        """
+        self.base_url = base_url.rstrip("/")
+        self.topics = list(topics.keys())
+        self.topic_weights = list(topics.values())
+        self.endpoints = list(endpoint_mix.keys())
+        self.endpoint_weights = list(endpoint_mix.values())
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.rng = random.Random(seed)
+        self.upload_document = build_upload_document() if "upload" in endpoint_mix else b""
+        self.in_flight = 0
+
+    async def _send(self, client: httpx.AsyncClient, endpoint: str) -> Tuple[bool, str]:
+        """
+        发送一个请求并判断是否成功
+
+        Args:
+            client (httpx.AsyncClient): HTTP客户端
+            endpoint (str): 接口名称
+
+        Returns:
+            Tuple[bool, str]: 是否成功及错误类型
+        """
+        if endpoint == "learn":
+            topic = self.rng.choices(self.topics, weights=self.topic_weights)[0]
+            response = await client.post(f"{self.base_url}/learn", json={"topic": topic})
+        elif endpoint == "upload":
+            files = {"file": ("load_test.docx", self.upload_document,
+                              "application/vnd.openxmlformats-officedocument.wordprocessingml.document")}
+            response = await client.post(f"{self.base_url}/upload", files=files)
+        else:
+            response = await client.get(f"{self.base_url}/health")
+
+        if response.status_code != 200:
+            return False, f"http_{response.status_code}"
+        body = response.json()
+        if endpoint == "health":
+            return body.get("status") == "healthy", "unhealthy"
+        if not body.get("success"):
+            return False, "app_error"
+        if endpoint == "learn" and body.get("data", {}).get("error"):
+            return False, "workflow_error"
+        return True, ""
+
+    async def _fire(self, client: httpx.AsyncClient, endpoint: str, samples: List[Dict[str, Any]],
+                    stage_start: float):
+        """发送请求并记录样本（发送与完成时间相对于阶段开始）"""
+        self.in_flight += 1
+        sent_s = asyncio.get_running_loop().time() - stage_start
+        start = time.perf_counter()
+        try:
+            ok, error = await self._send(client, endpoint)
+        except httpx.TimeoutException:
+            ok, error = False, "timeout"
+        except httpx.HTTPError as e:
+            ok, error = False, type(e).__name__
+        except ValueError:
+            ok, error = False, "invalid_json"
+        finally:
+            self.in_flight -= 1
+        samples.append({
+            "endpoint": endpoint,
+            "ok": ok,
+            "error": error,
+            "latency_ms": (time.perf_counter() - start) * 1000.0,
+            "sent_s": sent_s,
+            "finished_s": asyncio.get_running_loop().time() - stage_start,
+        })
+
+    async def run_stage(self, client: httpx.AsyncClient, rps: float, duration: float) -> Dict[str, Any]:
+        """
+        以固定目标RPS运行一个压测阶段（泊松到达，不等待上一个请求返回）
+
+        Args:
+            client (httpx.AsyncClient): HTTP客户端
+            rps (float): 目标RPS
+            duration (float): 阶段时长（秒）
+
+        Returns:
+            Dict[str, Any]: 阶段统计结果
+        """
+        print(f"\n[INFO] 压测阶段: 目标 {rps:g} RPS，持续 {duration:g} 秒")
+        samples: List[Dict[str, Any]] = []
+        tasks = []
+        dropped = 0
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        next_arrival = start
+        while True:
+            next_arrival += self.rng.expovariate(rps)
+            if next_arrival - start >= duration:
+                break
+            delay = next_arrival - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.in_flight >= self.max_in_flight:
+                dropped += 1
+                continue
+            endpoint = self.rng.choices(self.endpoints, weights=self.endpoint_weights)[0]
+            tasks.append(asyncio.create_task(self._fire(client, endpoint, samples, start)))
+
+        # 等待本阶段在途请求完成，阶段之间互不干扰
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = loop.time() - start
+
+        # 吞吐只统计发送窗口内的完成，与对齐窗口的发送速率比较；排空耗时单独记录
+        stage = {
+            "target_rps": rps,
+            "offered_rps": len(tasks) / duration,
+            "duration_s": duration,
+            "elapsed_s": elapsed,
+            "client_dropped": dropped,
+            "overall": summarize(samples, duration, elapsed),
+            "endpoints": {
+                endpoint: summarize([s for s in samples if s["endpoint"] == endpoint], duration, elapsed)
+                for endpoint in self.endpoints
+            },
+        }
+        overall = stage["overall"]
+        print(f"  发送 {len(tasks)} 个，完成 {overall['requests']} 个请求，吞吐 {overall['throughput_rps']:.1f} RPS，"
+              f"错误率 {overall['error_rate'] * 100:.1f}%，"
+              f"p50 {overall['latency_ms']['p50']:.0f}ms，p95 {overall['latency_ms']['p95']:.0f}ms，"
+              f"p99 {overall['latency_ms']['p99']:.0f}ms")
+        return stage
+
+    async def run(self, stages: List[float], duration: float, slo_p95_ms: float) -> Dict[str, Any]:
+        """
+        逐级运行所有压测阶段并判定饱和点
+
+        Args:
+            stages (List[float]): 各阶段目标RPS
+            duration (float): 每个阶段时长（秒）
+            slo_p95_ms (float): p95延迟目标，超过即视为饱和
+
+        Returns:
+            Dict[str, Any]: 所有阶段结果与饱和点
+        """
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            results = []
+            for rps in stages:
+                results.append(await self.run_stage(client, rps, duration))
+
+        saturation = None
+        for stage in results:
+            overall = stage["overall"]
+            reasons = []
+            if overall["throughput_rps"] < overall["window_offered_rps"] * SATURATION_THROUGHPUT_RATIO:
+                reasons.append("throughput")
+            if overall["error_rate"] > SATURATION_ERROR_RATE:
+                reasons.append("error_rate")
+            if overall["latency_ms"]["p95"] > slo_p95_ms:
+                reasons.append("p95_latency")
+            if reasons:
+                saturation = {"target_rps": stage["target_rps"], "reasons": reasons}
+                break
+
+        return {"stages": results, "saturation": saturation}
+
+    async def fetch_server_stats(self, paths: List[str]) -> Dict[str, Any]:
+        """
+        压测结束后读取服务端统计接口（如 /admin/hedging），写入报告便于对照
+
+        Args:
+            paths (List[str]): 接口路径
+
+        Returns:
+            Dict[str, Any]: 接口路径到响应的映射，读取失败时记录错误
+        """
+        stats = {}
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            for path in paths:
+                try:
+                    response = await client.get(f"{self.base_url}{path}")
+                    response.raise_for_status()
+                    stats[path] = response.json()
+                except (httpx.HTTPError, ValueError) as e:
+                    stats[path] = {"error": str(e)}
+        return stats
+
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any]):
+    """
+    打印当前报告与基线报告的对比
+
+    Args:
+        current (Dict[str, Any]): 当前报告
+        baseline (Dict[str, Any]): 基线报告
+    """
+    print(f"\n{'='*60}")
+    print(f"版本对比: {baseline.get('label', '基线')} → {current.get('label', '当前')}")
+    print(f"{'='*60}")
+
+    baseline_stages = {stage["target_rps"]: stage for stage in baseline["stages"]}
+    for stage in current["stages"]:
+        old = baseline_stages.get(stage["target_rps"])
+        if not old:
+            continue
+        new_overall, old_overall = stage["overall"], old["overall"]
+        print(f"\n[{stage['target_rps']:g} RPS]")
+        for key in ["p50", "p95", "p99"]:
+            new_value = new_overall["latency_ms"][key]
+            old_value = old_overall["latency_ms"][key]
+            change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            print(f"  {key}: {old_value:.0f}ms → {new_value:.0f}ms ({change:+.1f}%)")
+        print(f"  错误率: {old_overall['error_rate'] * 100:.2f}% → {new_overall['error_rate'] * 100:.2f}%")
+        print(f"  吞吐: {old_overall['throughput_rps']:.1f} → {new_overall['throughput_rps']:.1f} RPS")
+
+    old_saturation = (baseline.get("saturation") or {}).get("target_rps")
+    new_saturation = (current.get("saturation") or {}).get("target_rps")
+    old_text = f"{old_saturation:g} RPS" if old_saturation else "未饱和"
+    new_text = f"{new_saturation:g} RPS" if new_saturation else "未饱和"
+    print(f"\n饱和点: {old_text} → {new_text}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="FastAPI服务开环压测")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="服务地址")
+    parser.add_argument("--stages", default="1,2,5,10", help="逐级目标RPS，逗号分隔")
+    parser.add_argument("--duration", type=float, default=30.0, help="每个阶段的时长（秒）")
+    parser.add_argument("--mix", default="", help="接口分布，如 learn=0.8,upload=0.05,health=0.15")
+    parser.add_argument("--topics", default="", help="主题文件，每行一个主题，可用TAB分隔指定权重")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单个请求超时（秒）")
+    parser.add_argument("--slo-p95-ms", type=float, default=30000.0, help="p95延迟目标（毫秒）")
+    parser.add_argument("--max-in-flight", type=int, default=10000, help="客户端在途请求上限")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--label", default="", help="版本标签，写入报告用于对比")
+    parser.add_argument("--output", default="", help="报告输出路径")
+    parser.add_argument("--compare", default="", help="用于对比的历史报告路径")
+    parser.add_argument("--server-stats", default="", help="压测结束后读取的服务端统计接口，逗号分隔，如 /admin/hedging")
+    args = parser.parse_args()
+
+    endpoint_mix = parse_weights(args.mix) if args.mix else dict(DEFAULT_ENDPOINT_MIX)
+    stages = [float(rps) for rps in args.stages.split(",") if rps.strip()]
+
+    generator = LoadGenerator(
+        base_url=args.base_url,
+        topics=load_topics(args.topics),
+        endpoint_mix=endpoint_mix,
+        timeout=args.timeout,
+        seed=args.seed,
+        max_in_flight=args.max_in_flight,
+    )
+    result = asyncio.run(generator.run(stages, args.duration, args.slo_p95_ms))
+    stats_paths = [path.strip() for path in args.server_stats.split(",") if path.strip()]
+    if stats_paths:
+        result["server_stats"] = asyncio.run(generator.fetch_server_stats(stats_paths))
+
+    time_str = datetime.now().strftime('%Y%m%d_%H%M%S')
+    report = {
+        "report_version": 1,
+        "label": args.label or time_str,
+        "test_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "config": {
+            "base_url": args.base_url,
+            "stages": stages,
+            "duration_s": args.duration,
+            "endpoint_mix": endpoint_mix,
+            "topics": generator.topics,
+            "slo_p95_ms": args.slo_p95_ms,
+            "seed": args.seed,
+        },
+        **result,
+    }
+
+    output = args.output or f"load_tests/results/load_report_{report['label']}.json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n[SUCCESS] 压测报告已保存至: {output}")
+    if report["saturation"]:
+        print(f"[INFO] 饱和点: {report['saturation']['target_rps']:g} RPS "
+              f"(原因: {', '.join(report['saturation']['reasons'])})")
+    else:
+        print("[INFO] 所有阶段均未饱和")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare_reports(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量评估测试（使用本地模拟提供方）
+验证两种方法的回答分别成批评分，且批量评分与单条评分一致
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.providers.provider_factory import get_provider
+from batch_tests.batch_test_comparison import BatchTestComparison
+
+QUESTIONS = ["为什么天空是蓝色的", "光合作用是怎么进行的", "勾股定理是什么"]
+
+
+def _tester(eval_batch_size: int) -> BatchTestComparison:
+    """使用模拟提供方、跳过真实生成与报告的测试对象"""
+    tester = BatchTestComparison(num_questions=len(QUESTIONS), eval_batch_size=eval_batch_size)
+    tester.provider = get_provider("mock")
+    tester.generate_student_questions = lambda num_questions=None: list(QUESTIONS)
+    tester.get_workflow_response = lambda question: {
+        "success": True, "response": f"老师：我们一起想想“{question}”。\n学生：好的。"}
+    tester.get_direct_max_response = lambda question: {"success": True, "response": f"{question}的答案如下。"}
+    tester.generate_report = lambda: None
+    return tester
+
+
+def _record_prompts(tester: BatchTestComparison) -> list:
+    """记录评估调用的提示词"""
+    prompts = []
+    call = tester.provider.call
+
+    class _Recorder:
+        def call(self, model, messages, timeout=None):
+            prompts.append(messages[-1]["content"])
+            return call(model, messages, timeout=timeout)
+
+    tester.provider = _Recorder()
+    return prompts
+
+
+def test_arms_batched_separately():
+    """同一问题的两种回答不出现在同一次评估调用中"""
+    tester = _tester(eval_batch_size=2)
+    prompts = _record_prompts(tester)
+    tester.run_comparison_test()
+    assert len(prompts) == 4
+    for prompt in prompts:
+        assert not ("老师：我们一起想想" in prompt and "的答案如下" in prompt)
+
+
+def test_batch_scores_match_single():
+    """批量评分与逐条评分结果一致"""
+    batched = _tester(eval_batch_size=3)
+    batched.run_comparison_test()
+    single = _tester(eval_batch_size=1)
+    single.run_comparison_test()
+    assert batched.eval_calls == 2
+    assert single.eval_calls == 6
+    for batch_case, single_case in zip(batched.test_results, single.test_results):
+        for field in ("workflow_score", "direct_max_score"):
+            assert batch_case[field]["总分"] == single_case[field]["总分"]
+            for dimension in ("易理解性", "启发性", "趣味性", "完整性", "实用性"):
+                assert batch_case[field][dimension] == single_case[field][dimension]
+
+
+if __name__ == "__main__":
+    test_arms_batched_separately()
+    test_batch_scores_match_single()
+    print("批量评估测试通过")
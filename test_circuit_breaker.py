@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+模型熔断器测试
+验证关闭、熔断、半开三种状态之间的转换
+"""
+
+import sys
+import os
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.agents.base_agent import BaseAgent
+from backend.config.settings import settings
+from backend.providers.base_provider import BaseProvider
+from backend.utils.cancellation import CancelScope, RequestCancelled, cancel_scope
+from backend.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_breaker
+
+OPEN_SECONDS = 0.05
+
+
+def _breaker(slow_call_seconds: float = 0.0) -> CircuitBreaker:
+    """窗口4次调用、失败率50%熔断的熔断器"""
+    return CircuitBreaker("test-model", window=4, min_calls=4, error_rate=0.5,
+                          slow_call_seconds=slow_call_seconds, slow_rate=0.75, open_seconds=OPEN_SECONDS)
+
+
+def _trip(breaker: CircuitBreaker):
+    """连续失败直到熔断"""
+    for _ in range(4):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def _half_open(breaker: CircuitBreaker):
+    """熔断后等待进入半开状态并放行探测调用"""
+    _trip(breaker)
+    time.sleep(OPEN_SECONDS * 1.5)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+
+def test_closed_to_open():
+    """失败率达到阈值时熔断，熔断期间拒绝调用"""
+    breaker = _breaker()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    # 窗口内4次调用中2次失败，达到50%
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot()["short_circuited"] == 1
+
+
+def test_slow_calls_trip():
+    """慢调用比例达到阈值时熔断"""
+    breaker = _breaker(slow_call_seconds=1.0)
+    for _ in range(4):
+        assert breaker.allow()
+        breaker.record_success(2.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_single_probe():
+    """熔断时间过后进入半开状态，只放行一次探测调用"""
+    breaker = _breaker()
+    _half_open(breaker)
+    assert not breaker.allow()
+
+
+def test_probe_success_closes():
+    """探测调用成功后恢复关闭状态"""
+    breaker = _breaker()
+    _half_open(breaker)
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_probe_failure_reopens():
+    """探测调用失败后重新熔断"""
+    breaker = _breaker()
+    _half_open(breaker)
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_release_probe():
+    """探测调用被取消或请求有误时归还探测名额，不改变状态"""
+    breaker = _breaker()
+    _half_open(breaker)
+    breaker.release_probe()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_stale_probe_expires():
+    """探测调用一直没有记录结果时，熔断时间过后放行新的探测调用"""
+    breaker = _breaker()
+    _half_open(breaker)
+    assert not breaker.allow()
+    time.sleep(OPEN_SECONDS * 1.5)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+
+class _SlowProvider(BaseProvider):
+    """调用耗时0.5秒的提供方"""
+
+    name = "slow"
+
+    def call(self, model, messages, timeout=None):
+        time.sleep(0.5)
+        return {"content": "ok", "usage": {}}
+
+
+class _EchoAgent(BaseAgent):
+    """直接调用模型的Agent"""
+
+    def process(self, input_data):
+        return self._call_model(input_data)
+
+
+def test_cancelled_probe_released():
+    """探测调用期间工作流被取消时归还探测名额，熔断器仍能放行后续调用"""
+    model = "test-cancelled-probe"
+    original = settings.circuit_breaker_enabled
+    settings.circuit_breaker_enabled = True
+    try:
+        breaker = get_breaker(model)
+        breaker.open_seconds = OPEN_SECONDS
+        breaker.min_calls = 1
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        time.sleep(OPEN_SECONDS * 1.5)
+
+        scope = CancelScope()
+        threading.Timer(0.1, scope.cancel, args=("客户端已断开",)).start()
+        agent = _EchoAgent(model_name=model, provider=_SlowProvider())
+        with cancel_scope(scope):
+            try:
+                agent.process("hello")
+                assert False, "应抛出 RequestCancelled"
+            except RequestCancelled:
+                pass
+        assert breaker.state == HALF_OPEN
+        # 排除探测超时后重新放行的情况
+        breaker.open_seconds = 60.0
+        assert breaker.allow()
+    finally:
+        settings.circuit_breaker_enabled = original
+
+
+if __name__ == "__main__":
+    test_closed_to_open()
+    test_slow_calls_trip()
+    test_half_open_single_probe()
+    test_probe_success_closes()
+    test_probe_failure_reopens()
+    test_release_probe()
+    test_stale_probe_expires()
+    test_cancelled_probe_released()
+    print("熔断器测试通过")
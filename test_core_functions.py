@@ -16,6 +16,8 @@ def test_all_components():
     """测试所有核心组件"""
     tests = [
         ("配置管理", "backend.config.settings", "settings"),
+        ("模型提供方工厂", "backend.providers.provider_factory", "get_provider"),
+        ("模拟模型提供方", "backend.providers.mock_provider", "MockProvider"),
         ("基础Agent", "backend.agents.base_agent", "BaseAgent"),
         ("提示词优化Agent", "backend.agents.prompt_optimizer_agent", "PromptOptimizerAgent"),
         ("内容生成Agent", "backend.agents.content_generator_agent", "ContentGeneratorAgent"),
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+增量审查测试
+验证逐轮沿用审查结论：通过时确认送审的轮次，未通过时只确认反馈没有引用的轮次
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.agents.content_generator_agent import ContentGeneratorAgent
+from backend.agents.prompt_optimizer_agent import PromptOptimizerAgent
+from backend.config.settings import settings
+from backend.providers.provider_factory import get_provider
+from backend.utils.incremental_review import ReviewLedger
+from backend.workflow import WorkflowManager
+
+DIALOG = "老师：光合作用发生在叶绿体中。\n学生：需要阳光吗？\n老师：需要，光能转化为化学能。"
+
+
+def test_failed_review_confirms_uncited():
+    """未通过的审查确认反馈没有引用的轮次，被引用的轮次下次仍送审"""
+    ledger = ReviewLedger()
+    turns, pending = ledger.plan(DIALOG)
+    ledger.record(turns, pending, False, "问题：“光能转化为化学能”表述不准确")
+    assert ledger.plan(DIALOG)[1] == [2]
+
+
+def test_uncited_failure_confirms_nothing():
+    """未通过的反馈引用不到任何轮次时，不确认任何轮次"""
+    ledger = ReviewLedger()
+    turns, pending = ledger.plan(DIALOG)
+    ledger.record(turns, pending, False, "问题：部分表述不够准确")
+    assert ledger.plan(DIALOG)[1] == [0, 1, 2]
+
+
+def test_passed_review_reused():
+    """审查通过的轮次之后不再送审，只送审改动的轮次"""
+    ledger = ReviewLedger()
+    turns, pending = ledger.plan(DIALOG)
+    ledger.record(turns, pending, True, "内容通过审查")
+    assert ledger.plan(DIALOG)[1] == []
+    changed = DIALOG.replace("光能转化为化学能", "光能转化为储存在有机物中的化学能")
+    assert ledger.plan(changed)[1] == [2]
+
+
+def test_fork_is_independent():
+    """并行候选各自的结论记录互不影响"""
+    ledger = ReviewLedger(["老师：光合作用发生在叶绿体中。"])
+    candidate = ledger.fork()
+    turns, pending = candidate.plan(DIALOG)
+    assert pending == [1, 2]
+    candidate.record(turns, pending, True, "内容通过审查")
+    assert ledger.plan(DIALOG)[1] == [1, 2]
+
+
+class _ScriptedReviewer:
+    """记录送审内容的审查Agent：第一次未通过并引用一轮对话，之后通过"""
+
+    def __init__(self):
+        self.inputs = []
+
+    def process(self, input_data):
+        self.inputs.append(input_data)
+        if len(self.inputs) == 1:
+            return False, "问题：“我猜结果会不一样”缺少依据\n建议：请补充原因"
+        return True, "内容通过审查，可以发布。"
+
+
+def test_learn_retry_reviews_delta():
+    """/learn 审查未通过后重试，只送审改动和被反馈引用的轮次"""
+    workflow = WorkflowManager()
+    workflow._prompt_optimizer = PromptOptimizerAgent()
+    workflow._content_generator = ContentGeneratorAgent()
+    for agent in (workflow._prompt_optimizer, workflow._content_generator):
+        agent._provider = get_provider("mock")
+    workflow._knowledge_reviewer = reviewer = _ScriptedReviewer()
+    original = (settings.incremental_review_enabled, main._workflow_manager)
+    settings.incremental_review_enabled = True
+    main._workflow_manager = workflow
+    try:
+        response = TestClient(main.app).post("/learn", json={"topic": "为什么冰块会浮在水面上"})
+    finally:
+        settings.incremental_review_enabled, main._workflow_manager = original
+    data = response.json()["data"]
+    assert data["review_passed"] and data["retry_count"] == 1
+    assert len(reviewer.inputs) == 2
+    assert len(reviewer.inputs[1]) < len(reviewer.inputs[0])
+    assert "我猜结果会不一样" in reviewer.inputs[1]
+    first, retry = data["review_scope"]
+    assert first["reviewed"] == first["turns"]
+    assert 0 < retry["reviewed"] < retry["turns"]
+
+
+if __name__ == "__main__":
+    test_failed_review_confirms_uncited()
+    test_uncited_failure_confirms_nothing()
+    test_passed_review_reused()
+    test_fork_is_independent()
+    test_learn_retry_reviews_delta()
+    print("增量审查测试通过")
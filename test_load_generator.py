@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+压测脚本测试
+用固定延迟的本地服务验证吞吐与饱和点判定：延迟本身不应被判为饱和，处理能力不足时才判为饱和
+"""
+
+import sys
+import os
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+
+# 添加项目根目录与压测脚本目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "load_tests"))
+
+from load_generator import LoadGenerator
+
+RPS = 30.0
+DURATION = 3.0
+
+
+class _FixedLatencyHandler(BaseHTTPRequestHandler):
+    """每个请求固定耗时后返回健康状态"""
+
+    latency_seconds = 1.0
+
+    def do_GET(self):
+        time.sleep(self.latency_seconds)
+        body = json.dumps({"status": "healthy"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _FastHandler(_FixedLatencyHandler):
+    """每个请求耗时0.1秒"""
+
+    latency_seconds = 0.1
+
+
+class _SerialServer(HTTPServer):
+    """逐个处理请求的服务"""
+
+    request_queue_size = 256
+
+
+def _run_against(server_class, handler_class) -> dict:
+    """启动本地服务，以 RPS 压测 DURATION 秒 /health"""
+    server = server_class(("127.0.0.1", 0), handler_class)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        generator = LoadGenerator(
+            base_url=f"http://127.0.0.1:{server.server_address[1]}",
+            topics={"光合作用": 1},
+            endpoint_mix={"health": 1},
+            timeout=30.0,
+        )
+        return asyncio.run(generator.run([RPS], DURATION, slo_p95_ms=60000.0))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_fixed_latency_not_saturated():
+    """并发处理的服务只有固定延迟时，即使排空在途请求耗时较长，吞吐也接近发送速率，不判为饱和"""
+    result = _run_against(ThreadingHTTPServer, _FixedLatencyHandler)
+    stage = result["stages"][0]
+    assert stage["overall"]["errors"] == 0
+    assert stage["elapsed_s"] > DURATION
+    assert abs(stage["overall"]["throughput_rps"] - stage["overall"]["window_offered_rps"]) < 1.0
+    assert result["saturation"] is None
+
+
+def test_serial_server_saturated():
+    """处理能力（约10 RPS）低于发送速率时判为吞吐饱和"""
+    result = _run_against(_SerialServer, _FastHandler)
+    stage = result["stages"][0]
+    assert stage["overall"]["throughput_rps"] < 12.0
+    assert "throughput" in result["saturation"]["reasons"]
+
+
+if __name__ == "__main__":
+    test_fixed_latency_not_saturated()
+    test_serial_server_saturated()
+    print("压测脚本测试通过")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+生成模型路由的学科识别测试
+验证学科按完整的关键词识别，不会因单字误中无关主题
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils.model_router import classify_prompt
+
+# (提示词, 应识别出的学科)
+SUBJECTS = [
+    ("请讲解物体的受力分析", "物理"),
+    ("合力与分力有什么关系", "物理"),
+    ("为什么苹果会受到重力", "物理"),
+    ("杠杆原理有哪些应用", "物理"),
+    ("酸碱中和反应是怎么回事", "化学"),
+    ("勾股定理是什么", "数学"),
+    ("光合作用是怎么进行的", "生物"),
+    ("努力学习数学有什么方法", "数学"),
+]
+
+# 含有学科单字但与该学科无关的提示词
+UNRELATED = [
+    "为什么要努力学习",
+    "怎样提高阅读能力",
+    "力量训练对青少年有什么好处",
+    "酸奶是怎么做出来的",
+]
+
+
+def test_subjects_recognized():
+    """完整的学科关键词能识别出学科"""
+    for prompt, subject in SUBJECTS:
+        assert classify_prompt(prompt)["subject"] == subject, prompt
+
+
+def test_single_characters_ignored():
+    """"力" "酸" 等单字出现在无关的词中时不识别为物理或化学"""
+    for prompt in UNRELATED:
+        assert classify_prompt(prompt)["subject"] is None, prompt
+
+
+if __name__ == "__main__":
+    test_subjects_recognized()
+    test_single_characters_ignored()
+    print("学科识别测试通过")
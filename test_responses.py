@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+API响应序列化与压缩测试
+分别验证 orjson 与标准库 json 的序列化结果一致，以及 brotli 与 gzip 两种压缩方式
+"""
+
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from backend.utils import responses
+
+CONTENT = {
+    "final_content": "老师：光合作用发生在叶绿体中。\n学生：需要阳光吗？",
+    "review_passed": True,
+    "retry_count": 0,
+    "usage": {"input_tokens": 120, "output_tokens": 480},
+    "turns": [1, 2, 3],
+    1: "非字符串键",
+}
+
+
+def test_orjson_serialization():
+    """安装 orjson 时输出与 JSONResponse 相同的JSON"""
+    pytest.importorskip("orjson")
+    assert responses.orjson is not None
+    assert responses.FastJSONResponse(CONTENT).body == JSONResponse(CONTENT).body
+
+
+def test_stdlib_serialization():
+    """未安装 orjson 时退回标准库 json，输出不变"""
+    original = responses.orjson
+    responses.orjson = None
+    try:
+        assert responses.FastJSONResponse(CONTENT).body == JSONResponse(CONTENT).body
+    finally:
+        responses.orjson = original
+
+
+def _client() -> TestClient:
+    """添加压缩中间件、返回较大响应的应用"""
+    app = FastAPI()
+    responses.add_compression(app)
+
+    @app.get("/learn")
+    async def learn():
+        return {"final_content": "老师：光合作用发生在叶绿体中。" * 200}
+
+    return TestClient(app)
+
+
+def test_brotli_compression():
+    """安装 brotli-asgi 时对支持的客户端使用 brotli，其余客户端使用 gzip"""
+    pytest.importorskip("brotli_asgi")
+    client = _client()
+    assert client.get("/learn", headers={"Accept-Encoding": "br, gzip"}).headers["content-encoding"] == "br"
+    assert client.get("/learn", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
+
+
+def test_gzip_fallback():
+    """未安装 brotli-asgi 时使用 gzip 压缩"""
+    original = sys.modules.get("brotli_asgi")
+    # 置为 None 使 import 抛出 ImportError
+    sys.modules["brotli_asgi"] = None
+    try:
+        client = _client()
+    finally:
+        if original is None:
+            del sys.modules["brotli_asgi"]
+        else:
+            sys.modules["brotli_asgi"] = original
+    response = client.get("/learn", headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["final_content"].startswith("老师：")
+
+
+if __name__ == "__main__":
+    test_stdlib_serialization()
+    test_gzip_fallback()
+    if responses.orjson is not None:
+        test_orjson_serialization()
+    print("响应序列化与压缩测试通过")
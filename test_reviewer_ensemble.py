@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+审查组测试
+验证工作流取消时审查组立即停止，以及被取消的成员计为缺席、不算全票一致
+"""
+
+import sys
+import os
+import time
+from concurrent.futures import Future
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.agents.reviewer_ensemble import ReviewerEnsemble
+from backend.utils.cancellation import RequestCancelled
+
+
+class _Reviewer:
+    """固定耗时后给出固定结论（或抛出异常）的审查成员"""
+
+    def __init__(self, delay: float, passed: bool = True, error: Exception = None):
+        self.delay = delay
+        self.passed = passed
+        self.error = error
+
+    def process(self, input_data):
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.passed, "内容通过审查" if self.passed else "表述不准确"
+
+
+class _FirstOnlyExecutor:
+    """只执行第一个提交的调用，其余调用一直排队（可被取消）"""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.submitted += 1
+        if self.submitted == 1:
+            future.set_result(fn(*args))
+        return future
+
+
+def _ensemble(*reviewers: _Reviewer) -> ReviewerEnsemble:
+    """由给定成员组成、法定票数为过半数的审查组"""
+    ensemble = ReviewerEnsemble([(f"model-{i}", None) for i in range(len(reviewers))])
+    ensemble.reviewers = list(reviewers)
+    return ensemble
+
+
+def test_cancellation_reraised():
+    """有成员因工作流取消而中止时，审查组抛出取消，而不是当作出错的一票"""
+    ensemble = _ensemble(_Reviewer(0.0, error=RequestCancelled("客户端已断开")),
+                         _Reviewer(0.1), _Reviewer(0.1))
+    try:
+        ensemble.process("老师：光合作用发生在叶绿体中。")
+        assert False, "应抛出 RequestCancelled"
+    except RequestCancelled:
+        pass
+    assert ensemble.stats.snapshot()["decisions"] == {"PASS": 0, "FAIL": 0}
+
+
+def test_cancelled_member_missing():
+    """提前得出结论后被取消的成员计为缺席，本次不算全票一致"""
+    # 法定票数为1：第一个成员投票后即得出结论，第二个成员尚未开始
+    ensemble = _ensemble(_Reviewer(0.0), _Reviewer(0.0))
+    ensemble._executor = _FirstOnlyExecutor()
+    ensemble.quorum = 1
+    passed, _ = ensemble.process("老师：光合作用发生在叶绿体中。")
+    assert passed
+    snapshot = ensemble.stats.snapshot()
+    assert snapshot["unanimous_rate"] == 0.0
+    assert snapshot["members"]["model-1"]["missing"] == 1
+    assert snapshot["members"]["model-0"]["votes"] == 1
+
+
+if __name__ == "__main__":
+    test_cancellation_reraised()
+    test_cancelled_member_missing()
+    print("审查组测试通过")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+语义近似缓存测试
+验证同义问法能够命中，语序不同、范围不同或有字被替换的主题不会误命中
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.config.settings import settings
+from backend.utils.semantic_cache import SemanticIndex
+
+# (新请求, 已缓存主题)：应命中的同义问法
+PARAPHRASES = [
+    ("为什么天是蓝的", "天空为什么是蓝色"),
+    ("为什么天空是蓝色的", "天为什么是蓝色"),
+    ("什么是勾股定理", "请解释一下勾股定理"),
+    ("惯性是什么呢", "什么是惯性"),
+    ("彩虹如何形成", "彩虹是怎么形成的"),
+    ("四季是怎么来的", "为什么会有四季"),
+]
+
+# (新请求, 已缓存主题)：不应命中的主题
+FALSE_HITS = [
+    ("太阳绕着地球转", "地球绕着太阳转"),
+    ("勾股定理的逆定理", "勾股定理是什么"),
+    ("勾股定理是什么", "勾股定理的逆定理"),
+    ("一氧化碳中毒", "一氧化碳"),
+    ("一氧化碳", "一氧化碳中毒"),
+    ("牛顿第一定律", "牛顿第二定律"),
+    ("地球", "地球自转"),
+    ("水的沸点", "水的冰点"),
+]
+
+
+def _search(query: str, cached: str):
+    """在只含一个已缓存主题的临时索引中查找"""
+    with tempfile.TemporaryDirectory() as path:
+        index = SemanticIndex(path)
+        index.add(cached)
+        return index.search(query, settings.semantic_cache_threshold)
+
+
+def test_paraphrases_hit():
+    """同义问法在默认阈值下命中"""
+    for query, cached in PARAPHRASES:
+        match = _search(query, cached)
+        assert match is not None, f"{query} 应命中 {cached}"
+        print(f"✓ {query} → {match[0]} ({match[1]:.2f})")
+
+
+def test_false_hits_rejected():
+    """语序不同、多出实词或有字被替换的主题不命中"""
+    for query, cached in FALSE_HITS:
+        match = _search(query, cached)
+        assert match is None, f"{query} 不应命中 {cached}（{match}）"
+        print(f"✓ {query} ✗ {cached}")
+
+
+if __name__ == "__main__":
+    test_paraphrases_hit()
+    test_false_hits_rejected()
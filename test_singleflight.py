@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+请求合并测试
+验证跨worker模式下结果发布失败时，执行者本身的请求仍然返回结果并释放租约
+"""
+
+import sys
+import os
+import asyncio
+import sqlite3
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils.shared_cache import SharedCache
+from backend.utils.singleflight import SingleFlight
+
+
+class _ReadOnlyResults(SharedCache):
+    """写入合并结果时失败的共享缓存"""
+
+    def set(self, key, value, ttl=None):
+        if key.startswith("singleflight:result:"):
+            raise sqlite3.OperationalError("database is locked")
+        super().set(key, value, ttl)
+
+
+def test_publish_failure_returns_result():
+    """结果发布失败时执行者仍返回结果，并释放租约让其他worker重新执行"""
+    async def work():
+        return {"final_content": "光合作用"}
+
+    with tempfile.TemporaryDirectory() as path:
+        cache = _ReadOnlyResults(os.path.join(path, "cache.db"))
+        flight = SingleFlight(cache)
+        result, shared = asyncio.run(flight.do("光合作用", work))
+        assert result == {"final_content": "光合作用"}
+        assert not shared
+        assert flight.stats["publish_errors"] == 1
+        assert cache.get("singleflight:lease:光合作用") is None
+
+
+if __name__ == "__main__":
+    test_publish_failure_returns_result()
+    print("请求合并测试通过")